@@ -0,0 +1,428 @@
+"""
+Columnar cold storage for old transactions.
+
+The dashboard reads the last year of a ledger often and anything older
+rarely, yet long-lived accounts keep every transaction in the hot table.
+``archive_transactions`` moves a user's transactions dated before a cutoff
+out of the database into a directory of NumPy ``.npy`` files under
+``ARCHIVE_DIR``, one array per column::
+
+    python -m app.archive              # older than ARCHIVE_AFTER_DAYS
+    python -m app.archive 2023-01-01   # dated before a day
+
+Each archive is sorted by (date, id) and opened memory-mapped, so a query
+only pages in what it touches: date bounds are binary searches and the
+other filters vectorised comparisons. IDs are stored as hex, dates as UTC
+``datetime64``, and text columns as codes into one string table per user.
+
+The transactions listing, single lookups and exports merge archived rows
+with the hot table, so the move is invisible to readers. Archived
+transactions are read-only: updating or deleting one by ID is rejected
+with 409 Conflict, and bulk changes picked by filter leave them out. Rollups are left alone, so dashboard totals still include
+archived transactions, and ``rebuild_rollups`` adds them back in.
+Fingerprints are archived too, so re-importing an old statement still
+skips the rows already stored.
+"""
+
+import json
+import os
+import re
+import shutil
+from datetime import datetime, timedelta, timezone
+from functools import cached_property
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+from uuid import UUID
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+from .cache import CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, MemoryBackend
+from .importers import chunked
+from .models import Transaction
+
+load_dotenv()
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+# Comfortably outside the dashboard's longest (365 day) window
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", 400))
+READ_BATCH_SIZE = 1000
+
+ID_COLUMNS = ("id", "category_id")
+TIME_COLUMNS = ("date", "created_at", "updated_at")
+TEXT_COLUMNS = ("description", "type", "account", "currency", "status")
+STRINGS_FILE = "strings.json"
+FINGERPRINTS_FILE = "fingerprints.npy"
+
+_archives = MemoryBackend(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+
+
+class ArchivedTransaction(NamedTuple):
+    id: UUID
+    date: datetime
+    amount: int
+    category_id: Optional[UUID]
+    description: str
+    type: str
+    account: str
+    currency: Optional[str]
+    status: Optional[str]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+
+COLUMNS = ArchivedTransaction._fields
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _timestamp(value: datetime) -> np.datetime64:
+    return np.datetime64(_naive_utc(value), "us")
+
+
+def _hex(value: Optional[UUID]) -> bytes:
+    return value.hex.encode() if value else b""
+
+
+def _archive_path(user_id: UUID) -> str:
+    return os.path.join(ARCHIVE_DIR, user_id.hex)
+
+
+class UserArchive:
+    """
+    One user's archived transactions, memory-mapped (open with
+    ``load_archive``).
+    """
+
+    def __init__(self, path: str):
+        self.columns = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            for name in COLUMNS
+        }
+        self.fingerprints = np.load(
+            os.path.join(path, FINGERPRINTS_FILE), mmap_mode="r"
+        )
+        with open(os.path.join(path, STRINGS_FILE)) as file:
+            self.strings: List[str] = json.load(file)
+        self._codes = {string: code for code, string in enumerate(self.strings)}
+
+    def __len__(self) -> int:
+        return len(self.columns["id"])
+
+    def _code(self, string: str) -> int:
+        # -2 is never stored, so an unknown string matches nothing
+        return self._codes.get(string, -2)
+
+    def _matching_descriptions(self, terms: List[str]) -> np.ndarray:
+        """
+        Codes of the strings containing every term as a word prefix, the
+        way the full-text index matches.
+        """
+        patterns = [
+            re.compile(rf"\b{re.escape(term)}", re.IGNORECASE) for term in terms
+        ]
+        return np.array(
+            [
+                code
+                for code, string in enumerate(self.strings)
+                if all(pattern.search(string) for pattern in patterns)
+            ],
+            dtype=np.int32,
+        )
+
+    def select(
+        self,
+        type: Optional[str] = None,
+        category_id: Optional[UUID] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        before: Optional[Tuple[datetime, UUID]] = None,
+        terms: Optional[List[str]] = None,
+    ) -> np.ndarray:
+        """
+        Positions of the rows matching the listing's filters, newest first.
+        ``before`` is a ``(date, id)`` cursor; ``terms`` are search words.
+        """
+        dates = self.columns["date"]
+        low, high = 0, len(dates)
+        if start_date is not None:
+            low = np.searchsorted(dates, _timestamp(start_date), side="left")
+        if end_date is not None:
+            high = np.searchsorted(dates, _timestamp(end_date), side="right")
+        if before is not None:
+            cursor_date = _timestamp(before[0])
+            high = min(high, np.searchsorted(dates, cursor_date, side="right"))
+        if high <= low:
+            return np.empty(0, dtype=np.intp)
+
+        window = slice(low, high)
+        keep = np.ones(high - low, dtype=bool)
+        if type:
+            keep &= self.columns["type"][window] == self._code(type)
+        if category_id:
+            keep &= self.columns["category_id"][window] == _hex(category_id)
+        if before is not None:
+            same_date = dates[window] == cursor_date
+            keep &= ~same_date | (self.columns["id"][window] < _hex(before[1]))
+        if terms is not None:
+            codes = self._matching_descriptions(terms)
+            keep &= np.isin(self.columns["description"][window], codes)
+        return np.flatnonzero(keep)[::-1] + low
+
+    @cached_property
+    def _by_id(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Positions in ID order, and the IDs in that order, so lookups by ID
+        # are binary searches; built once per loaded archive
+        order = np.argsort(self.columns["id"], kind="stable")
+        return order, self.columns["id"][order]
+
+    def _positions(self, transaction_ids: Iterable[UUID]) -> np.ndarray:
+        candidates = np.array([_hex(i) for i in transaction_ids], dtype="S32")
+        order, ids = self._by_id
+        if not len(candidates) or not len(ids):
+            return np.empty(0, dtype=np.intp)
+        index = np.minimum(np.searchsorted(ids, candidates), len(ids) - 1)
+        return order[index[ids[index] == candidates]]
+
+    def find(self, transaction_id: UUID) -> Optional[ArchivedTransaction]:
+        return next(self.rows(self._positions([transaction_id])), None)
+
+    def archived_ids(self, transaction_ids: Iterable[UUID]) -> Set[UUID]:
+        """
+        Those of ``transaction_ids`` belonging to archived transactions.
+        """
+        positions = self._positions(transaction_ids)
+        return {UUID(value.decode()) for value in self.columns["id"][positions]}
+
+    def category_ids(self, positions: np.ndarray) -> Set[UUID]:
+        return {
+            UUID(value.decode())
+            for value in np.unique(self.columns["category_id"][positions])
+            if value
+        }
+
+    def rows(self, positions: np.ndarray) -> Iterator[ArchivedTransaction]:
+        """
+        The transactions at ``positions``, read a batch of columns at a time.
+        """
+        for start in range(0, len(positions), READ_BATCH_SIZE):
+            batch = positions[start : start + READ_BATCH_SIZE]
+            values = {}
+            for name in COLUMNS:
+                column = self.columns[name][batch]
+                if name in ID_COLUMNS:
+                    values[name] = [UUID(v.decode()) if v else None for v in column]
+                elif name in TEXT_COLUMNS:
+                    values[name] = [
+                        self.strings[code] if code >= 0 else None
+                        for code in column.tolist()
+                    ]
+                else:
+                    values[name] = column.tolist()
+            for row in zip(*(values[name] for name in COLUMNS)):
+                yield ArchivedTransaction(*row)
+
+    def archived_fingerprints(self, fingerprints: Iterable[str]) -> Set[str]:
+        """
+        Those of ``fingerprints`` belonging to archived transactions.
+        """
+        candidates = np.array([f.encode() for f in fingerprints if f], dtype="S64")
+        if not len(candidates) or not len(self.fingerprints):
+            return set()
+        index = np.searchsorted(self.fingerprints, candidates)
+        found = self.fingerprints[np.minimum(index, len(self.fingerprints) - 1)]
+        return {value.decode() for value in candidates[found == candidates]}
+
+    def rollup_groups(self, user_id: UUID) -> List[dict]:
+        """
+        Rollup rows (as built by ``rebuild_rollups``) for the archived
+        transactions.
+        """
+        keys = np.empty(
+            len(self),
+            dtype=[
+                ("day", "M8[D]"),
+                ("category", "S32"),
+                ("type", "i4"),
+                ("currency", "i4"),
+            ],
+        )
+        keys["day"] = self.columns["date"].astype("M8[D]")
+        keys["category"] = self.columns["category_id"]
+        keys["type"] = self.columns["type"]
+        keys["currency"] = self.columns["currency"]
+        groups, inverse = np.unique(keys, return_inverse=True)
+        totals = np.bincount(inverse, weights=self.columns["amount"])
+        counts = np.bincount(inverse)
+
+        return [
+            {
+                "user_id": user_id,
+                "day": day.item(),
+                "category_id": UUID(category.decode()) if category else None,
+                "type": self.strings[type],
+                "currency": self.strings[currency] if currency >= 0 else None,
+                "total_amount": int(round(total)),
+                "transaction_count": int(count),
+            }
+            for (day, category, type, currency), total, count in zip(
+                groups, totals, counts
+            )
+        ]
+
+
+def load_archive(user_id: UUID) -> Optional[UserArchive]:
+    """
+    A user's archive, or ``None`` if they have none. Costs one ``stat``
+    while the archive is unchanged.
+    """
+    path = _archive_path(user_id)
+    try:
+        stat = os.stat(os.path.join(path, STRINGS_FILE))
+    except FileNotFoundError:
+        return None
+    key = f"{user_id}:{stat.st_ino}:{stat.st_mtime_ns}"
+
+    archive = _archives.get(key)
+    if archive is None:
+        archive = UserArchive(path)
+        _archives.set(key, archive)
+    return archive
+
+
+def archived_users() -> List[UUID]:
+    """
+    Every user with an archive.
+    """
+    if not os.path.isdir(ARCHIVE_DIR):
+        return []
+    return [
+        UUID(name)
+        for name in os.listdir(ARCHIVE_DIR)
+        if re.fullmatch(r"[0-9a-f]{32}", name)
+        and os.path.exists(os.path.join(ARCHIVE_DIR, name, STRINGS_FILE))
+    ]
+
+
+def _write(path: str, columns: Dict[str, np.ndarray], strings: list, fingerprints):
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    for name, values in columns.items():
+        np.save(os.path.join(path, f"{name}.npy"), values)
+    np.save(os.path.join(path, FINGERPRINTS_FILE), fingerprints)
+    # Written last: its presence marks the archive complete
+    with open(os.path.join(path, STRINGS_FILE), "w") as file:
+        json.dump(strings, file)
+
+
+def archive_transactions(db: Session, user_id: UUID, before: datetime) -> int:
+    """
+    Move a user's transactions dated before ``before`` into their archive,
+    committing the deletion once the new archive is in place. Returns the
+    number archived.
+    """
+    rows = (
+        db.query(*(getattr(Transaction, name) for name in COLUMNS))
+        .add_columns(Transaction.fingerprint)
+        .filter(Transaction.user_id == user_id, Transaction.date < before)
+        .all()
+    )
+    if not rows:
+        return 0
+
+    existing = load_archive(user_id)
+    strings = list(existing.strings) if existing else []
+    codes = {string: code for code, string in enumerate(strings)}
+
+    def encode(value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        if value not in codes:
+            codes[value] = len(strings)
+            strings.append(value)
+        return codes[value]
+
+    columns = {}
+    for name in COLUMNS:
+        values = [getattr(row, name) for row in rows]
+        if name in ID_COLUMNS:
+            columns[name] = np.array([_hex(v) for v in values], dtype="S32")
+        elif name in TIME_COLUMNS:
+            naive = [_naive_utc(v) for v in values]
+            columns[name] = np.array(naive, dtype="datetime64[us]")
+        elif name in TEXT_COLUMNS:
+            columns[name] = np.array([encode(v) for v in values], dtype=np.int32)
+        else:
+            columns[name] = np.array(values, dtype=np.int64)
+    fingerprints = np.array(
+        [row.fingerprint.encode() for row in rows if row.fingerprint], dtype="S64"
+    )
+
+    if existing is not None:
+        columns = {
+            name: np.concatenate([existing.columns[name], values])
+            for name, values in columns.items()
+        }
+        fingerprints = np.concatenate([existing.fingerprints, fingerprints])
+    order = np.lexsort((columns["id"], columns["date"]))
+    columns = {name: values[order] for name, values in columns.items()}
+
+    path = _archive_path(user_id)
+    staged, previous = f"{path}.new", f"{path}.old"
+    _write(staged, columns, strings, np.sort(fingerprints))
+
+    for batch in chunked((row.id for row in rows), READ_BATCH_SIZE):
+        db.query(Transaction).filter(Transaction.id.in_(batch)).delete(
+            synchronize_session=False
+        )
+
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, previous)
+    os.replace(staged, path)
+    try:
+        db.commit()
+    except Exception:
+        # Put the old archive back so no transaction is listed twice
+        shutil.rmtree(path, ignore_errors=True)
+        if os.path.exists(previous):
+            os.replace(previous, path)
+        raise
+    shutil.rmtree(previous, ignore_errors=True)
+    return len(rows)
+
+
+def archive_all(db: Session, before: datetime) -> int:
+    """
+    Archive every user's transactions dated before ``before``. Returns the
+    number archived.
+    """
+    user_ids = (
+        db.query(Transaction.user_id).filter(Transaction.date < before).distinct().all()
+    )
+    return sum(archive_transactions(db, user_id, before) for (user_id,) in user_ids)
+
+
+if __name__ == "__main__":
+    import sys
+
+    from .database import Session as SessionLocal
+
+    if len(sys.argv) > 2:
+        print("Usage: python -m app.archive [YYYY-MM-DD]")
+        sys.exit(1)
+    if len(sys.argv) == 2:
+        cutoff = datetime.fromisoformat(sys.argv[1])
+    else:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=ARCHIVE_AFTER_DAYS)
+
+    db = SessionLocal()
+    try:
+        archived = archive_all(db, cutoff)
+        print(f"Archived {archived} transactions dated before {cutoff:%Y-%m-%d}")
+    finally:
+        db.close()
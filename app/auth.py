@@ -1,16 +1,20 @@
 import os
 from datetime import datetime, timedelta, timezone
 from typing import Optional
+from uuid import uuid4
 
 from dotenv import load_dotenv
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 
 from .database import get_db
 from .models import User
+from .principals import FRESH_COLUMNS, Principal, TokenUser, principals
+from .revocation import revocations
 from .schemas import TokenData
 
 # Load environment variables
@@ -39,22 +43,37 @@ def get_password_hash(password: str) -> str:
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
-    Create a JWT access token for the user
+    Create a JWT access token for the user, with a unique ``jti`` so it can
+    be revoked on its own
     """
     to_encode = data.copy()
+    issued_at = datetime.now(timezone.utc)
 
     if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
+        expire = issued_at + expires_delta
     else:
-        expire = datetime.now(timezone.utc) + timedelta(
-            minutes=ACCESS_TOKEN_EXPIRE_MINUTES
-        )
+        expire = issued_at + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 
-    to_encode.update({"exp": expire})
+    # iat keeps its fraction of a second (NumericDate allows one), so a
+    # revocation can tell tokens issued just before it from just after
+    to_encode.update({"exp": expire, "iat": issued_at.timestamp(), "jti": str(uuid4())})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+def token_claims(user: User) -> dict:
+    """
+    Claims for a user's access token: the username plus the ID and flags
+    authorisation needs, trusted until the token expires or is revoked
+    """
+    return {
+        "sub": user.username,
+        "uid": str(user.id),
+        "active": user.is_active,
+        "demo": user.is_demo,
+    }
+
+
 def verify_token(token: str, credentials_exception: HTTPException) -> TokenData:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -63,40 +82,114 @@ def verify_token(token: str, credentials_exception: HTTPException) -> TokenData:
         if username is None:
             raise credentials_exception
 
-        token_data = TokenData(username=username)
+        token_data = TokenData(
+            username=username,
+            user_id=payload.get("uid"),
+            is_active=payload.get("active"),
+            is_demo=payload.get("demo"),
+            jti=payload.get("jti"),
+            issued_at=payload.get("iat"),
+            expires_at=payload.get("exp"),
+        )
         return token_data
 
-    except JWTError:
+    except (JWTError, ValidationError):
         raise credentials_exception
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    token_data = verify_token(token, credentials_exception)
-    user = db.query(User).filter(User.username == token_data.username).first()
 
-    if user is None:
-        raise credentials_exception
+def get_token_data(
+    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+) -> TokenData:
+    """
+    The token's claims, once it is verified and not revoked (see
+    ``app.revocation``). Costs no query between revocation list refreshes
+    """
+    token_data = verify_token(token, _credentials_exception())
+    revocations.refresh(db)
+    if revocations.is_revoked(token_data):
+        raise _credentials_exception()
+    return token_data
+
+
+def get_current_user(
+    token_data: TokenData = Depends(get_token_data), db: Session = Depends(get_db)
+) -> TokenUser:
+    """
+    The token's user. Its ID and flags come from the token; other columns
+    are read from the principal cache (see ``app.principals``), or for
+    ``FRESH_COLUMNS`` the database, when an endpoint first uses them. Tokens
+    naming only a username, issued before tokens carried the rest, are
+    looked up straight away
+    """
+    # The fresh columns of a users row this request loaded
+    loaded = {}
+
+    def load() -> Principal:
+        principal = principals.get(token_data.username)
+        if principal is None:
+            generation = principals.generation
+            user = db.query(User).filter(User.username == token_data.username).first()
+            if user is None:
+                raise _credentials_exception()
+            loaded.update({name: getattr(user, name) for name in FRESH_COLUMNS})
+            principal = principals.remember(user, generation)
+
+        if token_data.user_id is not None and principal.id != token_data.user_id:
+            # The username now belongs to someone else
+            raise _credentials_exception()
+        return principal
+
+    def read_fresh() -> dict:
+        # Without a cached principal, load the whole row: the endpoint will
+        # likely want other columns too
+        if not loaded and principals.get(token_data.username) is None:
+            load()
+        if loaded:
+            # Only good once: a write may change them later in the request
+            fresh = dict(loaded)
+            loaded.clear()
+            return fresh
+        columns = [getattr(User, name) for name in FRESH_COLUMNS]
+        row = db.query(*columns).filter(User.id == token_data.user_id).first()
+        if row is None:
+            raise _credentials_exception()
+        return dict(zip(FRESH_COLUMNS, row))
+
+    if token_data.user_id is None:
+        principal = load()
+        token_data = token_data.model_copy(
+            update={
+                "user_id": principal.id,
+                "is_active": principal.is_active,
+                "is_demo": principal.is_demo,
+            }
+        )
+        if revocations.is_revoked(token_data):
+            raise _credentials_exception()
+        return TokenUser(token_data, lambda: principal, read_fresh)
 
-    return user
+    return TokenUser(token_data, load, read_fresh)
 
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_active_user(
+    current_user: TokenUser = Depends(get_current_user),
+) -> TokenUser:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 
 def require_non_demo_user(
-    current_user: User = Depends(get_current_active_user),
-) -> User:
+    current_user: TokenUser = Depends(get_current_active_user),
+) -> TokenUser:
     if current_user.is_demo:
         raise HTTPException(
             status.HTTP_403_FORBIDDEN,
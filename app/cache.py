@@ -0,0 +1,238 @@
+"""
+Versioned per-user response cache for read-heavy endpoints.
+
+Each user carries a ``data_version`` counter that writes bump in the same
+database transaction as the change itself. Cached responses are keyed by
+(user, endpoint, params, version), so a write never has to delete anything:
+stale entries simply stop being looked up and age out of the backend.
+
+The default backend is an in-process LRU with a TTL. Setting ``CACHE_URL``
+switches to a Redis-compatible server shared by every worker (requires the
+optional ``redis`` package).
+
+The same version drives conditional GETs: ``user_etag`` derives an ETag
+without touching the data, and ``not_modified`` answers a matching
+``If-None-Match`` with a bare 304 before any query runs.
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Callable, Optional
+from uuid import UUID
+
+from dotenv import load_dotenv
+from fastapi import Request, Response, status
+from sqlalchemy.orm import Session
+
+from .models import User
+
+if TYPE_CHECKING:
+    # app.principals imports this module
+    from .principals import TokenUser
+
+load_dotenv()
+
+CACHE_URL = os.getenv("CACHE_URL")
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", 300))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 1024))
+# Session.info key of the users changed in the session's transaction
+CHANGED_USERS = "changed_users"
+
+
+def user_changed(db: Session, user_id: UUID) -> None:
+    """
+    Note a bulk update of a user's row, which flushes don't see, so their
+    cached principal (see ``app.principals``) is dropped on commit.
+    """
+    db.info.setdefault(CHANGED_USERS, set()).add(user_id)
+
+
+def bump_data_version(db: Session, user_id: UUID) -> None:
+    """
+    Invalidate every cached response for a user (caller is responsible for
+    committing, so the bump lands atomically with the write).
+    """
+    # Bookkeeping, not an edit of the user, so updated_at is kept
+    db.query(User).filter(User.id == user_id).update(
+        {"data_version": User.data_version + 1, "updated_at": User.updated_at},
+        synchronize_session=False,
+    )
+    user_changed(db, user_id)
+
+
+class MemoryBackend:
+    """
+    Thread-safe in-process LRU cache whose entries expire after ``ttl`` seconds.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisBackend:
+    """
+    Backend for any client exposing Redis' ``get`` and ``set(..., ex=ttl)``.
+    """
+
+    name = "redis"
+
+    def __init__(self, client, ttl: int, prefix: str = "finance:cache:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any) -> None:
+        self.client.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(f"{self.prefix}*"):
+            self.client.delete(key)
+
+
+class ResponseCache:
+    """
+    Looks up versioned responses in a backend and counts hits and misses.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+
+    @staticmethod
+    def key(user: "TokenUser", endpoint: str, params: dict) -> str:
+        encoded = json.dumps(params, sort_keys=True, default=str)
+        return f"{user.id}:{user.data_version}:{endpoint}:{encoded}"
+
+    def get_or_compute(
+        self, user: "TokenUser", endpoint: str, params: dict, compute: Callable[[], Any]
+    ) -> Any:
+        """
+        Return the cached value for this user's current data version, or
+        compute and store it. Values must be JSON-serialisable.
+        """
+        key = self.key(user, endpoint, params)
+        value = self.backend.get(key)
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if value is None:
+            value = compute()
+            self.backend.set(key, value)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": self.backend.name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def _backend_from_env():
+    if not CACHE_URL:
+        return MemoryBackend(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+
+    try:
+        import redis
+    except ImportError as error:
+        raise ValueError(
+            "CACHE_URL is set but the 'redis' package is not installed"
+        ) from error
+
+    return RedisBackend(redis.Redis.from_url(CACHE_URL), CACHE_TTL_SECONDS)
+
+
+response_cache = ResponseCache(_backend_from_env())
+
+
+def content_etag(*parts) -> str:
+    """
+    Weak ETag hashed from arbitrary JSON-serialisable parts.
+    """
+    encoded = json.dumps(parts, sort_keys=True, default=str).encode()
+    return f'W/"{hashlib.sha256(encoded).hexdigest()[:32]}"'
+
+
+def user_etag(user: "TokenUser", endpoint: str, params: Optional[dict] = None) -> str:
+    """
+    ETag for a per-user response; changes whenever the user's data does.
+    """
+    return content_etag(ResponseCache.key(user, endpoint, params or {}))
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison, as GET revalidation allows (RFC 9110 section 13.1.2)
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Tag the response with ``etag`` and return a 304 response if the client
+    already holds this version, otherwise ``None``.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,182 @@
+"""
+Rule-based categorisation of transactions.
+
+A ``CategoryRule`` maps descriptions to a category by keyword (whole words
+anywhere in the description), merchant (the description starts with it) or
+regular expression. Everyone shares the global rules; users add their own.
+
+Rather than trying rules one by one, a user's rules are compiled once into a
+multi-pattern matcher: keywords and merchants become a hash table of word
+sequences, so a description is matched by one pass over its words however
+many rules there are, and regex rules are combined into one alternation per
+tier. Higher priority rules win, a user's rules beat global ones of the
+same priority, and among equals the match earliest in the description wins.
+Only rules whose category has the transaction's type (income or expense)
+are considered.
+
+Compiled matchers are cached per user under a signature of their rules, so
+adding, editing or deleting a rule (or changing a category) is picked up on
+the next lookup without any explicit invalidation.
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from .cache import CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, MemoryBackend
+from .duplicates import normalise_description
+from .models import Category, CategoryRule
+
+RULE_KINDS = ("keyword", "merchant", "regex")
+# Descriptions remembered per matcher; statements repeat the same merchants
+MEMO_SIZE = 10_000
+
+_WORD = re.compile(r"\w+")
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P[<=]")
+
+
+def validate_rule_pattern(kind: str, pattern: str) -> None:
+    """
+    Raise ``ValueError`` if a rule's pattern can never match.
+    """
+    if kind != "regex":
+        if not normalise_description(pattern):
+            raise ValueError("Pattern must contain letters or digits")
+        return
+    # Group references would point at other rules' groups once combined
+    if _BACKREFERENCE.search(pattern):
+        raise ValueError("Regex rules can't use backreferences or named groups")
+    try:
+        re.compile(f"()({pattern})")
+    except re.error as error:
+        raise ValueError(f"Invalid regex: {error}") from error
+
+
+class CategoryMatcher:
+    """
+    A user's rules compiled for matching (build with ``matcher_for``).
+    """
+
+    def __init__(self, rules: Iterable[Tuple[str, str, str, int, bool, UUID]]):
+        """
+        ``rules`` are ``(type, kind, pattern, priority, is_global,
+        category_id)`` tuples, oldest first.
+        """
+        ordered = sorted(rules, key=lambda rule: (-rule[3], rule[4]))
+        ranks = {}
+        # First word -> (words, rank, merchant only, category) for each type
+        self._phrases: Dict[str, Dict[str, list]] = defaultdict(dict)
+        regex_tiers = defaultdict(list)
+        for type, kind, pattern, priority, is_global, category_id in ordered:
+            rank = ranks.setdefault((priority, is_global), len(ranks))
+            if kind == "regex":
+                regex_tiers[type, rank].append((pattern, category_id))
+                continue
+            words = tuple(normalise_description(pattern).split())
+            self._phrases[type].setdefault(words[0], []).append(
+                (words, rank, kind == "merchant", category_id)
+            )
+
+        # (rank, regex, category for each rule's group), best rank first
+        self._regexes: Dict[str, list] = defaultdict(list)
+        for (type, rank), tier in regex_tiers.items():
+            self._regexes[type].append((rank, *self._compile(tier)))
+        self._memo: Dict[Tuple[str, str], Optional[UUID]] = {}
+
+    @staticmethod
+    def _compile(tier: List[Tuple[str, UUID]]) -> Tuple[re.Pattern, Dict[int, UUID]]:
+        """
+        One alternation of a tier's regexes, and the category for each
+        rule's wrapping group. The wrapping group closes last, so it is the
+        match's ``lastindex`` even when the rule has groups of its own.
+        """
+        sources, categories, group = [], {}, 1
+        for source, category_id in tier:
+            sources.append(f"({source})")
+            categories[group] = category_id
+            group += re.compile(source).groups + 1
+        return re.compile("|".join(sources), re.IGNORECASE), categories
+
+    def categorise(self, description: str, type: str) -> Optional[UUID]:
+        """
+        The category for a description, or ``None`` if no rule matches.
+        """
+        key = (description, type)
+        if key in self._memo:
+            return self._memo[key]
+
+        best = None  # (rank, position in words, category)
+        phrases = self._phrases.get(type)
+        if phrases:
+            words = _WORD.findall(description.casefold())
+            for index, word in enumerate(words):
+                for phrase, rank, merchant, category_id in phrases.get(word, ()):
+                    if merchant and index:
+                        continue
+                    if best is not None and rank >= best[0]:
+                        continue
+                    if tuple(words[index : index + len(phrase)]) == phrase:
+                        best = (rank, index, category_id)
+
+        for rank, regex, categories in self._regexes.get(type, ()):
+            if best is not None and rank > best[0]:
+                break
+            match = regex.search(description)
+            if not match:
+                continue
+            position = len(_WORD.findall(description, 0, match.start()))
+            if best is None or (rank, position) < best[:2]:
+                best = (rank, position, categories[match.lastindex])
+
+        category_id = best[2] if best else None
+        if len(self._memo) >= MEMO_SIZE:
+            self._memo.clear()
+        self._memo[key] = category_id
+        return category_id
+
+
+_matchers = MemoryBackend(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+
+
+def _visible_rules(query, user_id: UUID):
+    return query.join(Category, Category.id == CategoryRule.category_id).filter(
+        or_(CategoryRule.user_id == user_id, CategoryRule.user_id.is_(None))
+    )
+
+
+def matcher_for(db: Session, user_id: UUID) -> CategoryMatcher:
+    """
+    The compiled matcher for a user's and the global rules. Costs one small
+    query while the rules are unchanged; compiles them again when they're
+    not.
+    """
+    count, rules_changed, categories_changed = _visible_rules(
+        db.query(
+            func.count(CategoryRule.id),
+            func.max(CategoryRule.updated_at),
+            func.max(Category.updated_at),
+        ),
+        user_id,
+    ).one()
+    key = f"{user_id}:{count}:{rules_changed}:{categories_changed}"
+
+    matcher = _matchers.get(key)
+    if matcher is None:
+        rules = _visible_rules(
+            db.query(
+                Category.type,
+                CategoryRule.kind,
+                CategoryRule.pattern,
+                CategoryRule.priority,
+                CategoryRule.user_id.is_(None),
+                CategoryRule.category_id,
+            ),
+            user_id,
+        ).order_by(CategoryRule.created_at, CategoryRule.id)
+        matcher = CategoryMatcher(rules.all())
+        _matchers.set(key, matcher)
+    return matcher
@@ -0,0 +1,175 @@
+"""
+Duplicate detection for transactions.
+
+Imported transactions, and bulk creates sent with ``on_conflict=skip``,
+carry a ``fingerprint``: a hash of their owner, date, amount, normalised
+description and account. A unique index on the column lets inserts skip
+rows that are already stored in the same statement (``INSERT ... ON
+CONFLICT DO NOTHING``) instead of looking each one up first, so
+re-importing an overlapping bank statement or retrying a batch doesn't
+count the same money twice.
+
+A single create is only fingerprinted when the client sends an
+``Idempotency-Key``, which joins the hash: a retry with the same key is
+rejected, while two identical purchases entered by hand are both kept.
+
+Genuinely identical transactions in one batch (two coffees on the same day)
+are told apart by their position among the batch's identical rows, so a
+statement containing both still imports both, and importing it again adds
+neither. Rows with no fingerprint are never treated as duplicates.
+"""
+
+import hashlib
+import re
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Set
+from uuid import UUID
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .models import Transaction
+from .money import format_minor_units
+from .partitioning import duplicate_key
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def normalise_description(description: str) -> str:
+    """
+    Description with case, punctuation and spacing differences removed, so
+    "TESCO STORES  3012" and "Tesco Stores 3012" compare equal.
+    """
+    return " ".join(re.findall(r"\w+", description.casefold()))
+
+
+def transaction_fingerprint(
+    user_id: UUID,
+    date: datetime,
+    amount: int,
+    description: str,
+    account: str,
+    occurrence: int = 0,
+    idempotency_key: Optional[str] = None,
+) -> str:
+    """
+    Deterministic fingerprint of a transaction's identifying fields.
+    ``occurrence`` numbers otherwise identical transactions from 0.
+    """
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    parts = [
+        user_id.hex,
+        date.isoformat(timespec="seconds"),
+        format_minor_units(amount),
+        normalise_description(description),
+        account.strip().casefold(),
+    ]
+    if occurrence:
+        parts.append(str(occurrence))
+    if idempotency_key is not None:
+        parts.append(f"key:{idempotency_key}")
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+def fingerprint_rows(
+    user_id: UUID, rows: Iterable[dict], seen: Optional[Counter] = None
+) -> None:
+    """
+    Set the ``fingerprint`` of each transaction row (plain column dict).
+
+    ``seen`` counts identical rows already fingerprinted; pass the same
+    counter for every chunk of one statement so numbering carries across.
+    """
+    seen = Counter() if seen is None else seen
+    for row in rows:
+        base = transaction_fingerprint(
+            user_id, row["date"], row["amount"], row["description"], row["account"]
+        )
+        row["fingerprint"] = transaction_fingerprint(
+            user_id,
+            row["date"],
+            row["amount"],
+            row["description"],
+            row["account"],
+            seen[base],
+        )
+        seen[base] += 1
+
+
+def insert_new_transactions(db: Session, rows: List[dict]) -> Set[UUID]:
+    """
+    Insert transaction rows in one statement, skipping any whose fingerprint
+    is already stored. Returns the IDs of the rows actually inserted.
+
+    Databases without ``ON CONFLICT`` get a plain insert.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        statement = sqlite.insert(Transaction).on_conflict_do_nothing(
+            index_elements=duplicate_key(dialect)
+        )
+    elif dialect == "postgresql":
+        statement = postgresql.insert(Transaction).on_conflict_do_nothing(
+            index_elements=duplicate_key(dialect)
+        )
+    else:
+        db.execute(insert(Transaction), rows)
+        return {row["id"] for row in rows}
+
+    return set(db.scalars(statement.returning(Transaction.id), rows))
+
+
+def find_duplicate(db: Session, fingerprint: str) -> Optional[Transaction]:
+    """
+    The stored transaction with the given fingerprint, if any.
+    """
+    return db.query(Transaction).filter(Transaction.fingerprint == fingerprint).first()
+
+
+def backfill_fingerprints(conn: Connection) -> int:
+    """
+    Fingerprint existing transactions that have none, numbering identical
+    rows in creation order so existing duplicates stay distinct. Returns the
+    number of rows updated.
+    """
+    rows = conn.execute(
+        select(
+            Transaction.id,
+            Transaction.user_id,
+            Transaction.date,
+            Transaction.amount,
+            Transaction.description,
+            Transaction.account,
+        )
+        .where(Transaction.fingerprint.is_(None), Transaction.date.is_not(None))
+        .order_by(Transaction.user_id, Transaction.created_at, Transaction.id)
+    ).all()
+
+    statement = (
+        update(Transaction.__table__).where(
+            Transaction.__table__.c.id == bindparam("row_id")
+        )
+        # Keep updated_at as it was; only the fingerprint is new
+        .values(
+            fingerprint=bindparam("row_fingerprint"),
+            updated_at=Transaction.__table__.c.updated_at,
+        )
+    )
+
+    batch, seen, user_id = [], Counter(), None
+    for row in rows:
+        if row.user_id != user_id:
+            seen, user_id = Counter(), row.user_id
+        values = row._asdict()
+        fingerprint_rows(row.user_id, [values], seen)
+        batch.append({"row_id": row.id, "row_fingerprint": values["fingerprint"]})
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            conn.execute(statement, batch)
+            batch = []
+    if batch:
+        conn.execute(statement, batch)
+    return len(rows)
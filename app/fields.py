@@ -0,0 +1,73 @@
+"""
+Sparse fieldsets for list endpoints.
+
+List endpoints accept ``fields=id,amount,date`` to return only the named
+fields of each item. The selection narrows the SQL too: only the columns
+behind the requested fields are loaded, as plain rows rather than ORM
+objects, so a mobile list view doesn't pay for timestamps or relationships
+it never shows. Without ``fields`` responses are unchanged.
+
+Partial items can't satisfy the endpoint's ``response_model``, so they are
+returned as a ``JSONResponse`` carrying any headers the endpoint set.
+"""
+
+from typing import Dict, Iterable, List, Optional, Type
+
+from fastapi import HTTPException, Query, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+class FieldSelection:
+    """
+    Dependency parsing ``fields`` against the fields of a response schema.
+    Resolves to the requested names in order, or ``None`` for every field.
+    """
+
+    def __init__(self, schema: Type[BaseModel]):
+        self.allowed = tuple(schema.model_fields)
+
+    def __call__(
+        self,
+        fields: Optional[str] = Query(
+            None,
+            description="Comma-separated fields to return for each item",
+            examples=["id,amount,date,description"],
+        ),
+    ) -> Optional[List[str]]:
+        if fields is None:
+            return None
+
+        names = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+        unknown = [name for name in names if name not in self.allowed]
+        if unknown or not names:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=(
+                    f"Unknown fields: {', '.join(unknown) or '(none given)'}. "
+                    f"Choose from {', '.join(self.allowed)}"
+                ),
+            )
+        return names
+
+
+def projection(model, fields: Iterable[str], **columns) -> list:
+    """
+    Labelled column expressions loading ``fields`` from ``model``; pass
+    ``columns`` for fields that aren't a column of the same name.
+    """
+    return [
+        (columns[name] if name in columns else getattr(model, name)).label(name)
+        for name in fields
+    ]
+
+
+def sparse_response(
+    items: Iterable[Dict], fields: List[str], response: Response
+) -> JSONResponse:
+    """
+    Items cut down to ``fields``, with the headers set on ``response``.
+    """
+    content = [{name: item[name] for name in fields} for item in items]
+    return JSONResponse(jsonable_encoder(content), headers=dict(response.headers))
@@ -0,0 +1,195 @@
+"""
+Foreign-exchange rates for multi-currency totals.
+
+Rates live in the ``fx_rates`` table as units of a currency per one unit of
+the base currency (``FX_BASE_CURRENCY``, GBP by default) on a given day, and
+are loaded from a CSV file with ``date,currency,rate`` columns::
+
+    python -m app.fx rates.csv
+
+Dashboard totals are grouped in SQL first (by currency, and by day for
+currencies that need converting), then converted in one vectorised NumPy
+pass per currency with ``convert_totals``; nothing is converted row by row.
+A day without a rate (weekends, holidays) uses the latest rate before it,
+or the earliest one on record for days before that. Amounts in a currency
+with no rates at all are left as they are; ``unconvertible`` names those
+currencies so responses can say their totals are mixed.
+
+Each currency's rates are cached in memory as sorted arrays, so looking up
+the rate for any (currency, day) is a binary search. The cache expires
+after ``CACHE_TTL_SECONDS`` and is cleared when rates are loaded.
+"""
+
+import csv
+import os
+from datetime import date
+from typing import Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .cache import CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, MemoryBackend
+from .importers import chunked
+from .models import FxRate
+
+load_dotenv()
+
+FX_BASE_CURRENCY = os.getenv("FX_BASE_CURRENCY", "GBP")
+LOAD_BATCH_SIZE = 1000
+
+_series = MemoryBackend(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+
+
+def read_rates(file: TextIO) -> Iterator[dict]:
+    """
+    ``fx_rates`` rows from a CSV file with ``date``, ``currency`` and
+    ``rate`` columns. Raises ``ValueError`` on a malformed row.
+    """
+    for line, row in enumerate(csv.DictReader(file), start=2):
+        try:
+            rate = float(row["rate"])
+            if rate <= 0:
+                raise ValueError("rate must be positive")
+            yield {
+                "currency": row["currency"].strip().upper(),
+                "day": date.fromisoformat(row["date"].strip()),
+                "rate": rate,
+            }
+        except (KeyError, TypeError, ValueError) as error:
+            raise ValueError(f"Line {line}: {error}") from error
+
+
+def load_rates(db: Session, rows: Iterable[dict]) -> int:
+    """
+    Insert or replace rates (caller is responsible for committing). Returns
+    the number of rows written.
+    """
+    dialect = db.get_bind().dialect.name
+    written = 0
+    for batch in chunked(rows, LOAD_BATCH_SIZE):
+        if dialect in ("sqlite", "postgresql"):
+            module = sqlite if dialect == "sqlite" else postgresql
+            statement = module.insert(FxRate)
+            statement = statement.on_conflict_do_update(
+                index_elements=["currency", "day"],
+                set_={"rate": statement.excluded.rate},
+            )
+            db.execute(statement, batch)
+        else:
+            for row in batch:
+                db.merge(FxRate(**row))
+        written += len(batch)
+    _series.clear()
+    return written
+
+
+def _rate_series(db: Session, currency: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    A currency's rates as sorted day and rate arrays, or ``None`` without
+    any rates.
+    """
+    series = _series.get(currency)
+    if series is None:
+        rows = (
+            db.query(FxRate.day, FxRate.rate)
+            .filter(FxRate.currency == currency)
+            .order_by(FxRate.day)
+            .all()
+        )
+        days = np.array([row.day for row in rows], dtype="datetime64[D]")
+        series = (days, np.array([row.rate for row in rows], dtype=np.float64))
+        _series.set(currency, series)
+    return series if len(series[0]) else None
+
+
+def rates_on(db: Session, currency: str, days: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Units of ``currency`` per unit of the base currency on each of ``days``,
+    or ``None`` if the currency has no rates.
+    """
+    if currency == FX_BASE_CURRENCY:
+        return np.ones(len(days))
+    series = _rate_series(db, currency)
+    if series is None:
+        return None
+    series_days, series_rates = series
+    index = np.searchsorted(series_days, days, side="right") - 1
+    return series_rates[np.maximum(index, 0)]
+
+
+def convert_totals(
+    db: Session,
+    amounts: Sequence[int],
+    currencies: Sequence[Optional[str]],
+    days: Sequence[Optional[date]],
+    to: str,
+) -> np.ndarray:
+    """
+    Minor-unit amounts converted to ``to`` at each day's rate, rounded to
+    whole minor units. Amounts already in ``to``, or without a currency,
+    are returned unchanged and need no day.
+    """
+    amounts = np.asarray(amounts, dtype=np.int64)
+    converted = amounts.copy()
+    if not len(amounts):
+        return converted
+
+    currencies = np.asarray(currencies, dtype=object)
+    days = np.asarray(days, dtype="datetime64[D]")
+    for currency in set(currencies.tolist()) - {to, None}:
+        rows = currencies == currency
+        source = rates_on(db, currency, days[rows])
+        target = rates_on(db, to, days[rows])
+        if source is None or target is None:
+            continue
+        converted[rows] = np.rint(amounts[rows] * (target / source)).astype(np.int64)
+    return converted
+
+
+def unconvertible(
+    db: Session, currencies: Iterable[Optional[str]], to: str
+) -> List[str]:
+    """
+    Those of ``currencies`` that ``convert_totals`` leaves unconverted when
+    converting to ``to``, for want of rates on one side or the other.
+    """
+
+    def has_rates(currency: str) -> bool:
+        return currency == FX_BASE_CURRENCY or _rate_series(db, currency) is not None
+
+    return sorted(
+        currency
+        for currency in set(currencies) - {to, None}
+        if not (has_rates(currency) and has_rates(to))
+    )
+
+
+def foreign_currencies(currencies: str, preferred: str) -> List[str]:
+    """
+    The currencies in a comma-separated list other than ``preferred``.
+    """
+    return [code for code in currencies.split(",") if code and code != preferred]
+
+
+if __name__ == "__main__":
+    import sys
+
+    from .database import Session as SessionLocal
+
+    if len(sys.argv) != 2:
+        print("Usage: python -m app.fx RATES.csv")
+        sys.exit(1)
+
+    db = SessionLocal()
+    try:
+        with open(sys.argv[1], newline="") as file:
+            written = load_rates(db, read_rates(file))
+        db.commit()
+        print(f"Loaded {written} exchange rates")
+    except Exception as error:
+        db.rollback()
+        print(f"Error loading exchange rates: {error}")
+    finally:
+        db.close()
@@ -5,14 +5,18 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from . import models  # noqa: F401
-from .database import Base, engine
+from .database import Base, Session, engine
+from .migrations import run_migrations
+from .rollups import ensure_rollups
 from .routers import (
     auth,
     budgets,
     categories,
+    category_rules,
     dashboard,
     learn,
     notifications,
+    recurring,
     transactions,
 )
 
@@ -21,6 +25,13 @@ from .routers import (
 async def lifespan(app: FastAPI):
     # Create tables on startup
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    db = Session()
+    try:
+        ensure_rollups(db)
+    finally:
+        db.close()
     yield
 
 
@@ -43,12 +54,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 app.include_router(auth.router)
 app.include_router(transactions.router)
 app.include_router(categories.router)
+app.include_router(category_rules.router)
 app.include_router(budgets.router)
+app.include_router(recurring.router)
 app.include_router(dashboard.router)
 app.include_router(learn.router)
 app.include_router(notifications.router)
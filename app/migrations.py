@@ -0,0 +1,171 @@
+"""
+Idempotent schema upgrades for databases created by older versions.
+
+``Base.metadata.create_all`` creates missing tables but never alters existing
+ones, so columns and indexes added to existing tables are brought in here. Every step
+checks the live schema first, so this is safe to run on every startup and is
+also available as a command::
+
+    python -m app.migrations
+"""
+
+from sqlalchemy import Float, Table, delete, func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from .duplicates import backfill_fingerprints
+from .models import (
+    DAILY_TOTAL_KEY,
+    DAILY_TOTAL_KEY_INDEX,
+    DailyUserCategoryTotal,
+    Transaction,
+    UserBalance,
+)
+from .money import MINOR_UNITS
+from .partitioning import (
+    create_partitions,
+    partition_transactions,
+    partitioning_enabled,
+)
+from .rollups import rebuild_rollups
+from .search import install_search, rebuild_search_index
+
+# Columns that held money as floats before amounts moved to minor units
+MONEY_COLUMNS = (
+    ("transactions", "amount"),
+    ("users", "monthly_budget"),
+    ("budgets", "amount"),
+    ("daily_user_category_totals", "total_amount"),
+    ("user_balances", "lifetime_income"),
+    ("user_balances", "lifetime_expense"),
+    ("user_balances", "month_expense"),
+)
+
+
+def _add_column(conn: Connection, table: str, column: str, ddl: str) -> bool:
+    """
+    Add a column to an existing table unless it is already there.
+    """
+    columns = {col["name"] for col in inspect(conn).get_columns(table)}
+    if column in columns:
+        return False
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    return True
+
+
+def _convert_to_minor_units(conn: Connection, table: str, column: str) -> bool:
+    """
+    Convert a floating-point money column to integer minor units, unless it
+    already holds them.
+    """
+    columns = {col["name"]: col for col in inspect(conn).get_columns(table)}
+    if not isinstance(columns[column]["type"], Float):
+        return False
+
+    if conn.dialect.name == "postgresql":
+        conn.execute(
+            text(
+                f"ALTER TABLE {table} ALTER COLUMN {column} TYPE BIGINT "
+                f"USING round({column}::numeric * {MINOR_UNITS})"
+            )
+        )
+        return True
+
+    # SQLite can't change a column's type, so build a replacement column and
+    # swap it in
+    converted = f"{column}_minor"
+    conn.execute(
+        text(f"ALTER TABLE {table} ADD COLUMN {converted} BIGINT NOT NULL DEFAULT 0")
+    )
+    conn.execute(
+        text(
+            f"UPDATE {table} SET {converted} = "
+            f"CAST(ROUND({column} * {MINOR_UNITS}) AS INTEGER)"
+        )
+    )
+    conn.execute(text(f"ALTER TABLE {table} DROP COLUMN {column}"))
+    conn.execute(text(f"ALTER TABLE {table} RENAME COLUMN {converted} TO {column}"))
+    return True
+
+
+def _create_indexes(conn: Connection, table: Table) -> None:
+    """
+    Create any index declared on a model's table that the database lacks.
+    """
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _has_index(conn: Connection, table: str, name: str) -> bool:
+    if conn.dialect.name == "sqlite":
+        # SQLAlchemy doesn't reflect SQLite expression indexes
+        found = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name"),
+            {"name": name},
+        )
+        return found.first() is not None
+    return name in {index["name"] for index in inspect(conn).get_indexes(table)}
+
+
+def _index_rollup_keys(conn: Connection) -> bool:
+    """
+    Create the unique index rollup upserts target, first rebuilding the
+    rollups of any user with rows it would reject: ones split by racing
+    writers before it existed.
+    """
+    table = DailyUserCategoryTotal.__table__
+    if _has_index(conn, table.name, DAILY_TOTAL_KEY_INDEX.name):
+        return False
+    split = conn.execute(
+        select(DailyUserCategoryTotal.user_id)
+        .group_by(*DAILY_TOTAL_KEY)
+        .having(func.count() > 1)
+        .distinct()
+    )
+    user_ids = [user_id for (user_id,) in split]
+    if user_ids:
+        db = Session(bind=conn)
+        for user_id in user_ids:
+            rebuild_rollups(db, user_id)
+        db.close()
+    DAILY_TOTAL_KEY_INDEX.create(conn)
+    return True
+
+
+def run_migrations(engine: Engine) -> None:
+    """
+    Bring an existing database up to date with the current models.
+    """
+    with engine.begin() as conn:
+        _add_column(conn, "users", "data_version", "INTEGER NOT NULL DEFAULT 0")
+        _add_column(conn, "users", "recurring_due", "DATE")
+        if _add_column(
+            conn, "user_balances", "currencies", "VARCHAR NOT NULL DEFAULT ''"
+        ):
+            # Balances rebuild from the rollups, currencies included, on
+            # their next read
+            conn.execute(delete(UserBalance))
+        for table, column in MONEY_COLUMNS:
+            _convert_to_minor_units(conn, table, column)
+        added_fingerprint = _add_column(
+            conn, "transactions", "fingerprint", "VARCHAR(64)"
+        )
+        if partitioning_enabled(conn.dialect.name):
+            # Rebuilds the table with its indexes the first time, then just
+            # keeps partitions ahead of the calendar
+            partition_transactions(conn)
+            create_partitions(conn)
+        _create_indexes(conn, Transaction.__table__)
+        _index_rollup_keys(conn)
+        if added_fingerprint:
+            backfill_fingerprints(conn)
+        if install_search(conn):
+            rebuild_search_index(conn)
+
+
+if __name__ == "__main__":
+    from .database import Base, engine
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    print("Database schema is up to date")
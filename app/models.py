@@ -3,15 +3,20 @@ from datetime import datetime, timezone
 
 from sqlalchemy import (
     JSON,
+    BigInteger,
     Boolean,
     Column,
     Date,
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     UniqueConstraint,
+    cast,
+    func,
+    literal_column,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -21,11 +26,30 @@ from .database import Base
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Newest-first listing and its keyset cursor; also serves any
+        # (user_id, date) range on its own
+        Index("ix_transactions_user_date_id", "user_id", "date", "id"),
+        # Listing filtered by type or category, in the same order
+        Index("ix_transactions_user_type_date_id", "user_id", "type", "date", "id"),
+        Index(
+            "ix_transactions_user_category_date_id",
+            "user_id",
+            "category_id",
+            "date",
+            "id",
+        ),
+        # Checking whether a category is still in use before deleting it
+        Index("ix_transactions_category_id", "category_id"),
+        # Skipping duplicates on insert (see app.duplicates)
+        Index("ix_transactions_fingerprint", "fingerprint", unique=True),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     category_id = Column(UUID(as_uuid=True), ForeignKey("categories.id"), nullable=True)
-    amount = Column(Float, nullable=False)
+    # Money columns hold integer minor units (pence), see app.money
+    amount = Column(BigInteger, nullable=False)
     description = Column(String, nullable=False)
     date = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     category = Column(String, nullable=False)
@@ -33,6 +57,7 @@ class Transaction(Base):
     account = Column(String, nullable=False)
     currency = Column(String, default="GBP")
     status = Column(String, default="completed")
+    fingerprint = Column(String(64), nullable=True)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = Column(
         DateTime,
@@ -55,9 +80,13 @@ class User(Base):
     last_name = Column(String, nullable=False)
     hashed_password = Column(String, nullable=False)
     currency_preference = Column(String, default="GBP")
-    monthly_budget = Column(Float, nullable=False)
+    monthly_budget = Column(BigInteger, nullable=False)
     is_active = Column(Boolean, default=True)
     is_demo = Column(Boolean, default=False)
+    # Bumped whenever the user's financial data changes (see app.cache)
+    data_version = Column(Integer, nullable=False, default=0)
+    # Earliest next_due of the user's active recurring rules (see app.recurring)
+    recurring_due = Column(Date, nullable=True)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = Column(
         DateTime,
@@ -69,7 +98,9 @@ class User(Base):
     # Relationships
     transactions = relationship("Transaction", back_populates="user")
     budgets = relationship("Budget", back_populates="user")
+    recurring_rules = relationship("RecurringRule", back_populates="user")
     categories = relationship("Category", back_populates="user")
+    category_rules = relationship("CategoryRule", back_populates="user")
     lesson_progress = relationship("LessonProgress", back_populates="user")
     learning_stats = relationship(
         "UserLearningStats", back_populates="user", uselist=False
@@ -79,6 +110,23 @@ class User(Base):
     )
 
 
+class RevokedToken(Base):
+    """
+    A revoked access token (by ``jti``), or every token issued to
+    ``user_id`` up to ``revoked_at`` (see ``app.revocation``).
+    """
+
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    jti = Column(String(36), nullable=True, index=True)
+    # No foreign key: deleting a user revokes their tokens too
+    user_id = Column(UUID(as_uuid=True), nullable=True, index=True)
+    revoked_at = Column(DateTime, nullable=False)
+    # Once every token it covers has expired the row can go
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
 class Category(Base):
     __tablename__ = "categories"
 
@@ -100,16 +148,51 @@ class Category(Base):
     # Relationships
     transactions = relationship("Transaction", back_populates="category")
     budgets = relationship("Budget", back_populates="category")
+    rules = relationship(
+        "CategoryRule", back_populates="category", cascade="all, delete-orphan"
+    )
     user = relationship("User", back_populates="categories")
 
 
+class CategoryRule(Base):
+    """
+    Assigns ``category_id`` to transactions whose description matches
+    ``pattern`` (see ``app.categorisation``). Rules without a user apply to
+    everyone, like default categories.
+    """
+
+    __tablename__ = "category_rules"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(
+        UUID(as_uuid=True), ForeignKey("users.id"), nullable=True, index=True
+    )
+    category_id = Column(
+        UUID(as_uuid=True), ForeignKey("categories.id"), nullable=False
+    )
+    # keyword | merchant | regex
+    kind = Column(String, nullable=False, default="keyword")
+    pattern = Column(String, nullable=False)
+    priority = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(
+        DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    # Relationships
+    user = relationship("User", back_populates="category_rules")
+    category = relationship("Category", back_populates="rules")
+
+
 class Budget(Base):
     __tablename__ = "budgets"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     category_id = Column(UUID(as_uuid=True), ForeignKey("categories.id"), nullable=True)
-    amount = Column(Float, nullable=False)
+    amount = Column(BigInteger, nullable=False)
     period = Column(String, default="monthly")
     start_date = Column(
         DateTime, default=lambda: datetime.now(timezone.utc), nullable=False
@@ -129,6 +212,131 @@ class Budget(Base):
     category = relationship("Category", back_populates="budgets")
 
 
+class DailyUserCategoryTotal(Base):
+    """
+    Per-user daily totals by category, type and currency.
+
+    Maintained alongside transaction writes (see ``app.rollups``) so the
+    dashboard can aggregate a handful of rows per day instead of the ledger.
+    """
+
+    __tablename__ = "daily_user_category_totals"
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id",
+            "day",
+            "category_id",
+            "type",
+            "currency",
+            name="uq_daily_user_category_total",
+        ),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    day = Column(Date, nullable=False)
+    category_id = Column(UUID(as_uuid=True), ForeignKey("categories.id"), nullable=True)
+    type = Column(String, nullable=False)
+    currency = Column(String, nullable=True)
+    total_amount = Column(BigInteger, nullable=False, default=0)
+    transaction_count = Column(Integer, nullable=False, default=0)
+
+
+# A unique constraint treats NULLs as distinct, so the one above never
+# matches an uncategorised or currency-less row; this key compares them
+# equal, for upserts to target (see app.rollups)
+DAILY_TOTAL_KEY = (
+    DailyUserCategoryTotal.user_id,
+    DailyUserCategoryTotal.day,
+    func.coalesce(
+        cast(DailyUserCategoryTotal.category_id, String), literal_column("''")
+    ),
+    DailyUserCategoryTotal.type,
+    func.coalesce(DailyUserCategoryTotal.currency, literal_column("''")),
+)
+DAILY_TOTAL_KEY_INDEX = Index(
+    "ux_daily_user_category_totals_key", *DAILY_TOTAL_KEY, unique=True
+)
+
+
+class UserBalance(Base):
+    """
+    Running lifetime totals for a user plus the expense of one calendar month
+    (``month_key`` as ``YYYY-MM``), kept up to date on transaction writes.
+    """
+
+    __tablename__ = "user_balances"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    lifetime_income = Column(BigInteger, nullable=False, default=0)
+    lifetime_expense = Column(BigInteger, nullable=False, default=0)
+    month_key = Column(String, nullable=True)
+    month_expense = Column(BigInteger, nullable=False, default=0)
+    # Comma-separated currencies the totals include, so they only need
+    # converting when there is more than one (see app.fx)
+    currencies = Column(String, nullable=False, default="")
+    updated_at = Column(
+        DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+
+class FxRate(Base):
+    """
+    Units of ``currency`` per one unit of the base currency on ``day``
+    (see ``app.fx``).
+    """
+
+    __tablename__ = "fx_rates"
+
+    currency = Column(String(3), primary_key=True)
+    day = Column(Date, primary_key=True)
+    rate = Column(Float, nullable=False)
+
+
+class RecurringRule(Base):
+    """
+    A transaction that repeats every ``interval`` days, weeks, months or
+    years from ``start_date``. ``next_due`` is the first occurrence not yet
+    posted (see ``app.recurring``), or null once the rule has ended.
+    """
+
+    __tablename__ = "recurring_rules"
+    __table_args__ = (
+        # Finding due rules for one user on read, and for everyone in the
+        # background pass
+        Index("ix_recurring_rules_user_next_due", "user_id", "next_due"),
+        Index("ix_recurring_rules_next_due", "next_due"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    category_id = Column(UUID(as_uuid=True), ForeignKey("categories.id"), nullable=True)
+    amount = Column(BigInteger, nullable=False)
+    description = Column(String, nullable=False)
+    type = Column(String, nullable=False)
+    account = Column(String, nullable=False)
+    currency = Column(String, default="GBP")
+    # daily | weekly | monthly | yearly
+    frequency = Column(String, nullable=False)
+    interval = Column(Integer, nullable=False, default=1)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=True)
+    next_due = Column(Date, nullable=True)
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(
+        DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    # Relationships
+    user = relationship("User", back_populates="recurring_rules")
+    category = relationship("Category")
+
+
 # ----Learning / gamification models----
 
 
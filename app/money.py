@@ -0,0 +1,45 @@
+"""
+Money amounts in minor units.
+
+Amounts are stored and summed as integer minor units (pence for GBP) so
+totals are exact: adding up thousands of transactions never drifts the way
+floats do, and both the database and NumPy aggregate them as plain
+integers. The API still speaks in major units (pounds), so routers convert
+at the edge with ``to_minor_units`` on the way in and ``from_minor_units``
+on the way out.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Optional, Union
+
+MINOR_UNITS = 100
+
+
+def to_minor_units(amount: Union[float, int, Decimal]) -> int:
+    """
+    Integer minor units from a major-unit amount, rounding half away from
+    zero: ``12.345`` becomes ``1235``.
+    """
+    # Going through str() keeps 0.1 + 0.2 style representation errors from
+    # tipping an amount over a rounding boundary
+    value = Decimal(str(amount)) * MINOR_UNITS
+    return int(value.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_minor_units(value: Optional[Union[int, float]]) -> Optional[float]:
+    """
+    Major-unit amount from minor units. Fractional minor units, such as an
+    average, are kept.
+    """
+    if value is None:
+        return None
+    return value / MINOR_UNITS
+
+
+def format_minor_units(value: int) -> str:
+    """
+    Exact fixed-point text for minor units: ``1235`` becomes ``"12.35"``.
+    """
+    sign = "-" if value < 0 else ""
+    major, minor = divmod(abs(value), MINOR_UNITS)
+    return f"{sign}{major}.{minor:02d}"
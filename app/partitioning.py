@@ -0,0 +1,274 @@
+"""
+Monthly range partitioning of the transactions table on PostgreSQL.
+
+Set ``PARTITION_TRANSACTIONS=1`` and ``app.migrations`` converts the
+transactions table into one partitioned by ``date``, with a partition per
+calendar month plus a default partition for anything outside them.
+PostgreSQL then prunes partitions for date-range filters, so a month's
+listing or a dashboard window only touches the months it covers. Other
+databases, SQLite included, keep the plain table.
+
+Partitions are created ``PARTITION_MONTHS_AHEAD`` months in advance on
+every startup, and old months can be detached into the ``archive`` schema,
+where they stay queryable but leave the live table::
+
+    python -m app.partitioning create
+    python -m app.partitioning archive 2020-01
+
+Archived transactions still count towards the dashboard, whose rollups are
+left as they are, but no longer stop the same rows being imported again.
+
+PostgreSQL requires unique indexes on a partitioned table to include the
+partition key, so the table's primary key becomes ``(id, date)`` and
+duplicate detection uses ``(fingerprint, date)``. A fingerprint already
+covers the transaction's date to the second, so this only matters for
+rows that differ by less than a second.
+"""
+
+import os
+import re
+from datetime import date, datetime, timezone
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+from .models import Transaction
+
+load_dotenv()
+
+PARTITION_TRANSACTIONS = os.getenv("PARTITION_TRANSACTIONS", "").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", 3))
+ARCHIVE_SCHEMA = "archive"
+DEFAULT_PARTITION = "transactions_default"
+# Replaces the model's unique index on fingerprint alone
+FINGERPRINT_INDEX = "ix_transactions_fingerprint"
+
+_PARTITION_NAME = re.compile(r"^transactions_(\d{4})_(\d{2})$")
+
+
+def partitioning_enabled(dialect: str) -> bool:
+    """
+    Whether the transactions table is partitioned on this database.
+    """
+    return PARTITION_TRANSACTIONS and dialect == "postgresql"
+
+
+def duplicate_key(dialect: str) -> List[str]:
+    """
+    Columns of the unique index inserts skip duplicates on.
+    """
+    if partitioning_enabled(dialect):
+        return ["fingerprint", "date"]
+    return ["fingerprint"]
+
+
+def add_months(month: date, months: int) -> date:
+    """
+    The first of the month ``months`` after (or before) ``month``.
+    """
+    year, index = divmod(month.year * 12 + month.month - 1 + months, 12)
+    return date(year, index + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"transactions_{month:%Y_%m}"
+
+
+def is_partitioned(conn: Connection) -> bool:
+    return conn.execute(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = 'transactions' AND pg_table_is_visible(c.oid))"
+        )
+    ).scalar()
+
+
+def monthly_partitions(conn: Connection) -> List[Tuple[str, date]]:
+    """
+    ``(name, month)`` of every monthly partition attached to transactions,
+    oldest first.
+    """
+    names = conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'transactions' AND pg_table_is_visible(p.oid)"
+        )
+    ).scalars()
+    partitions = []
+    for name in names:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            partitions.append((name, date(int(match[1]), int(match[2]), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def create_partition(conn: Connection, month: date) -> bool:
+    """
+    Create the partition for a month unless it exists, moving any of its
+    rows out of the default partition. Returns ``True`` if it was created.
+    """
+    name = partition_name(month)
+    if inspect(conn).has_table(name):
+        return False
+
+    bounds = {"start": month, "end": add_months(month, 1)}
+    ddl = (
+        f"CREATE TABLE {name} PARTITION OF transactions "
+        f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+    )
+    in_range = "date >= :start AND date < :end"
+    stranded = conn.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range})"),
+        bounds,
+    ).scalar()
+    if not stranded:
+        conn.execute(text(ddl))
+        return True
+
+    # The new range can't overlap rows already in the default partition, so
+    # take it out while they move across
+    conn.execute(text(f"ALTER TABLE transactions DETACH PARTITION {DEFAULT_PARTITION}"))
+    conn.execute(text(ddl))
+    columns = ", ".join(column.name for column in Transaction.__table__.columns)
+    conn.execute(
+        text(
+            f"INSERT INTO transactions ({columns}) "
+            f"SELECT {columns} FROM {DEFAULT_PARTITION} WHERE {in_range}"
+        ),
+        bounds,
+    )
+    conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_range}"), bounds)
+    conn.execute(
+        text(f"ALTER TABLE transactions ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT")
+    )
+    return True
+
+
+def create_partitions(
+    conn: Connection,
+    start: Optional[date] = None,
+    months_ahead: int = PARTITION_MONTHS_AHEAD,
+) -> int:
+    """
+    Create monthly partitions from ``start`` (default this month) until
+    ``months_ahead`` months from now. Returns the number created.
+    """
+    this_month = datetime.now(timezone.utc).date().replace(day=1)
+    month = (start or this_month).replace(day=1)
+    created = 0
+    while month <= add_months(this_month, months_ahead):
+        created += create_partition(conn, month)
+        month = add_months(month, 1)
+    return created
+
+
+def partition_transactions(conn: Connection) -> bool:
+    """
+    Rebuild an unpartitioned transactions table as a partitioned one,
+    keeping its rows. Returns ``True`` if the table was converted.
+    """
+    if is_partitioned(conn):
+        return False
+
+    conn.execute(text("ALTER TABLE transactions RENAME TO transactions_unpartitioned"))
+    conn.execute(
+        text(
+            "UPDATE transactions_unpartitioned "
+            "SET date = coalesce(created_at, now()) WHERE date IS NULL"
+        )
+    )
+    conn.execute(
+        text(
+            "CREATE TABLE transactions (LIKE transactions_unpartitioned "
+            "INCLUDING DEFAULTS INCLUDING GENERATED) PARTITION BY RANGE (date)"
+        )
+    )
+    conn.execute(text("ALTER TABLE transactions ALTER COLUMN date SET NOT NULL"))
+    conn.execute(
+        text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF transactions DEFAULT")
+    )
+
+    first = conn.execute(text("SELECT min(date) FROM transactions_unpartitioned"))
+    first = first.scalar()
+    create_partitions(conn, start=first.date() if first else None)
+
+    # Copy before indexing: one index build per partition beats updating
+    # every index row by row
+    columns = ", ".join(column.name for column in Transaction.__table__.columns)
+    conn.execute(
+        text(
+            f"INSERT INTO transactions ({columns}) "
+            f"SELECT {columns} FROM transactions_unpartitioned"
+        )
+    )
+    # Constraint and index names are free again once the old table is gone
+    conn.execute(text("DROP TABLE transactions_unpartitioned"))
+
+    conn.execute(text("ALTER TABLE transactions ADD PRIMARY KEY (id, date)"))
+    for foreign_key in Transaction.__table__.foreign_keys:
+        target = foreign_key.column
+        conn.execute(
+            text(
+                f"ALTER TABLE transactions ADD FOREIGN KEY ({foreign_key.parent.name}) "
+                f"REFERENCES {target.table.name} ({target.name})"
+            )
+        )
+    conn.execute(
+        text(
+            f"CREATE UNIQUE INDEX {FINGERPRINT_INDEX} "
+            "ON transactions (fingerprint, date)"
+        )
+    )
+    for index in Transaction.__table__.indexes:
+        if index.name != FINGERPRINT_INDEX:
+            index.create(conn)
+    return True
+
+
+def archive_partitions(
+    conn: Connection, before: date, schema: str = ARCHIVE_SCHEMA
+) -> List[str]:
+    """
+    Detach every monthly partition ending on or before ``before`` and move
+    it into ``schema``. Returns the names of the archived partitions.
+    """
+    conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema}"))
+    archived = []
+    for name, month in monthly_partitions(conn):
+        if add_months(month, 1) > before:
+            break
+        conn.execute(text(f"ALTER TABLE transactions DETACH PARTITION {name}"))
+        conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {schema}"))
+        archived.append(name)
+    return archived
+
+
+if __name__ == "__main__":
+    import sys
+
+    from .database import engine
+
+    if not partitioning_enabled(engine.dialect.name):
+        print("Partitioning needs PostgreSQL and PARTITION_TRANSACTIONS=1")
+        sys.exit(1)
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "create"
+    with engine.begin() as conn:
+        if command == "create":
+            print(f"Created {create_partitions(conn)} transaction partitions")
+        elif command == "archive" and len(sys.argv) == 3:
+            before = date.fromisoformat(f"{sys.argv[2]}-01")
+            archived = archive_partitions(conn, before)
+            print(f"Archived {len(archived)} transaction partitions")
+        else:
+            print("Usage: python -m app.partitioning [create | archive YYYY-MM]")
+            sys.exit(1)
@@ -0,0 +1,208 @@
+"""
+Cached principals for authenticated requests.
+
+Every authenticated request needs its user, and loading the ``users`` row
+each time doubles the queries of cheap endpoints. ``get_current_user``
+instead keeps a ``Principal`` per token subject: a frozen, detached copy of
+the user's columns (less the password hash) in a bounded in-process LRU
+that expires after ``AUTH_CACHE_TTL_SECONDS``. Most requests then
+authenticate without touching the database. Access tokens carry the user's
+ID and flags themselves (see ``app.revocation``), so requests only need
+the principal for other columns, through a ``TokenUser``.
+
+A user's principal is dropped when a database transaction changing them
+commits: any flush that adds, changes or deletes a ``User``, and any bulk
+update of ``users`` noted with ``app.cache.user_changed`` (data version
+bumps, recurring due dates). A load that overlaps an invalidation isn't
+cached, so a principal is never older than the last commit this process
+saw.
+
+Changes made by other processes (another worker, a cron job, a manual
+``UPDATE``) only show once the entry expires, so keep the TTL short when
+running several workers; ``AUTH_CACHE_TTL_SECONDS=0`` turns caching off.
+Two columns can't wait that long, so they are never cached here:
+``data_version``, which keys shared response caches and ETags, and
+``recurring_due``, which decides whether a read posts due recurring
+transactions first.
+"""
+
+import os
+from dataclasses import dataclass, fields
+from functools import cached_property
+from datetime import date, datetime
+from itertools import chain
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Union
+from uuid import UUID
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .cache import CHANGED_USERS, MemoryBackend
+from .models import User
+from .schemas import TokenData
+
+load_dotenv()
+
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", 30))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", 10_000))
+# Columns other processes change behind the cache, read once per request
+FRESH_COLUMNS = ("data_version", "recurring_due")
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    The authenticated user as endpoints see it. Stands in for ``User``
+    wherever only its columns are read; load the ``User`` to change it.
+    ``FRESH_COLUMNS`` are left out: other workers' writes change them, and
+    requests need their current values (see ``TokenUser``).
+    """
+
+    id: UUID
+    username: str
+    email: str
+    first_name: str
+    last_name: str
+    currency_preference: Optional[str]
+    monthly_budget: int
+    is_active: bool
+    is_demo: bool
+    created_at: Optional[datetime]
+    last_login: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(**{field.name: getattr(user, field.name) for field in fields(cls)})
+
+
+class TokenUser:
+    """
+    The user an access token names. ``id``, ``username``, ``is_active`` and
+    ``is_demo`` come from the token's claims; any other ``Principal`` field
+    loads the principal on first use, which may cost a query.
+    ``FRESH_COLUMNS`` are always read from the database, together and once
+    per request.
+    """
+
+    def __init__(
+        self,
+        token: TokenData,
+        load: Callable[[], Principal],
+        read_fresh: Callable[[], Dict[str, Any]],
+    ):
+        self.id = token.user_id
+        self.username = token.username
+        self.is_active = token.is_active
+        self.is_demo = token.is_demo
+        self._load = load
+        self._read_fresh = read_fresh
+        self._principal: Optional[Principal] = None
+
+    @cached_property
+    def _fresh(self) -> Dict[str, Any]:
+        # Never from the cached principal: writes in another worker change
+        # these without invalidating this process's principals. A stale data
+        # version would serve stale cached responses and 304s, and a stale
+        # due date would skip posting recurring transactions
+        return self._read_fresh()
+
+    def expire(self) -> None:
+        """
+        Read ``FRESH_COLUMNS`` again on next use, after this request changed
+        them.
+        """
+        self.__dict__.pop("_fresh", None)
+
+    @property
+    def data_version(self) -> int:
+        return self._fresh["data_version"]
+
+    @property
+    def recurring_due(self) -> Optional[date]:
+        return self._fresh["recurring_due"]
+
+    def __getattr__(self, name):
+        # Only reached for attributes the claims don't cover
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if self._principal is None:
+            self._principal = self._load()
+        return getattr(self._principal, name)
+
+
+class PrincipalCache:
+    """
+    Principals by username, with invalidation by username or user ID.
+    """
+
+    def __init__(self, max_entries: int, ttl: int):
+        self.ttl = ttl
+        self._principals = MemoryBackend(max_entries, ttl)
+        # User ID -> username, for invalidating by ID
+        self._usernames = MemoryBackend(max_entries, ttl)
+        self._generation = 0
+        self._lock = Lock()
+
+    @property
+    def generation(self) -> int:
+        """
+        Changes on every invalidation; pass it to ``remember``.
+        """
+        return self._generation
+
+    def get(self, username: str) -> Optional[Principal]:
+        return self._principals.get(username) if self.ttl > 0 else None
+
+    def remember(self, user: User, generation: int) -> Principal:
+        """
+        Cache a principal for ``user``, unless something was invalidated
+        since ``generation`` was read (the row may predate the change).
+        """
+        principal = Principal.from_user(user)
+        with self._lock:
+            if self.ttl > 0 and generation == self._generation:
+                self._principals.set(user.username, principal)
+                self._usernames.set(str(user.id), user.username)
+        return principal
+
+    def forget(self, user: Union[UUID, str]) -> None:
+        """
+        Drop a user's principal, by ID or username.
+        """
+        with self._lock:
+            self._generation += 1
+            username = user
+            if isinstance(user, UUID):
+                username = self._usernames.get(str(user))
+                self._usernames.delete(str(user))
+            if username is not None:
+                self._principals.delete(username)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._usernames.clear()
+            self._principals.clear()
+
+
+principals = PrincipalCache(AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_TTL_SECONDS)
+
+
+@event.listens_for(Session, "before_flush")
+def _note_changed_users(session, flush_context, instances):
+    for instance in chain(session.new, session.dirty, session.deleted):
+        if isinstance(instance, User):
+            session.info.setdefault(CHANGED_USERS, set()).add(instance.username)
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_changed_users(session):
+    for user in session.info.pop(CHANGED_USERS, ()):
+        principals.forget(user)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop(CHANGED_USERS, None)
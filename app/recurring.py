@@ -0,0 +1,238 @@
+"""
+Posting recurring transactions.
+
+A ``RecurringRule`` is only a schedule; its occurrences become real
+transactions when they fall due. That happens lazily, just before a user's
+transactions or dashboard are read (``post_due_transactions``), and in a
+background pass over every user that can be run from cron::
+
+    python -m app.recurring
+
+Both paths share ``materialise_due``, which works through due rules a batch
+at a time: every occurrence in a batch is written with a single insert, the
+rules' ``next_due`` dates move on in the same commit, and occurrences carry
+the usual duplicate fingerprint (see ``app.duplicates``), so running it
+twice, or from two places at once, never posts anything twice.
+
+Each user row keeps the earliest ``next_due`` of their active rules in
+``recurring_due`` (kept up to date by ``sync_recurring_due``), so the lazy
+check on a read costs nothing beyond loading the user.
+"""
+
+import calendar
+from collections import Counter, defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
+
+from fastapi import Depends
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from .auth import get_current_active_user
+from .cache import bump_data_version, user_changed
+from .database import get_db
+from .duplicates import fingerprint_rows, insert_new_transactions
+from .models import RecurringRule, User
+from .principals import TokenUser
+from .rollups import record_transaction_rows
+
+FREQUENCIES = ("daily", "weekly", "monthly", "yearly")
+RULE_BATCH_SIZE = 500
+
+
+def occurrence(rule: RecurringRule, n: int) -> date:
+    """
+    The day of a rule's ``n``th occurrence (from 0). Monthly and yearly
+    rules keep their start day, falling back to the end of shorter months.
+    """
+    start = rule.start_date
+    if rule.frequency in ("daily", "weekly"):
+        step = 7 if rule.frequency == "weekly" else 1
+        return start + timedelta(days=n * rule.interval * step)
+
+    months = n * rule.interval * (12 if rule.frequency == "yearly" else 1)
+    year, month = divmod(start.month - 1 + months, 12)
+    year += start.year
+    last_day = calendar.monthrange(year, month + 1)[1]
+    return date(year, month + 1, min(start.day, last_day))
+
+
+def first_occurrence_from(rule: RecurringRule, day: date) -> int:
+    """
+    Index of a rule's first occurrence on or after ``day``.
+    """
+    if day <= rule.start_date:
+        return 0
+    if rule.frequency in ("daily", "weekly"):
+        step = rule.interval * (7 if rule.frequency == "weekly" else 1)
+        n = (day - rule.start_date).days // step
+    else:
+        months = (day.year - rule.start_date.year) * 12
+        months += day.month - rule.start_date.month
+        n = months // (rule.interval * (12 if rule.frequency == "yearly" else 1))
+    while occurrence(rule, n) < day:
+        n += 1
+    return n
+
+
+def next_due_from(rule: RecurringRule, day: date) -> Optional[date]:
+    """
+    A rule's first occurrence on or after ``day``, or ``None`` if it ends
+    before then.
+    """
+    due = occurrence(rule, first_occurrence_from(rule, day))
+    if rule.end_date is not None and due > rule.end_date:
+        return None
+    return due
+
+
+def due_dates(rule: RecurringRule, until: date) -> Tuple[List[date], Optional[date]]:
+    """
+    A rule's unposted occurrences up to and including ``until``, and the
+    ``next_due`` that follows them.
+    """
+    if rule.next_due is None:
+        return [], None
+
+    n = first_occurrence_from(rule, rule.next_due)
+    days = []
+    while True:
+        day = occurrence(rule, n)
+        if rule.end_date is not None and day > rule.end_date:
+            return days, None
+        if day > until:
+            return days, day
+        days.append(day)
+        n += 1
+
+
+def sync_recurring_due(db: Session, user_id: UUID) -> None:
+    """
+    Store the earliest ``next_due`` of a user's active rules on the user
+    (caller is responsible for committing).
+    """
+    earliest = (
+        select(func.min(RecurringRule.next_due))
+        .where(RecurringRule.user_id == user_id, RecurringRule.is_active)
+        .scalar_subquery()
+    )
+    # Bookkeeping, not an edit of the user, so updated_at is kept
+    db.query(User).filter(User.id == user_id).update(
+        {"recurring_due": earliest, "updated_at": User.updated_at},
+        synchronize_session=False,
+    )
+    user_changed(db, user_id)
+
+
+def _post_batch(
+    db: Session, rules: List[RecurringRule], until: date, seen: Dict[UUID, Counter]
+) -> int:
+    """
+    Post every due occurrence of a batch of rules with one insert and move
+    the rules on (caller is responsible for committing). Returns the number
+    of transactions created.
+
+    ``seen`` holds each user's duplicate counter for the whole run, so two
+    identical rules in different batches still post separate transactions.
+    """
+    now = datetime.now(timezone.utc)
+    rows_by_user = defaultdict(list)
+    for rule in rules:
+        days, rule.next_due = due_dates(rule, until)
+        for day in days:
+            rows_by_user[rule.user_id].append(
+                {
+                    "id": uuid4(),
+                    "user_id": rule.user_id,
+                    "category_id": rule.category_id,
+                    "amount": rule.amount,
+                    "description": rule.description,
+                    "date": datetime.combine(day, time()),
+                    "type": rule.type,
+                    "account": rule.account,
+                    "currency": rule.currency,
+                    "status": "completed",
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            )
+
+    db.flush()
+    for user_id in {rule.user_id for rule in rules}:
+        sync_recurring_due(db, user_id)
+
+    rows = []
+    for user_id, user_rows in rows_by_user.items():
+        fingerprint_rows(user_id, user_rows, seen[user_id])
+        rows.extend(user_rows)
+    if not rows:
+        return 0
+
+    inserted = insert_new_transactions(db, rows)
+    for user_id, user_rows in rows_by_user.items():
+        new_rows = [row for row in user_rows if row["id"] in inserted]
+        if new_rows:
+            record_transaction_rows(db, user_id, new_rows)
+            bump_data_version(db, user_id)
+    return len(inserted)
+
+
+def materialise_due(
+    db: Session,
+    until: Optional[date] = None,
+    user_id: Optional[UUID] = None,
+    batch_size: int = RULE_BATCH_SIZE,
+) -> int:
+    """
+    Post every occurrence due by ``until`` (default today, UTC), for one
+    user or everyone, committing after each batch of rules. Returns the
+    number of transactions created.
+    """
+    until = until or datetime.now(timezone.utc).date()
+    due = db.query(RecurringRule).filter(
+        RecurringRule.is_active, RecurringRule.next_due <= until
+    )
+    if user_id is not None:
+        due = due.filter(RecurringRule.user_id == user_id)
+
+    created, last_id, seen = 0, None, defaultdict(Counter)
+    while True:
+        # Rules leave the due set once posted; paging by ID as well means a
+        # rule that somehow didn't move on can't be picked up forever
+        batch = due if last_id is None else due.filter(RecurringRule.id > last_id)
+        rules = batch.order_by(RecurringRule.id).limit(batch_size).all()
+        if not rules:
+            return created
+        created += _post_batch(db, rules, until, seen)
+        db.commit()
+        last_id = rules[-1].id
+
+
+def post_due_transactions(
+    current_user: TokenUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> None:
+    """
+    Dependency for endpoints that read the ledger: posts the user's due
+    recurring transactions first, so reads (and their ETags) never miss one.
+    Costs no query beyond reading the user's due date when nothing is due.
+    """
+    today = datetime.now(timezone.utc).date()
+    if current_user.recurring_due is not None and current_user.recurring_due <= today:
+        materialise_due(db, until=today, user_id=current_user.id)
+        # Posting bumped the data version and moved the due date on
+        current_user.expire()
+
+
+if __name__ == "__main__":
+    from .database import Session as SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(f"Posted {materialise_due(db)} recurring transactions")
+    except Exception as error:
+        db.rollback()
+        print(f"Error posting recurring transactions: {error}")
+    finally:
+        db.close()
@@ -0,0 +1,207 @@
+"""
+Revoked access tokens.
+
+Access tokens carry the user's ID and role flags (see ``app.auth``), so
+they are trusted for their lifetime without loading the user. What can
+still stop a token early is this module's revocation list: logging out
+revokes the one token, by its ``jti``, and deactivating or deleting a user
+revokes every token issued to them so far.
+
+Revocations are written to the ``revoked_tokens`` table. They apply to the
+process that commits them straight away, and other processes pick them up
+when their in-memory list next refreshes from the table, at most every
+``REVOCATION_REFRESH_SECONDS``. Between refreshes checking a token costs
+no query.
+
+A revocation is only kept until every token it covers would have expired
+anyway, so the table holds one token lifetime's worth of logouts.
+
+User-wide revocations compare against the token's issue time, which
+``app.auth`` stores to the microsecond, so logging straight back in after
+a revocation gets a valid token. Older tokens' whole-second issue times
+round down, so they are still covered by a revocation in the same second.
+"""
+
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from dotenv import load_dotenv
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from .models import RevokedToken, User
+from .schemas import TokenData
+
+load_dotenv()
+
+REVOCATION_REFRESH_SECONDS = int(os.getenv("REVOCATION_REFRESH_SECONDS", 10))
+# Lifetime of the tokens app.auth issues, which a user-wide revocation
+# has to outlast
+TOKEN_LIFETIME = timedelta(minutes=int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30)))
+# Session.info key of revocations waiting for their transaction to commit
+PENDING_REVOCATIONS = "pending_revocations"
+
+# (jti, user_id, revoked_at, expires_at)
+Revocation = Tuple[Optional[str], Optional[UUID], datetime, datetime]
+
+
+def _naive_utc(moment: datetime) -> datetime:
+    """
+    ``moment`` as naive UTC, the way SQLite returns stored datetimes.
+    """
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+class RevocationList:
+    """
+    Revoked token IDs, and per user the time up to which tokens are revoked,
+    refreshed from ``revoked_tokens`` every ``refresh_seconds``.
+    """
+
+    def __init__(self, refresh_seconds: int):
+        self.refresh_seconds = refresh_seconds
+        # jti -> expiry
+        self._tokens: Dict[str, datetime] = {}
+        # User ID -> (revoked up to, expiry)
+        self._users: Dict[UUID, Tuple[datetime, datetime]] = {}
+        self._next_refresh = 0.0
+        self._lock = Lock()
+
+    def is_revoked(self, token: TokenData) -> bool:
+        if token.jti is not None and token.jti in self._tokens:
+            return True
+        revoked = self._users.get(token.user_id)
+        if revoked is None:
+            return False
+        # Tokens without an issue time predate every revocation
+        return token.issued_at is None or _naive_utc(token.issued_at) <= revoked[0]
+
+    def add(self, revocations: List[Revocation]) -> None:
+        with self._lock:
+            for jti, user_id, revoked_at, expires_at in revocations:
+                expires_at = _naive_utc(expires_at)
+                if jti is not None:
+                    self._tokens[jti] = expires_at
+                if user_id is not None:
+                    revoked_at = _naive_utc(revoked_at)
+                    previous = self._users.get(user_id)
+                    if previous is None or previous[0] < revoked_at:
+                        self._users[user_id] = (revoked_at, expires_at)
+
+    def refresh(self, db: Session, force: bool = False) -> None:
+        """
+        Load revocations committed by other processes, if the last refresh
+        is ``refresh_seconds`` old (or ``force``). Entries are only ever
+        added or expired, so a refresh can't undo a newer local revocation.
+        """
+        now = time.monotonic()
+        if not force and now < self._next_refresh:
+            return
+        # Set first, so concurrent requests don't all refresh at once
+        self._next_refresh = now + self.refresh_seconds
+
+        utc_now = _naive_utc(datetime.now(timezone.utc))
+        rows = (
+            db.query(
+                RevokedToken.jti,
+                RevokedToken.user_id,
+                RevokedToken.revoked_at,
+                RevokedToken.expires_at,
+            )
+            .filter(RevokedToken.expires_at > utc_now)
+            .all()
+        )
+        self.add([tuple(row) for row in rows])
+        with self._lock:
+            self._tokens = {
+                jti: expires
+                for jti, expires in self._tokens.items()
+                if expires > utc_now
+            }
+            self._users = {
+                user_id: revoked
+                for user_id, revoked in self._users.items()
+                if revoked[1] > utc_now
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tokens = {}
+            self._users = {}
+            self._next_refresh = 0.0
+
+
+revocations = RevocationList(REVOCATION_REFRESH_SECONDS)
+
+
+def _record(db: Session, jti: Optional[str], user_id: Optional[UUID], expires_at):
+    revoked_at = datetime.now(timezone.utc)
+    db.add(
+        RevokedToken(
+            jti=jti, user_id=user_id, revoked_at=revoked_at, expires_at=expires_at
+        )
+    )
+    db.info.setdefault(PENDING_REVOCATIONS, []).append(
+        (jti, user_id, revoked_at, expires_at)
+    )
+
+
+def _revoke_user(db: Session, user_id: UUID) -> None:
+    _record(db, None, user_id, datetime.now(timezone.utc) + TOKEN_LIFETIME)
+
+
+def _prune(db: Session) -> None:
+    db.query(RevokedToken).filter(
+        RevokedToken.expires_at <= _naive_utc(datetime.now(timezone.utc))
+    ).delete(synchronize_session=False)
+
+
+def revoke_token(db: Session, jti: str, expires_at: datetime) -> None:
+    """
+    Revoke one token. Takes effect when the caller commits.
+    """
+    _prune(db)
+    _record(db, jti, None, expires_at)
+
+
+def revoke_user_tokens(db: Session, user_id: UUID) -> None:
+    """
+    Revoke every token issued to a user so far. Takes effect when the
+    caller commits; tokens issued afterwards are unaffected.
+    """
+    _prune(db)
+    _revoke_user(db, user_id)
+
+
+@event.listens_for(Session, "before_flush")
+def _revoke_deactivated_users(session, flush_context, instances):
+    # Bulk updates of users.is_active bypass this; use revoke_user_tokens
+    for instance in chain(session.dirty, session.deleted):
+        if not isinstance(instance, User):
+            continue
+        deleted = instance in session.deleted
+        deactivated = (
+            not instance.is_active
+            and inspect(instance).attrs.is_active.history.has_changes()
+        )
+        if deleted or deactivated:
+            _revoke_user(session, instance.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_revocations(session):
+    pending = session.info.pop(PENDING_REVOCATIONS, None)
+    if pending:
+        revocations.add(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_revocations(session):
+    session.info.pop(PENDING_REVOCATIONS, None)
@@ -0,0 +1,483 @@
+"""
+Daily per-user transaction rollups for the dashboard.
+
+Every transaction write stages a matching change to the
+``daily_user_category_totals`` table and the user's running ``user_balances``
+record in the same database transaction, so dashboard queries read at most
+one row per day/category (or a single balance row) instead of rescanning the
+ledger. Amounts are integer minor units, like the transactions they sum
+(see ``app.money``). ``rebuild_rollups`` recomputes the rollups from scratch and is exposed
+as a command for backfills::
+
+    python -m app.rollups
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+from uuid import UUID
+
+from sqlalchemy import Date, case, func, insert, literal
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Query, Session
+
+from .archive import archived_users, load_archive
+from .models import DAILY_TOTAL_KEY, DailyUserCategoryTotal, Transaction, UserBalance
+
+# Columns identifying a rollup row
+ROLLUP_KEY = ("user_id", "day", "category_id", "type", "currency")
+
+
+def transaction_day(value: datetime) -> date:
+    """
+    The UTC calendar day a transaction date falls on.
+
+    SQLite hands back naive datetimes which are already UTC.
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def _month_key(day: date) -> str:
+    return day.strftime("%Y-%m")
+
+
+def adjust_rollups(db: Session, user_id: UUID, changes: List[dict]) -> None:
+    """
+    Add each change's ``total_amount`` and ``transaction_count`` (either may
+    be negative) to the rollup row with its ``day``, ``category_id``,
+    ``type`` and ``currency``, creating rows on first use, in one statement
+    (caller is responsible for committing).
+    """
+    if not changes:
+        return
+    rows = [{**change, "user_id": user_id} for change in changes]
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        # Add and create in one statement, so concurrent writers neither
+        # overwrite each other nor race to create the same row
+        module = sqlite if dialect == "sqlite" else postgresql
+        statement = module.insert(DailyUserCategoryTotal)
+        statement = statement.on_conflict_do_update(
+            index_elements=DAILY_TOTAL_KEY,
+            set_={
+                "total_amount": DailyUserCategoryTotal.total_amount
+                + statement.excluded.total_amount,
+                "transaction_count": DailyUserCategoryTotal.transaction_count
+                + statement.excluded.transaction_count,
+            },
+        )
+        db.execute(statement, rows)
+    else:
+        for row in rows:
+            _update_or_insert_rollup(db, row)
+
+    if any(row["transaction_count"] < 0 for row in rows):
+        # Drop rows that no longer cover any transactions
+        db.query(DailyUserCategoryTotal).filter(
+            DailyUserCategoryTotal.user_id == user_id,
+            DailyUserCategoryTotal.transaction_count <= 0,
+        ).delete(synchronize_session=False)
+
+
+def _update_or_insert_rollup(db: Session, row: dict) -> None:
+    """
+    ``adjust_rollups`` for databases without ``ON CONFLICT``.
+    """
+    updated = (
+        db.query(DailyUserCategoryTotal)
+        .filter(
+            *(
+                getattr(DailyUserCategoryTotal, column) == row[column]
+                for column in ROLLUP_KEY
+            )
+        )
+        .update(
+            {
+                "total_amount": DailyUserCategoryTotal.total_amount
+                + row["total_amount"],
+                "transaction_count": DailyUserCategoryTotal.transaction_count
+                + row["transaction_count"],
+            },
+            synchronize_session=False,
+        )
+    )
+    if not updated:
+        db.execute(insert(DailyUserCategoryTotal), [row])
+
+
+def adjust_rollup(
+    db: Session,
+    user_id: UUID,
+    day: date,
+    category_id: Optional[UUID],
+    type: str,
+    currency: Optional[str],
+    amount: int,
+    count: int,
+) -> None:
+    """
+    Add ``amount`` and ``count`` (either may be negative) to a single rollup
+    row, creating it on first use (caller is responsible for committing).
+    """
+    adjust_rollups(
+        db,
+        user_id,
+        [
+            {
+                "day": day,
+                "category_id": category_id,
+                "type": type,
+                "currency": currency,
+                "total_amount": amount,
+                "transaction_count": count,
+            }
+        ],
+    )
+
+
+def refresh_balance(db: Session, user_id: UUID) -> UserBalance:
+    """
+    Recompute a user's running balance from their rollups, tracking the
+    current month (caller is responsible for committing).
+    """
+    start_of_month = datetime.now(timezone.utc).date().replace(day=1)
+    next_month = (start_of_month + timedelta(days=32)).replace(day=1)
+
+    totals, currencies = defaultdict(int), set()
+    for type, currency, total in (
+        db.query(
+            DailyUserCategoryTotal.type,
+            DailyUserCategoryTotal.currency,
+            func.sum(DailyUserCategoryTotal.total_amount),
+        )
+        .filter(DailyUserCategoryTotal.user_id == user_id)
+        .group_by(DailyUserCategoryTotal.type, DailyUserCategoryTotal.currency)
+    ):
+        totals[type] += int(total or 0)
+        if currency:
+            currencies.add(currency)
+    month_expense = (
+        db.query(func.sum(DailyUserCategoryTotal.total_amount))
+        .filter(
+            DailyUserCategoryTotal.user_id == user_id,
+            DailyUserCategoryTotal.type == "expense",
+            DailyUserCategoryTotal.day >= start_of_month,
+            DailyUserCategoryTotal.day < next_month,
+        )
+        .scalar()
+    )
+
+    balance = db.get(UserBalance, user_id)
+    if balance is None:
+        balance = UserBalance(user_id=user_id)
+        db.add(balance)
+
+    balance.lifetime_income = totals["income"]
+    balance.lifetime_expense = totals["expense"]
+    balance.currencies = ",".join(sorted(currencies))
+    balance.month_key = _month_key(start_of_month)
+    balance.month_expense = int(month_expense or 0)
+    db.flush()
+    return balance
+
+
+def _with_currency(currency: str):
+    """
+    SQL for the balance's currency list with ``currency`` added if missing.
+    """
+    listed = (literal(",") + UserBalance.currencies + ",").contains(
+        f",{currency},", autoescape=True
+    )
+    return case(
+        (listed, UserBalance.currencies),
+        (UserBalance.currencies == "", currency),
+        else_=UserBalance.currencies + f",{currency}",
+    )
+
+
+def adjust_balance(
+    db: Session,
+    user_id: UUID,
+    day: date,
+    type: str,
+    amount: int,
+    currency: Optional[str] = None,
+) -> None:
+    """
+    Add ``amount`` (may be negative) to a user's running balance. The month
+    total only moves when ``day`` falls in the month the balance is tracking;
+    a stale month is recomputed on the next read.
+    """
+    if type == "income":
+        values = {"lifetime_income": UserBalance.lifetime_income + amount}
+    elif type == "expense":
+        values = {
+            "lifetime_expense": UserBalance.lifetime_expense + amount,
+            "month_expense": case(
+                (
+                    UserBalance.month_key == _month_key(day),
+                    UserBalance.month_expense + amount,
+                ),
+                else_=UserBalance.month_expense,
+            ),
+        }
+    else:
+        return
+    if currency:
+        values["currencies"] = _with_currency(currency)
+
+    updated = (
+        db.query(UserBalance)
+        .filter(UserBalance.user_id == user_id)
+        .update(values, synchronize_session=False)
+    )
+    if not updated:
+        # First write for this user: build the balance from the rollups,
+        # which already include this change
+        refresh_balance(db, user_id)
+
+
+def get_balance(db: Session, user_id: UUID) -> UserBalance:
+    """
+    Fetch a user's running balance, building it on first use and
+    recomputing it once the month it tracks has rolled over.
+    """
+    balance = db.get(UserBalance, user_id)
+    current_month = _month_key(datetime.now(timezone.utc).date())
+
+    if balance is None or balance.month_key != current_month:
+        balance = refresh_balance(db, user_id)
+        db.commit()
+    return balance
+
+
+def record_transaction(db: Session, transaction: Transaction, sign: int = 1) -> None:
+    """
+    Stage the rollup and balance changes for adding (``sign=1``) or removing
+    (``sign=-1``) a transaction. Updates are recorded as a removal of the old
+    values followed by an addition of the new ones.
+    """
+    day = transaction_day(transaction.date)
+    amount = sign * transaction.amount
+
+    adjust_rollup(
+        db,
+        user_id=transaction.user_id,
+        day=day,
+        category_id=transaction.category_id,
+        type=transaction.type,
+        currency=transaction.currency,
+        amount=amount,
+        count=sign,
+    )
+    adjust_balance(
+        db, transaction.user_id, day, transaction.type, amount, transaction.currency
+    )
+
+
+class _Deltas:
+    """
+    Rollup and balance changes for many transactions, merged so each
+    day/category row and each month/type/currency balance is adjusted once.
+    """
+
+    def __init__(self):
+        self.rollups = defaultdict(lambda: [0, 0])
+        self.balances = defaultdict(int)
+
+    def add(
+        self,
+        day: date,
+        category_id: Optional[UUID],
+        type: str,
+        currency: Optional[str],
+        amount: int,
+        count: int,
+    ) -> None:
+        totals = self.rollups[(day, category_id, type, currency)]
+        totals[0] += amount
+        totals[1] += count
+        self.balances[(day.replace(day=1), type, currency)] += amount
+
+    def stage(self, db: Session, user_id: UUID) -> None:
+        """
+        Apply the merged changes (caller is responsible for committing).
+        """
+        adjust_rollups(
+            db,
+            user_id,
+            [
+                {
+                    **dict(zip(ROLLUP_KEY[1:], key)),
+                    "total_amount": amount,
+                    "transaction_count": count,
+                }
+                for key, (amount, count) in self.rollups.items()
+                if amount or count
+            ],
+        )
+
+        if db.get(UserBalance, user_id) is None:
+            # Built from the rollups, which already include these changes
+            refresh_balance(db, user_id)
+            return
+        for (month, type, currency), amount in self.balances.items():
+            if amount:
+                adjust_balance(db, user_id, month, type, amount, currency)
+
+
+def record_transaction_rows(db: Session, user_id: UUID, rows: List[dict]) -> None:
+    """
+    Stage rollup and balance changes for a batch of newly inserted
+    transaction rows (plain column dicts), one update per affected
+    day/category rather than per row.
+    """
+    deltas = _Deltas()
+    for row in rows:
+        deltas.add(
+            transaction_day(row["date"]),
+            row["category_id"],
+            row["type"],
+            row["currency"],
+            row["amount"],
+            1,
+        )
+    deltas.stage(db, user_id)
+
+
+def transaction_groups(query: Query) -> list:
+    """
+    Rollup-shaped totals of the transactions a query selects: one row of
+    ``(day, category_id, type, currency, total_amount, transaction_count)``
+    per rollup the transactions count towards.
+    """
+    return (
+        query.with_entities(
+            func.date(Transaction.date, type_=Date).label("day"),
+            Transaction.category_id,
+            Transaction.type,
+            Transaction.currency,
+            func.sum(Transaction.amount).label("total_amount"),
+            func.count(Transaction.id).label("transaction_count"),
+        )
+        .order_by(None)
+        .group_by(
+            func.date(Transaction.date),
+            Transaction.category_id,
+            Transaction.type,
+            Transaction.currency,
+        )
+        .all()
+    )
+
+
+def record_transaction_groups(
+    db: Session, user_id: UUID, groups: list, changes: Optional[dict] = None
+) -> None:
+    """
+    Stage rollup and balance changes for a set-based update or delete of the
+    transactions summarised by ``groups`` (see ``transaction_groups``, taken
+    before the change).
+
+    ``changes`` maps any of ``category_id``, ``type`` and ``currency`` to
+    the value every transaction is being given; without it the transactions
+    are being deleted.
+    """
+    deltas = _Deltas()
+    for group in groups:
+        key = {
+            "category_id": group.category_id,
+            "type": group.type,
+            "currency": group.currency,
+        }
+        total, count = int(group.total_amount), int(group.transaction_count)
+        deltas.add(group.day, **key, amount=-total, count=-count)
+        if changes is not None:
+            key.update((field, changes[field]) for field in key if field in changes)
+            deltas.add(group.day, **key, amount=total, count=count)
+    deltas.stage(db, user_id)
+
+
+def _rollup_key(row: dict) -> tuple:
+    return tuple(row[column] for column in ROLLUP_KEY)
+
+
+def rebuild_rollups(db: Session, user_id: Optional[UUID] = None) -> int:
+    """
+    Recompute rollups from the transactions table and the archives of older
+    transactions (see ``app.archive``), for one user or everyone.
+
+    Running balances are dropped and rebuilt from the new rollups on their
+    next read. Returns the number of rollup rows written (caller is
+    responsible for committing).
+    """
+    balances = db.query(UserBalance)
+    existing = db.query(DailyUserCategoryTotal)
+    ledger = db.query(
+        Transaction.user_id,
+        func.date(Transaction.date, type_=Date).label("day"),
+        Transaction.category_id,
+        Transaction.type,
+        Transaction.currency,
+        func.sum(Transaction.amount).label("total_amount"),
+        func.count(Transaction.id).label("transaction_count"),
+    )
+    if user_id is not None:
+        balances = balances.filter(UserBalance.user_id == user_id)
+        existing = existing.filter(DailyUserCategoryTotal.user_id == user_id)
+        ledger = ledger.filter(Transaction.user_id == user_id)
+
+    balances.delete(synchronize_session=False)
+    existing.delete(synchronize_session=False)
+
+    rows = {}
+    for row in ledger.group_by(
+        Transaction.user_id,
+        func.date(Transaction.date),
+        Transaction.category_id,
+        Transaction.type,
+        Transaction.currency,
+    ):
+        row = row._asdict()
+        rows[_rollup_key(row)] = row
+
+    for archived_user in [user_id] if user_id is not None else archived_users():
+        archive = load_archive(archived_user)
+        for group in archive.rollup_groups(archived_user) if archive else ():
+            row = rows.setdefault(_rollup_key(group), group)
+            if row is not group:
+                row["total_amount"] += group["total_amount"]
+                row["transaction_count"] += group["transaction_count"]
+
+    rows = list(rows.values())
+    if rows:
+        db.execute(insert(DailyUserCategoryTotal), rows)
+    return len(rows)
+
+
+def ensure_rollups(db: Session) -> None:
+    """
+    Backfill rollups for databases that predate them.
+    """
+    has_rollups = db.query(DailyUserCategoryTotal.id).first() is not None
+    has_transactions = db.query(Transaction.id).first() is not None
+    if has_transactions and not has_rollups:
+        rebuild_rollups(db)
+        db.commit()
+
+
+if __name__ == "__main__":
+    from .database import Session as SessionLocal
+
+    db = SessionLocal()
+    try:
+        written = rebuild_rollups(db)
+        db.commit()
+        print(f"Rebuilt {written} daily rollup rows")
+    except Exception as error:
+        db.rollback()
+        print(f"Error rebuilding rollups: {error}")
+    finally:
+        db.close()
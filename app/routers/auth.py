@@ -4,21 +4,36 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
-from app.schemas import Token, UserCreate, UserResponse
+from app.schemas import Token, TokenData, UserCreate, UserResponse
 
 from ..auth import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
     create_access_token,
     get_current_active_user,
+    get_current_user,
     get_password_hash,
+    get_token_data,
+    token_claims,
     verify_password,
 )
 from ..database import get_db
 from ..models import User
+from ..money import from_minor_units, to_minor_units
+from ..principals import TokenUser
+from ..revocation import revoke_token, revoke_user_tokens
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
+def user_to_response(user: User) -> UserResponse:
+    """
+    Convert User model to response, with the budget in major units
+    """
+    return UserResponse.model_validate(user).model_copy(
+        update={"monthly_budget": from_minor_units(user.monthly_budget)}
+    )
+
+
 @router.post(
     "/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED
 )
@@ -47,14 +62,14 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
         first_name=user.first_name,
         last_name=user.last_name,
         currency_preference=user.currency_preference,
-        monthly_budget=user.monthly_budget,
+        monthly_budget=to_minor_units(user.monthly_budget),
     )
 
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
 
-    return new_user
+    return user_to_response(new_user)
 
 
 @router.post("/login", response_model=Token)
@@ -87,7 +102,7 @@ def login(
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data=token_claims(user), expires_delta=access_token_expires
     )
 
     return {"access_token": access_token, "token_type": "bearer"}
@@ -105,12 +120,41 @@ def demo_login(db: Session = Depends(get_db)):
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": demo_user.username}, expires_delta=access_token_expires
+        data=token_claims(demo_user), expires_delta=access_token_expires
     )
 
     return {"access_token": access_token, "token_type": "bearer"}
 
 
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(
+    token_data: TokenData = Depends(get_token_data),
+    current_user: TokenUser = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Revoke the token this request was made with
+    """
+    if token_data.jti is not None:
+        revoke_token(db, token_data.jti, token_data.expires_at)
+    else:
+        # Tokens without an ID can only be revoked along with the user's others
+        revoke_user_tokens(db, current_user.id)
+    db.commit()
+
+
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_active_user)):
-    return current_user
+def get_current_user_info(
+    current_user: TokenUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    The user's profile, read from their row rather than the principal cache,
+    which can lag behind changes made by other workers
+    """
+    user = db.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+        )
+    return user_to_response(user)
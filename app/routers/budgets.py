@@ -2,12 +2,16 @@ from datetime import datetime, timezone
 from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 
 from app.auth import get_current_active_user
+from app.cache import bump_data_version, not_modified, user_etag
 from app.database import get_db
-from app.models import Budget, Category, User
+from app.fields import FieldSelection, projection, sparse_response
+from app.models import Budget, Category
+from app.money import from_minor_units, to_minor_units
+from app.principals import TokenUser
 from app.schemas import BudgetCreate, BudgetResponse, BudgetUpdate
 
 router = APIRouter(prefix="/budgets", tags=["Budgets"])
@@ -25,7 +29,16 @@ def _as_aware(dt: Optional[datetime]) -> Optional[datetime]:
     return dt
 
 
-def _validate_category(db: Session, category_id: UUID, user: User) -> None:
+def budget_to_response(budget: Budget) -> BudgetResponse:
+    """
+    Convert Budget model to response, with the amount in major units
+    """
+    return BudgetResponse.model_validate(budget).model_copy(
+        update={"amount": from_minor_units(budget.amount)}
+    )
+
+
+def _validate_category(db: Session, category_id: UUID, user: TokenUser) -> None:
     """
     Ensure a referenced category exists and is usable by the user.
     """
@@ -46,33 +59,62 @@ def _validate_category(db: Session, category_id: UUID, user: User) -> None:
 
 @router.get("/", response_model=List[BudgetResponse])
 def get_budgets(
+    request: Request,
+    response: Response,
     is_active: Optional[bool] = Query(None, description="Filter by active status"),
     category_id: Optional[UUID] = Query(None, description="Filter by category"),
-    current_user: User = Depends(get_current_active_user),
+    fields: Optional[List[str]] = Depends(FieldSelection(BudgetResponse)),
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
     Get all budgets for the current user with optional filtering
+
+    ``fields`` returns only the named fields of each budget, loading just
+    those columns.
     """
-    query = db.query(Budget).filter(Budget.user_id == current_user.id)
+    params = {"is_active": is_active, "category_id": category_id, "fields": fields}
+    etag = user_etag(current_user, "budgets", params)
+    unchanged = not_modified(request, response, etag)
+    if unchanged:
+        return unchanged
+
+    query = (
+        db.query(Budget) if fields is None else db.query(*projection(Budget, fields))
+    )
+    query = query.filter(Budget.user_id == current_user.id)
 
     if is_active is not None:
         query = query.filter(Budget.is_active == is_active)
     if category_id:
         query = query.filter(Budget.category_id == category_id)
 
-    return query.all()
+    if fields is None:
+        return [budget_to_response(budget) for budget in query.all()]
+
+    budgets = [row._asdict() for row in query]
+    if "amount" in fields:
+        for budget in budgets:
+            budget["amount"] = from_minor_units(budget["amount"])
+    return sparse_response(budgets, fields, response)
 
 
 @router.get("/{budget_id}", response_model=BudgetResponse)
 def get_budget(
     budget_id: UUID,
-    current_user: User = Depends(get_current_active_user),
+    request: Request,
+    response: Response,
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
     Get a specific budget by ID
     """
+    etag = user_etag(current_user, "budget", {"id": budget_id})
+    unchanged = not_modified(request, response, etag)
+    if unchanged:
+        return unchanged
+
     budget = (
         db.query(Budget)
         .filter(Budget.id == budget_id, Budget.user_id == current_user.id)
@@ -85,13 +127,13 @@ def get_budget(
             detail=f"Budget with id {budget_id} not found",
         )
 
-    return budget
+    return budget_to_response(budget)
 
 
 @router.post("/", response_model=BudgetResponse, status_code=status.HTTP_201_CREATED)
 def create_budget(
     budget: BudgetCreate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
@@ -100,20 +142,23 @@ def create_budget(
     if budget.category_id is not None:
         _validate_category(db, budget.category_id, current_user)
 
-    new_budget = Budget(**budget.model_dump(), user_id=current_user.id)
+    budget_data = budget.model_dump()
+    budget_data["amount"] = to_minor_units(budget.amount)
+    new_budget = Budget(**budget_data, user_id=current_user.id)
 
     db.add(new_budget)
+    bump_data_version(db, current_user.id)
     db.commit()
     db.refresh(new_budget)
 
-    return new_budget
+    return budget_to_response(new_budget)
 
 
 @router.put("/{budget_id}", response_model=BudgetResponse)
 def update_budget(
     budget_id: UUID,
     budget_update: BudgetUpdate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
@@ -132,6 +177,8 @@ def update_budget(
         )
 
     update_data = budget_update.model_dump(exclude_unset=True)
+    if update_data.get("amount") is not None:
+        update_data["amount"] = to_minor_units(update_data["amount"])
 
     if update_data.get("category_id") is not None:
         _validate_category(db, update_data["category_id"], current_user)
@@ -147,19 +194,20 @@ def update_budget(
 
     for field, value in update_data.items():
         setattr(budget, field, value)
+    bump_data_version(db, current_user.id)
 
     budget.updated_at = datetime.now(timezone.utc)
 
     db.commit()
     db.refresh(budget)
 
-    return budget
+    return budget_to_response(budget)
 
 
 @router.delete("/{budget_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_budget(
     budget_id: UUID,
-    current_user: User = Depends(get_current_active_user),
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
@@ -178,6 +226,7 @@ def delete_budget(
         )
 
     db.delete(budget)
+    bump_data_version(db, current_user.id)
     db.commit()
 
     return None
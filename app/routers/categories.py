@@ -1,24 +1,47 @@
 from typing import List
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from app.auth import get_current_active_user
+from app.cache import bump_data_version, content_etag, not_modified, user_etag
 from app.database import get_db
-from app.models import Category, Transaction, User
+from app.models import Category, Transaction
+from app.principals import TokenUser
 from app.schemas import CategoryCreate, CategoryResponse, CategoryUpdate
 
 router = APIRouter(prefix="/categories", tags=["Categories"])
 
 
+def _defaults_signature(db: Session) -> list:
+    """
+    Count and latest change time of the default categories, shared by every
+    user and so outside their data version. Any edit, addition or removal
+    changes the result.
+    """
+    defaults = select(func.count(Category.id), func.max(Category.updated_at)).where(
+        Category.is_default
+    )
+    return list(db.execute(defaults).one())
+
+
 @router.get("/", response_model=List[CategoryResponse])
 def get_categories(
-    current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    current_user: TokenUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
 ):
     """
     Get all default and user categories
     """
+    etag = content_etag(_defaults_signature(db), user_etag(current_user, "categories"))
+    unchanged = not_modified(request, response, etag)
+    if unchanged:
+        return unchanged
+
     categories = (
         db.query(Category)
         .filter((Category.is_default) | (Category.user_id == current_user.id))
@@ -31,12 +54,22 @@ def get_categories(
 @router.get("/{category_id}", response_model=CategoryResponse)
 def get_category(
     category_id: UUID,
-    current_user: User = Depends(get_current_active_user),
+    request: Request,
+    response: Response,
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
     Get specific category by ID
     """
+    etag = content_etag(
+        _defaults_signature(db),
+        user_etag(current_user, "category", {"id": category_id}),
+    )
+    unchanged = not_modified(request, response, etag)
+    if unchanged:
+        return unchanged
+
     category = (
         db.query(Category)
         .filter(
@@ -58,7 +91,7 @@ def get_category(
 @router.post("/", response_model=CategoryResponse, status_code=status.HTTP_201_CREATED)
 def create_category(
     category: CategoryCreate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
@@ -86,6 +119,7 @@ def create_category(
     )
 
     db.add(new_category)
+    bump_data_version(db, current_user.id)
     db.commit()
     db.refresh(new_category)
 
@@ -96,7 +130,7 @@ def create_category(
 def update_category(
     category_id: UUID,
     category_update: CategoryUpdate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
@@ -142,6 +176,7 @@ def update_category(
 
     for field, value in update_data.items():
         setattr(category, field, value)
+    bump_data_version(db, current_user.id)
 
     db.commit()
     db.refresh(category)
@@ -152,7 +187,7 @@ def update_category(
 @router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_category(
     category_id: UUID,
-    current_user: User = Depends(get_current_active_user),
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
@@ -188,6 +223,7 @@ def delete_category(
         )
 
     db.delete(category)
+    bump_data_version(db, current_user.id)
     db.commit()
 
     return None
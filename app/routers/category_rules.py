@@ -0,0 +1,175 @@
+from datetime import datetime, timezone
+from typing import List
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.auth import get_current_active_user
+from app.categorisation import validate_rule_pattern
+from app.database import get_db
+from app.models import Category, CategoryRule
+from app.principals import TokenUser
+from app.schemas import CategoryRuleCreate, CategoryRuleResponse, CategoryRuleUpdate
+
+router = APIRouter(prefix="/category-rules", tags=["Category rules"])
+
+
+def _validate_category(db: Session, category_id: UUID, user: TokenUser) -> None:
+    """
+    Ensure a referenced category exists and is usable by the user.
+    """
+    category = (
+        db.query(Category)
+        .filter(
+            Category.id == category_id,
+            (Category.is_default) | (Category.user_id == user.id),
+        )
+        .first()
+    )
+    if not category:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Category with id {category_id} not found",
+        )
+
+
+def _validate_pattern(kind: str, pattern: str) -> None:
+    try:
+        validate_rule_pattern(kind, pattern)
+    except ValueError as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+
+
+def _get_own_rule(db: Session, rule_id: UUID, user: TokenUser) -> CategoryRule:
+    rule = (
+        db.query(CategoryRule)
+        .filter(CategoryRule.id == rule_id, CategoryRule.user_id == user.id)
+        .first()
+    )
+    if not rule:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Category rule with id {rule_id} not found",
+        )
+    return rule
+
+
+@router.get("/", response_model=List[CategoryRuleResponse])
+def get_category_rules(
+    current_user: TokenUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Get the global and the user's category rules, highest priority first
+    """
+    return (
+        db.query(CategoryRule)
+        .filter(
+            (CategoryRule.user_id == current_user.id) | CategoryRule.user_id.is_(None)
+        )
+        .order_by(
+            CategoryRule.priority.desc(),
+            CategoryRule.user_id.is_(None),
+            CategoryRule.created_at,
+        )
+        .all()
+    )
+
+
+@router.get("/{rule_id}", response_model=CategoryRuleResponse)
+def get_category_rule(
+    rule_id: UUID,
+    current_user: TokenUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Get a specific category rule by ID
+    """
+    rule = (
+        db.query(CategoryRule)
+        .filter(
+            CategoryRule.id == rule_id,
+            (CategoryRule.user_id == current_user.id) | CategoryRule.user_id.is_(None),
+        )
+        .first()
+    )
+    if not rule:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Category rule with id {rule_id} not found",
+        )
+    return rule
+
+
+@router.post(
+    "/", response_model=CategoryRuleResponse, status_code=status.HTTP_201_CREATED
+)
+def create_category_rule(
+    rule: CategoryRuleCreate,
+    current_user: TokenUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Create a category rule
+
+    Transactions created or imported without a category from now on are
+    given the category of the best matching rule.
+    """
+    _validate_category(db, rule.category_id, current_user)
+    _validate_pattern(rule.kind, rule.pattern)
+
+    new_rule = CategoryRule(**rule.model_dump(), user_id=current_user.id)
+    db.add(new_rule)
+    db.commit()
+    db.refresh(new_rule)
+
+    return new_rule
+
+
+@router.put("/{rule_id}", response_model=CategoryRuleResponse)
+def update_category_rule(
+    rule_id: UUID,
+    rule_update: CategoryRuleUpdate,
+    current_user: TokenUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Update one of the user's category rules. Global rules can't be changed.
+    """
+    rule = _get_own_rule(db, rule_id, current_user)
+    update_data = rule_update.model_dump(exclude_unset=True)
+
+    if update_data.get("category_id") is not None:
+        _validate_category(db, update_data["category_id"], current_user)
+    _validate_pattern(
+        update_data.get("kind") or rule.kind,
+        update_data.get("pattern") or rule.pattern,
+    )
+
+    for field, value in update_data.items():
+        if value is not None:
+            setattr(rule, field, value)
+    rule.updated_at = datetime.now(timezone.utc)
+
+    db.commit()
+    db.refresh(rule)
+
+    return rule
+
+
+@router.delete("/{rule_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_category_rule(
+    rule_id: UUID,
+    current_user: TokenUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Delete one of the user's category rules. Transactions it already
+    categorised keep their category.
+    """
+    rule = _get_own_rule(db, rule_id, current_user)
+    db.delete(rule)
+    db.commit()
+
+    return None
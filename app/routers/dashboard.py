@@ -1,91 +1,215 @@
-from datetime import datetime, timedelta, timezone
-from typing import List
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Literal, NamedTuple, Optional, Tuple
+from uuid import UUID
 
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+import numpy as np
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy import case, func, or_
+from sqlalchemy.orm import Session, joinedload
 
 from app.auth import get_current_active_user
+from app.cache import not_modified, response_cache, user_etag
 from app.database import get_db
-from app.models import Category, Transaction, User
-from app.schemas import CategorySpending, DashboardStats, QuickStats
+from app.fx import FX_BASE_CURRENCY, convert_totals, foreign_currencies, unconvertible
+from app.models import Category, DailyUserCategoryTotal, Transaction
+from app.money import from_minor_units
+from app.principals import TokenUser
+from app.recurring import post_due_transactions
+from app.rollups import get_balance
+from app.timeseries import bucket_expression, bucket_range, fill_buckets
+from app.schemas import (
+    CacheStats,
+    CategorySpending,
+    DashboardOverview,
+    DashboardStats,
+    QuickStats,
+    TimeSeries,
+    TimeSeriesPoint,
+)
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
 
-@router.get("/stats", response_model=DashboardStats)
-def get_dashboard_stats(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
-    days: int = Query(30, ge=1, le=365, description="Number of days to analyse"),
-):
+def _rollup_window(
+    user_id: UUID, start_day: Optional[date] = None, end_day: Optional[date] = None
+) -> list:
     """
-    Get dashboard statistics
+    Filters selecting a user's rollup rows between two days (inclusive).
     """
-    end_date = datetime.now(timezone.utc)
-    start_date = end_date - timedelta(days=days)
+    filters = [DailyUserCategoryTotal.user_id == user_id]
+    if start_day is not None:
+        filters.append(DailyUserCategoryTotal.day >= start_day)
+    if end_day is not None:
+        filters.append(DailyUserCategoryTotal.day <= end_day)
+    return filters
 
-    transactions = (
-        db.query(Transaction).filter(
-            Transaction.user_id == current_user.id,
-            Transaction.date >= start_date,
-            Transaction.date <= end_date,
-        )
-    ).all()
 
-    # Calculate income and expenses
-    total_income = sum(t.amount for t in transactions if t.type == "income")
-    total_expense = sum(t.amount for t in transactions if t.type == "expense")
-    net_balance = total_income - total_expense
+def _currency(user: TokenUser) -> str:
+    """
+    The currency a user's totals are reported in.
+    """
+    return user.currency_preference or FX_BASE_CURRENCY
 
-    total_transactions = len(transactions)
-    income_transactions = len([t for t in transactions if t.type == "income"])
-    expense_transactions = len([t for t in transactions if t.type == "expense"])
 
-    # Averages
-    average_transaction_amount = (
-        (total_income + total_expense) / total_transactions
-        if total_transactions > 0
-        else 0
-    )
-    average_daily_spend = total_expense / days if days > 0 else 0
-    average_weekly_spend = (total_expense / days) * 7 if days > 0 else 0
+class _CategoryTotal(NamedTuple):
+    name: str
+    icon: Optional[str]
+    colour: Optional[str]
+    total: int
+    count: int
+
 
-    category_spending = (
+def _rate_day(currency: str):
+    """
+    Grouping key for the day a rollup's rate applies on. Rollups already in
+    ``currency`` need no rate, so they aren't split by day.
+    """
+    return case(
+        (
+            or_(
+                DailyUserCategoryTotal.currency.is_(None),
+                DailyUserCategoryTotal.currency == currency,
+            ),
+            None,
+        ),
+        else_=DailyUserCategoryTotal.day,
+    ).label("rate_day")
+
+
+def _summarise_window(
+    db: Session, filters: list, currency: str
+) -> Tuple[dict, list, List[str]]:
+    """
+    Per-type totals (in minor units of ``currency``), per-category expense
+    totals (largest first) and the currencies that couldn't be converted
+    for the given rollup rows, from a single grouped query. Other currencies
+    are converted at each day's rate.
+    """
+    rate_day = _rate_day(currency)
+    rows = (
         db.query(
+            DailyUserCategoryTotal.type,
+            Category.id,
             Category.name,
             Category.icon,
             Category.colour,
-            func.sum(Transaction.amount).label("total"),
-            func.count(Transaction.id).label("count"),
+            DailyUserCategoryTotal.currency,
+            rate_day,
+            func.sum(DailyUserCategoryTotal.total_amount).label("total"),
+            func.sum(DailyUserCategoryTotal.transaction_count).label("count"),
         )
-        .join(Transaction, Transaction.category_id == Category.id)
-        .filter(
-            Transaction.user_id == current_user.id,
-            Transaction.type == "expense",
-            Transaction.date >= start_date,
-            Transaction.date <= end_date,
+        .outerjoin(Category, DailyUserCategoryTotal.category_id == Category.id)
+        .filter(*filters)
+        .group_by(
+            DailyUserCategoryTotal.type,
+            Category.id,
+            DailyUserCategoryTotal.currency,
+            rate_day,
         )
-        .group_by(Category.id)
-        .order_by(func.sum(Transaction.amount).desc())
-        .limit(5)
         .all()
     )
+    totals = convert_totals(
+        db,
+        [row.total for row in rows],
+        [row.currency for row in rows],
+        [row.rate_day for row in rows],
+        currency,
+    ).tolist()
+
+    totals_by_type: Dict[str, Tuple[int, int]] = {}
+    categories: Dict[UUID, _CategoryTotal] = {}
+    for row, converted in zip(rows, totals):
+        total, count = totals_by_type.get(row.type, (0, 0))
+        totals_by_type[row.type] = (total + converted, count + int(row.count))
+        if row.type == "expense" and row.name is not None:
+            category = categories.get(row.id)
+            categories[row.id] = _CategoryTotal(
+                row.name,
+                row.icon,
+                row.colour,
+                converted + (category.total if category else 0),
+                int(row.count) + (category.count if category else 0),
+            )
+
+    expense_categories = sorted(
+        categories.values(), key=lambda category: category.total, reverse=True
+    )
+    unconverted = unconvertible(db, (row.currency for row in rows), currency)
+    return totals_by_type, expense_categories, unconverted
+
 
-    top_categories = [
+def _category_spending(
+    expense_categories: list, total_expense: int, limit: int
+) -> List[CategorySpending]:
+    """
+    Top expense categories from a window summary.
+    """
+    return [
         CategorySpending(
             category_name=cat.name,
             category_icon=cat.icon,
             category_colour=cat.colour,
-            total_amount=float(cat.total),
+            total_amount=from_minor_units(cat.total),
             transaction_count=cat.count,
-            percentage=(float(cat.total) / total_expense * 100)
-            if total_expense > 0
-            else 0,
+            percentage=(cat.total / total_expense * 100) if total_expense > 0 else 0,
         )
-        for cat in category_spending
+        for cat in expense_categories[:limit]
     ]
 
+
+def _cache_params(current_user: TokenUser, **params) -> dict:
+    """
+    Cache key parameters, including today's date since windows are day-based
+    and the currency totals are converted to.
+    """
+    return {
+        **params,
+        "day": datetime.now(timezone.utc).date().isoformat(),
+        "currency": _currency(current_user),
+    }
+
+
+def _stats_window(
+    current_user: TokenUser, days: int
+) -> Tuple[datetime, datetime, list]:
+    """
+    Start and end of the stats window plus the rollup filters covering it.
+
+    Totals are read from the daily rollups, so the window covers whole UTC
+    days from ``days`` ago up to today.
+    """
+    end_date = datetime.now(timezone.utc)
+    start_date = end_date - timedelta(days=days)
+    window = _rollup_window(current_user.id, start_date.date(), end_date.date())
+    return start_date, end_date, window
+
+
+def _build_dashboard_stats(
+    db: Session,
+    current_user: TokenUser,
+    days: int,
+    start_date: datetime,
+    end_date: datetime,
+    summary: Tuple[dict, list, List[str]],
+) -> DashboardStats:
+    # Money stays in minor units until the response is built
+    totals_by_type, expense_categories, unconverted = summary
+    total_income, income_transactions = totals_by_type.get("income", (0, 0))
+    total_expense, expense_transactions = totals_by_type.get("expense", (0, 0))
+    net_balance = total_income - total_expense
+    total_transactions = sum(count for _, count in totals_by_type.values())
+
+    # Averages
+    average_transaction_amount = (
+        (total_income + total_expense) / total_transactions
+        if total_transactions > 0
+        else 0
+    )
+    average_daily_spend = total_expense / days if days > 0 else 0
+    average_weekly_spend = (total_expense / days) * 7 if days > 0 else 0
+
+    top_categories = _category_spending(expense_categories, total_expense, limit=5)
+
     # Budgets
     monthly_budget = current_user.monthly_budget
     budget_spent_percentage = None
@@ -101,8 +225,9 @@ def get_dashboard_stats(
 
     recent_transactions_query = (
         db.query(Transaction)
+        .options(joinedload(Transaction.category))
         .filter(Transaction.user_id == current_user.id)
-        .order_by(Transaction.date.desc())
+        .order_by(Transaction.date.desc(), Transaction.id.desc())
         .limit(5)
         .all()
     )
@@ -110,7 +235,7 @@ def get_dashboard_stats(
     recent_transactions = [
         {
             "id": t.id,
-            "amount": t.amount,
+            "amount": from_minor_units(t.amount),
             "description": t.description,
             "date": t.date,
             "category": t.category.name if t.category else "Uncategorised",
@@ -125,39 +250,91 @@ def get_dashboard_stats(
     ]
 
     return DashboardStats(
+        currency=_currency(current_user),
+        unconverted_currencies=unconverted,
         period=f"last_{days}_days",
         start_date=start_date,
         end_date=end_date,
-        total_income=total_income,
-        total_expense=total_expense,
-        net_balance=net_balance,
+        total_income=from_minor_units(total_income),
+        total_expense=from_minor_units(total_expense),
+        net_balance=from_minor_units(net_balance),
         top_spending_categories=top_categories,
         total_transactions=total_transactions,
         income_transactions=income_transactions,
         expense_transactions=expense_transactions,
-        average_transaction_amount=average_transaction_amount,
-        average_daily_spend=average_daily_spend,
-        average_weekly_spend=average_weekly_spend,
-        monthly_budget=monthly_budget,
+        average_transaction_amount=from_minor_units(average_transaction_amount),
+        average_daily_spend=from_minor_units(average_daily_spend),
+        average_weekly_spend=from_minor_units(average_weekly_spend),
+        monthly_budget=from_minor_units(monthly_budget),
         budget_spent_percentage=budget_spent_percentage,
-        budget_remaining=budget_remaining,
+        budget_remaining=from_minor_units(budget_remaining),
         recent_transactions=recent_transactions,
     )
 
 
-@router.get("/quick-stats", response_model=QuickStats)
-def get_quick_stats(
-    current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)
-):
+def _conversion_adjustment(
+    db: Session, user_id: UUID, currencies: List[str], to: str
+) -> Tuple[int, int, int]:
     """
-    Quick financial overview with basic metrics and budget status
+    What converting a user's totals in ``currencies`` to ``to`` adds to
+    their lifetime income, lifetime expense and this month's expense.
     """
-    transactions = (
-        db.query(Transaction).filter(Transaction.user_id == current_user.id).all()
+    rows = (
+        db.query(
+            DailyUserCategoryTotal.type,
+            DailyUserCategoryTotal.currency,
+            DailyUserCategoryTotal.day,
+            func.sum(DailyUserCategoryTotal.total_amount).label("total"),
+        )
+        .filter(
+            DailyUserCategoryTotal.user_id == user_id,
+            DailyUserCategoryTotal.currency.in_(currencies),
+        )
+        .group_by(
+            DailyUserCategoryTotal.type,
+            DailyUserCategoryTotal.currency,
+            DailyUserCategoryTotal.day,
+        )
+        .all()
+    )
+    if not rows:
+        return 0, 0, 0
+
+    types, row_currencies, days, totals = zip(*rows)
+    days = np.array(days, dtype="datetime64[D]")
+    change = convert_totals(db, totals, row_currencies, days, to) - np.array(
+        totals, dtype=np.int64
     )
 
-    total_income = sum(t.amount for t in transactions if t.type == "income")
-    total_expense = sum(t.amount for t in transactions if t.type == "expense")
+    types = np.array(types)
+    is_income, is_expense = types == "income", types == "expense"
+    start_of_month = datetime.now(timezone.utc).date().replace(day=1)
+    this_month = days >= np.datetime64(start_of_month, "D")
+    return (
+        int(change[is_income].sum()),
+        int(change[is_expense].sum()),
+        int(change[is_expense & this_month].sum()),
+    )
+
+
+def _build_quick_stats(db: Session, current_user: TokenUser) -> QuickStats:
+    # Lifetime and current-month totals are kept on a single balance row;
+    # only users with more than one currency need anything else
+    balance = get_balance(db, current_user.id)
+    total_income = balance.lifetime_income
+    total_expense = balance.lifetime_expense
+    current_month_expense = balance.month_expense
+
+    currency = _currency(current_user)
+    foreign = foreign_currencies(balance.currencies, currency)
+    unconverted = unconvertible(db, foreign, currency)
+    if foreign:
+        income_change, expense_change, month_change = _conversion_adjustment(
+            db, current_user.id, foreign, currency
+        )
+        total_income += income_change
+        total_expense += expense_change
+        current_month_expense += month_change
     net_balance = total_income - total_expense
 
     # Budgets
@@ -166,38 +343,186 @@ def get_quick_stats(
     budget_remaining = None
 
     if monthly_budget and monthly_budget > 0:
-        now = datetime.now(timezone.utc)
-        start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-        def _is_this_month(value: datetime) -> bool:
-            # SQLite returns naive datetimes; treat them as UTC for comparison.
-            if value.tzinfo is None:
-                value = value.replace(tzinfo=timezone.utc)
-            return value >= start_of_month
-
-        current_month_expense = sum(
-            t.amount
-            for t in transactions
-            if t.type == "expense" and _is_this_month(t.date)
-        )
-
         budget_spent_percentage = (
             (current_month_expense / monthly_budget * 100) if monthly_budget > 0 else 0
         )
         budget_remaining = monthly_budget - current_month_expense
 
     return QuickStats(
-        total_income=total_income,
-        total_expense=total_expense,
-        net_balance=net_balance,
+        currency=currency,
+        unconverted_currencies=unconverted,
+        total_income=from_minor_units(total_income),
+        total_expense=from_minor_units(total_expense),
+        net_balance=from_minor_units(net_balance),
         budget_spent_percentage=budget_spent_percentage,
-        budget_remaining=budget_remaining,
+        budget_remaining=from_minor_units(budget_remaining),
+    )
+
+
+def _build_spending_by_category(
+    db: Session, current_user: TokenUser, days: int, limit: int
+) -> List[CategorySpending]:
+    start_date = datetime.now(timezone.utc) - timedelta(days=days)
+    totals_by_type, expense_categories, _ = _summarise_window(
+        db, _rollup_window(current_user.id, start_date.date()), _currency(current_user)
     )
+    total_expense = totals_by_type.get("expense", (0, 0))[0]
 
+    return _category_spending(expense_categories, total_expense, limit)
 
-@router.get("/spending-by-category", response_model=List[CategorySpending])
+
+def _build_overview(
+    db: Session, current_user: TokenUser, days: int, limit: int
+) -> DashboardOverview:
+    """
+    Stats, quick stats and category spending sharing one window summary.
+    """
+    start_date, end_date, window = _stats_window(current_user, days)
+    summary = _summarise_window(db, window, _currency(current_user))
+    total_expense = summary[0].get("expense", (0, 0))[0]
+
+    return DashboardOverview(
+        stats=_build_dashboard_stats(
+            db, current_user, days, start_date, end_date, summary
+        ),
+        quick_stats=_build_quick_stats(db, current_user),
+        spending_by_category=_category_spending(summary[1], total_expense, limit),
+    )
+
+
+def _build_timeseries(
+    db: Session, current_user: TokenUser, bucket: str, days: int
+) -> TimeSeries:
+    end_day = datetime.now(timezone.utc).date()
+    start_day = end_day - timedelta(days=days)
+
+    currency = _currency(current_user)
+    period = bucket_expression(
+        DailyUserCategoryTotal.day, bucket, db.get_bind().dialect.name
+    ).label("period")
+    rate_day = _rate_day(currency)
+    rows = (
+        db.query(
+            period,
+            DailyUserCategoryTotal.type,
+            DailyUserCategoryTotal.currency,
+            rate_day,
+            func.sum(DailyUserCategoryTotal.total_amount),
+            func.sum(DailyUserCategoryTotal.transaction_count),
+        )
+        .filter(*_rollup_window(current_user.id, start_day, end_day))
+        .group_by(
+            period,
+            DailyUserCategoryTotal.type,
+            DailyUserCategoryTotal.currency,
+            rate_day,
+        )
+        .all()
+    )
+
+    periods = bucket_range(start_day, end_day, bucket)
+    unconverted = []
+    if rows:
+        keys, types, currencies, row_days, totals, row_counts = zip(*rows)
+        totals = convert_totals(db, totals, currencies, row_days, currency)
+        unconverted = unconvertible(db, currencies, currency)
+        rows = zip(keys, types, totals, row_counts)
+    income, expense, counts = fill_buckets(periods, rows)
+
+    return TimeSeries(
+        bucket=bucket,
+        currency=currency,
+        unconverted_currencies=unconverted,
+        start_date=start_day,
+        end_date=end_day,
+        points=[
+            TimeSeriesPoint(
+                period_start=period_start,
+                income=from_minor_units(period_income),
+                expense=from_minor_units(period_expense),
+                net=from_minor_units(period_income - period_expense),
+                transaction_count=period_count,
+            )
+            for period_start, period_income, period_expense, period_count in zip(
+                periods.tolist(), income.tolist(), expense.tolist(), counts.tolist()
+            )
+        ],
+    )
+
+
+@router.get(
+    "/stats",
+    response_model=DashboardStats,
+    dependencies=[Depends(post_due_transactions)],
+)
+def get_dashboard_stats(
+    request: Request,
+    response: Response,
+    current_user: TokenUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+    days: int = Query(30, ge=1, le=365, description="Number of days to analyse"),
+):
+    """
+    Get dashboard statistics
+    """
+    params = _cache_params(current_user, days=days)
+    etag = user_etag(current_user, "stats", params)
+    unchanged = not_modified(request, response, etag)
+    if unchanged:
+        return unchanged
+
+    def compute():
+        start_date, end_date, window = _stats_window(current_user, days)
+        stats = _build_dashboard_stats(
+            db,
+            current_user,
+            days,
+            start_date,
+            end_date,
+            _summarise_window(db, window, _currency(current_user)),
+        )
+        return stats.model_dump(mode="json")
+
+    return response_cache.get_or_compute(current_user, "stats", params, compute)
+
+
+@router.get(
+    "/quick-stats",
+    response_model=QuickStats,
+    dependencies=[Depends(post_due_transactions)],
+)
+def get_quick_stats(
+    request: Request,
+    response: Response,
+    current_user: TokenUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Quick financial overview with basic metrics and budget status
+    """
+    params = _cache_params(current_user)
+    etag = user_etag(current_user, "quick-stats", params)
+    unchanged = not_modified(request, response, etag)
+    if unchanged:
+        return unchanged
+
+    return response_cache.get_or_compute(
+        current_user,
+        "quick-stats",
+        params,
+        lambda: _build_quick_stats(db, current_user).model_dump(mode="json"),
+    )
+
+
+@router.get(
+    "/spending-by-category",
+    response_model=List[CategorySpending],
+    dependencies=[Depends(post_due_transactions)],
+)
 def get_spending_by_category(
-    current_user: User = Depends(get_current_active_user),
+    request: Request,
+    response: Response,
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
     days: int = Query(30, ge=1, le=365),
     limit: int = Query(10, ge=1, le=50),
@@ -205,50 +530,92 @@ def get_spending_by_category(
     """
     Get spending by category
     """
-    end_date = datetime.now(timezone.utc)
-    start_date = end_date - timedelta(days=days)
+    params = _cache_params(current_user, days=days, limit=limit)
+    etag = user_etag(current_user, "spending-by-category", params)
+    unchanged = not_modified(request, response, etag)
+    if unchanged:
+        return unchanged
 
-    total_expense = (
-        db.query(func.sum(Transaction.amount))
-        .filter(
-            Transaction.user_id == current_user.id,
-            Transaction.type == "expense",
-            Transaction.date >= start_date,
-        )
-        .scalar()
-        or 0
+    return response_cache.get_or_compute(
+        current_user,
+        "spending-by-category",
+        params,
+        lambda: [
+            category.model_dump(mode="json")
+            for category in _build_spending_by_category(db, current_user, days, limit)
+        ],
     )
 
-    category_data = (
-        db.query(
-            Category.name,
-            Category.icon,
-            Category.colour,
-            func.sum(Transaction.amount).label("total"),
-            func.count(Transaction.id).label("count"),
-        )
-        .join(Transaction, Transaction.category_id == Category.id)
-        .filter(
-            Transaction.user_id == current_user.id,
-            Transaction.type == "expense",
-            Transaction.date >= start_date,
-        )
-        .group_by(Category.id)
-        .order_by(func.sum(Transaction.amount).desc())
-        .limit(limit)
-        .all()
+
+@router.get(
+    "/overview",
+    response_model=DashboardOverview,
+    dependencies=[Depends(post_due_transactions)],
+)
+def get_overview(
+    request: Request,
+    response: Response,
+    current_user: TokenUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+    days: int = Query(30, ge=1, le=365, description="Number of days to analyse"),
+    limit: int = Query(10, ge=1, le=50, description="Categories to break down"),
+):
+    """
+    Stats, quick stats and spending by category in a single request
+
+    Category spending covers the same window as the stats.
+    """
+    params = _cache_params(current_user, days=days, limit=limit)
+    etag = user_etag(current_user, "overview", params)
+    unchanged = not_modified(request, response, etag)
+    if unchanged:
+        return unchanged
+
+    return response_cache.get_or_compute(
+        current_user,
+        "overview",
+        params,
+        lambda: _build_overview(db, current_user, days, limit).model_dump(mode="json"),
     )
 
-    return [
-        CategorySpending(
-            category_name=cat.name,
-            category_icon=cat.icon,
-            category_colour=cat.colour,
-            total_amount=float(cat.total),
-            transaction_count=cat.count,
-            percentage=(float(cat.total) / total_expense * 100)
-            if total_expense > 0
-            else 0,
-        )
-        for cat in category_data
-    ]
+
+@router.get(
+    "/timeseries",
+    response_model=TimeSeries,
+    dependencies=[Depends(post_due_transactions)],
+)
+def get_timeseries(
+    request: Request,
+    response: Response,
+    current_user: TokenUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+    bucket: Literal["day", "week", "month"] = Query(
+        "day", description="Size of each point"
+    ),
+    days: int = Query(90, ge=1, le=3650, description="Number of days to chart"),
+):
+    """
+    Income and expense per day, week or month, with empty periods included
+    """
+    params = _cache_params(current_user, bucket=bucket, days=days)
+    etag = user_etag(current_user, "timeseries", params)
+    unchanged = not_modified(request, response, etag)
+    if unchanged:
+        return unchanged
+
+    return response_cache.get_or_compute(
+        current_user,
+        "timeseries",
+        params,
+        lambda: _build_timeseries(db, current_user, bucket, days).model_dump(
+            mode="json"
+        ),
+    )
+
+
+@router.get("/cache-stats", response_model=CacheStats)
+def get_cache_stats(current_user: TokenUser = Depends(get_current_active_user)):
+    """
+    Hit and miss counters for the dashboard response cache
+    """
+    return response_cache.stats()
@@ -2,10 +2,12 @@ from datetime import date, datetime, timezone
 from typing import List
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from app.auth import get_current_active_user
+from app.cache import bump_data_version, content_etag, not_modified, user_etag
 from app.database import get_db
 from app.gamification import PASS_THRESHOLD, calculate_streak, level_for_xp
 from app.notifications import create_notification
@@ -13,9 +15,11 @@ from app.models import (
     Course,
     Lesson,
     LessonProgress,
-    User,
+    Question,
+    Unit,
     UserLearningStats,
 )
+from app.principals import TokenUser
 from app.schemas import (
     CourseDetail,
     CourseSummary,
@@ -32,7 +36,7 @@ from app.schemas import (
 router = APIRouter(prefix="/learn", tags=["Learning"])
 
 
-def get_or_create_stats(db: Session, user: User) -> UserLearningStats:
+def get_or_create_stats(db: Session, user: TokenUser) -> UserLearningStats:
     """
     Fetch the user's learning stats, creating a fresh record on first use.
     """
@@ -49,7 +53,7 @@ def get_or_create_stats(db: Session, user: User) -> UserLearningStats:
     return stats
 
 
-def _completed_lesson_ids(db: Session, user: User) -> set:
+def _completed_lesson_ids(db: Session, user: TokenUser) -> set:
     """
     Set of lesson IDs the user has completed.
     """
@@ -64,14 +68,38 @@ def _completed_lesson_ids(db: Session, user: User) -> set:
     return {row.lesson_id for row in rows}
 
 
+def _catalog_signature(db: Session) -> list:
+    """
+    Row counts and latest change times across the shared course catalog,
+    fetched in one query. Any edit, addition or removal changes the result.
+    """
+    parts = []
+    for model, changed in (
+        (Course, Course.updated_at),
+        (Unit, Unit.updated_at),
+        (Lesson, Lesson.updated_at),
+        (Question, Question.created_at),
+    ):
+        parts.append(select(func.count(model.id)).scalar_subquery())
+        parts.append(select(func.max(changed)).scalar_subquery())
+    return list(db.execute(select(*parts)).one())
+
+
 @router.get("/courses", response_model=List[CourseSummary])
 def list_courses(
-    current_user: User = Depends(get_current_active_user),
+    request: Request,
+    response: Response,
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
     List all courses with the current user's completion progress.
     """
+    etag = content_etag(_catalog_signature(db), user_etag(current_user, "courses"))
+    unchanged = not_modified(request, response, etag)
+    if unchanged:
+        return unchanged
+
     courses = db.query(Course).order_by(Course.order).all()
     completed_ids = _completed_lesson_ids(db, current_user)
 
@@ -102,12 +130,21 @@ def list_courses(
 @router.get("/courses/{course_id}", response_model=CourseDetail)
 def get_course(
     course_id: UUID,
-    current_user: User = Depends(get_current_active_user),
+    request: Request,
+    response: Response,
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
     Get a course with its units and lessons, including per-lesson status.
     """
+    etag = content_etag(
+        _catalog_signature(db), user_etag(current_user, "course", {"id": course_id})
+    )
+    unchanged = not_modified(request, response, etag)
+    if unchanged:
+        return unchanged
+
     course = db.query(Course).filter(Course.id == course_id).first()
     if not course:
         raise HTTPException(
@@ -162,12 +199,21 @@ def get_course(
 @router.get("/lessons/{lesson_id}", response_model=LessonResponse)
 def get_lesson(
     lesson_id: UUID,
-    current_user: User = Depends(get_current_active_user),
+    request: Request,
+    response: Response,
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
     Get a lesson and its questions (correct answers are not exposed).
+
+    Lessons are the same for everyone, so the ETag only tracks the catalog.
     """
+    etag = content_etag(_catalog_signature(db), str(lesson_id))
+    unchanged = not_modified(request, response, etag)
+    if unchanged:
+        return unchanged
+
     lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
     if not lesson:
         raise HTTPException(
@@ -181,7 +227,7 @@ def get_lesson(
 def submit_lesson(
     lesson_id: UUID,
     submission: LessonSubmission,
-    current_user: User = Depends(get_current_active_user),
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
@@ -299,6 +345,8 @@ def submit_lesson(
             icon="🔥",
         )
 
+    # Course listings include this user's progress
+    bump_data_version(db, current_user.id)
     db.commit()
     db.refresh(stats)
 
@@ -316,7 +364,7 @@ def submit_lesson(
 
 @router.get("/me/stats", response_model=LearningStatsResponse)
 def get_my_stats(
-    current_user: User = Depends(get_current_active_user),
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
@@ -327,7 +375,7 @@ def get_my_stats(
 
 @router.get("/me/progress", response_model=ProgressResponse)
 def get_my_progress(
-    current_user: User = Depends(get_current_active_user),
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
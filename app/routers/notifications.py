@@ -1,12 +1,14 @@
 from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 
 from app.auth import get_current_active_user
 from app.database import get_db
-from app.models import Notification, User
+from app.fields import FieldSelection, projection, sparse_response
+from app.models import Notification
+from app.principals import TokenUser
 from app.schemas import NotificationResponse, UnreadCountResponse
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
@@ -14,27 +16,39 @@ router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
 @router.get("/", response_model=List[NotificationResponse])
 def list_notifications(
+    response: Response,
     unread_only: Optional[bool] = Query(
         None, description="Only return unread notifications"
     ),
     limit: int = Query(50, ge=1, le=100),
-    current_user: User = Depends(get_current_active_user),
+    fields: Optional[List[str]] = Depends(FieldSelection(NotificationResponse)),
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
     List the current user's notifications, newest first.
+
+    ``fields`` returns only the named fields of each notification, loading
+    just those columns.
     """
-    query = db.query(Notification).filter(Notification.user_id == current_user.id)
+    if fields is None:
+        query = db.query(Notification)
+    else:
+        query = db.query(*projection(Notification, fields))
+    query = query.filter(Notification.user_id == current_user.id)
 
     if unread_only:
         query = query.filter(Notification.is_read.is_(False))
 
-    return query.order_by(Notification.created_at.desc()).limit(limit).all()
+    notifications = query.order_by(Notification.created_at.desc()).limit(limit)
+    if fields is None:
+        return notifications.all()
+    return sparse_response((row._asdict() for row in notifications), fields, response)
 
 
 @router.get("/unread-count", response_model=UnreadCountResponse)
 def unread_count(
-    current_user: User = Depends(get_current_active_user),
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
@@ -54,7 +68,7 @@ def unread_count(
 @router.post("/{notification_id}/read", response_model=NotificationResponse)
 def mark_read(
     notification_id: UUID,
-    current_user: User = Depends(get_current_active_user),
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
@@ -83,7 +97,7 @@ def mark_read(
 
 @router.post("/read-all", status_code=status.HTTP_204_NO_CONTENT)
 def mark_all_read(
-    current_user: User = Depends(get_current_active_user),
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
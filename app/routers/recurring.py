@@ -0,0 +1,189 @@
+from datetime import datetime, timezone
+from typing import List
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.auth import get_current_active_user
+from app.database import get_db
+from app.models import Category, RecurringRule
+from app.money import from_minor_units, to_minor_units
+from app.principals import TokenUser
+from app.recurring import next_due_from, sync_recurring_due
+from app.schemas import (
+    RecurringRuleCreate,
+    RecurringRuleResponse,
+    RecurringRuleUpdate,
+)
+
+router = APIRouter(prefix="/recurring", tags=["Recurring transactions"])
+
+# Changing any of these restarts the schedule from today
+SCHEDULE_FIELDS = {"frequency", "interval", "start_date", "end_date"}
+
+
+def rule_to_response(rule: RecurringRule) -> RecurringRuleResponse:
+    """
+    Convert RecurringRule model to response, with the amount in major units
+    """
+    return RecurringRuleResponse.model_validate(rule).model_copy(
+        update={"amount": from_minor_units(rule.amount)}
+    )
+
+
+def _validate_category(db: Session, category_id: UUID, user: TokenUser) -> None:
+    """
+    Ensure a referenced category exists and is usable by the user.
+    """
+    category = (
+        db.query(Category)
+        .filter(
+            Category.id == category_id,
+            (Category.is_default) | (Category.user_id == user.id),
+        )
+        .first()
+    )
+    if not category:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Category with id {category_id} not found",
+        )
+
+
+def _get_rule(db: Session, rule_id: UUID, user: TokenUser) -> RecurringRule:
+    rule = (
+        db.query(RecurringRule)
+        .filter(RecurringRule.id == rule_id, RecurringRule.user_id == user.id)
+        .first()
+    )
+    if not rule:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Recurring transaction with id {rule_id} not found",
+        )
+    return rule
+
+
+@router.get("/", response_model=List[RecurringRuleResponse])
+def get_recurring_rules(
+    current_user: TokenUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Get all recurring transactions for the current user, next due first
+    """
+    rules = (
+        db.query(RecurringRule)
+        .filter(RecurringRule.user_id == current_user.id)
+        .order_by(RecurringRule.next_due, RecurringRule.created_at)
+        .all()
+    )
+    return [rule_to_response(rule) for rule in rules]
+
+
+@router.get("/{rule_id}", response_model=RecurringRuleResponse)
+def get_recurring_rule(
+    rule_id: UUID,
+    current_user: TokenUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Get a specific recurring transaction by ID
+    """
+    return rule_to_response(_get_rule(db, rule_id, current_user))
+
+
+@router.post(
+    "/", response_model=RecurringRuleResponse, status_code=status.HTTP_201_CREATED
+)
+def create_recurring_rule(
+    rule: RecurringRuleCreate,
+    current_user: TokenUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Create a recurring transaction
+
+    Occurrences from ``start_date`` onwards, including any already past,
+    are posted as transactions the next time the ledger is read.
+    """
+    if rule.category_id is not None:
+        _validate_category(db, rule.category_id, current_user)
+
+    rule_data = rule.model_dump()
+    rule_data["amount"] = to_minor_units(rule.amount)
+    new_rule = RecurringRule(
+        **rule_data, user_id=current_user.id, next_due=rule.start_date
+    )
+
+    db.add(new_rule)
+    db.flush()
+    sync_recurring_due(db, current_user.id)
+    db.commit()
+    db.refresh(new_rule)
+
+    return rule_to_response(new_rule)
+
+
+@router.put("/{rule_id}", response_model=RecurringRuleResponse)
+def update_recurring_rule(
+    rule_id: UUID,
+    rule_update: RecurringRuleUpdate,
+    current_user: TokenUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Update a recurring transaction
+
+    Transactions already posted are left alone. A new schedule, or resuming
+    a paused rule, picks up from today rather than back-filling.
+    """
+    rule = _get_rule(db, rule_id, current_user)
+    update_data = rule_update.model_dump(exclude_unset=True)
+
+    if update_data.get("category_id") is not None:
+        _validate_category(db, update_data["category_id"], current_user)
+    if update_data.get("amount") is not None:
+        update_data["amount"] = to_minor_units(update_data["amount"])
+
+    start_date = update_data.get("start_date", rule.start_date)
+    end_date = update_data.get("end_date", rule.end_date)
+    if end_date is not None and end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="End date can't be before start date",
+        )
+
+    resumed = update_data.get("is_active") and not rule.is_active
+    for field, value in update_data.items():
+        setattr(rule, field, value)
+    if resumed or SCHEDULE_FIELDS & update_data.keys():
+        rule.next_due = next_due_from(rule, datetime.now(timezone.utc).date())
+
+    rule.updated_at = datetime.now(timezone.utc)
+
+    db.flush()
+    sync_recurring_due(db, current_user.id)
+    db.commit()
+    db.refresh(rule)
+
+    return rule_to_response(rule)
+
+
+@router.delete("/{rule_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_recurring_rule(
+    rule_id: UUID,
+    current_user: TokenUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Delete a recurring transaction. Transactions it already posted are kept.
+    """
+    rule = _get_rule(db, rule_id, current_user)
+    db.delete(rule)
+    db.flush()
+    sync_recurring_due(db, current_user.id)
+    db.commit()
+
+    return None
@@ -1,17 +1,92 @@
+import base64
+import binascii
+import csv
+import heapq
+import io
+import itertools
+import json
+from collections import Counter
 from datetime import datetime, timezone
-from typing import List, Optional
-from uuid import UUID
+from typing import Collection, Dict, Iterable, Iterator, List, Literal, Optional, Tuple
+from uuid import UUID, uuid4
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+import numpy as np
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Header,
+    HTTPException,
+    Query,
+    Response,
+    UploadFile,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session, joinedload
 
+from app.archive import ArchivedTransaction, UserArchive, load_archive
 from app.auth import get_current_active_user
+from app.cache import bump_data_version
+from app.categorisation import matcher_for
 from app.database import get_db
-from app.models import Category, Transaction, User
-from app.schemas import TransactionCreate, TransactionResponse, TransactionUpdate
+from app.duplicates import (
+    find_duplicate,
+    fingerprint_rows,
+    insert_new_transactions,
+    transaction_fingerprint,
+)
+from app.fields import FieldSelection, projection, sparse_response
+from app.importers import chunked, detect_format, parse_statement
+from app.models import Category, Transaction
+from app.money import from_minor_units, to_minor_units
+from app.principals import TokenUser
+from app.recurring import post_due_transactions
+from app.rollups import (
+    record_transaction,
+    record_transaction_groups,
+    record_transaction_rows,
+    transaction_groups,
+)
+from app.search import search_terms, search_transactions
+from app.schemas import (
+    BulkChangeResult,
+    BulkTransactionCreate,
+    BulkTransactionDelete,
+    BulkTransactionError,
+    BulkTransactionResult,
+    BulkTransactionUpdate,
+    TransactionBase,
+    TransactionCreate,
+    TransactionImport,
+    TransactionResponse,
+    TransactionSelection,
+    TransactionUpdate,
+)
 
 router = APIRouter(prefix="/transactions", tags=["Transactions"])
 
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_IMPORT_ERRORS = 100
+EXPORT_BATCH_SIZE = 1000
+EXPORT_BUFFER_SIZE = 64 * 1024
+EXPORT_COLUMNS = (
+    "id",
+    "date",
+    "description",
+    "category",
+    "type",
+    "amount",
+    "currency",
+    "account",
+    "status",
+    "created_at",
+    "updated_at",
+)
+
 
 def transaction_to_response(transaction: Transaction) -> dict:
     """
@@ -19,12 +94,12 @@ def transaction_to_response(transaction: Transaction) -> dict:
     """
     return {
         "id": transaction.id,
-        "amount": transaction.amount,
+        "amount": from_minor_units(transaction.amount),
         "description": transaction.description,
         "date": transaction.date,
-        "category": transaction.category.name
-        if transaction.category
-        else "Uncategorised",
+        "category": (
+            transaction.category.name if transaction.category else "Uncategorised"
+        ),
         "type": transaction.type,
         "account": transaction.account,
         "currency": transaction.currency,
@@ -34,22 +109,165 @@ def transaction_to_response(transaction: Transaction) -> dict:
     }
 
 
-@router.get("/", response_model=List[TransactionResponse])
-def get_transactions(
-    skip: int = Query(0, ge=0),
-    limit: int = Query(50, ge=1, le=50),
-    type: Optional[str] = Query(None, description="Filter by type"),
-    category_id: Optional[UUID] = Query(None, description="Filter by category"),
-    start_date: Optional[datetime] = Query(None, description="Filter by start date"),
-    end_date: Optional[datetime] = Query(None, description="Filter by end date"),
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
-):
+def _partial_response(row) -> dict:
+    """
+    Convert a row of projected transaction fields to response values
+    """
+    values = row._asdict()
+    if "amount" in values:
+        values["amount"] = from_minor_units(values["amount"])
+    if "category" in values:
+        values["category"] = values["category"] or "Uncategorised"
+    return values
+
+
+def archived_to_response(
+    transaction: ArchivedTransaction, category_names: Dict[UUID, str]
+) -> dict:
     """
-    Get all transactions for the current user with filtering options
+    Convert an archived transaction to the same response as a live one
     """
-    query = db.query(Transaction).filter(Transaction.user_id == current_user.id)
+    return {
+        **transaction._asdict(),
+        "amount": from_minor_units(transaction.amount),
+        "category": category_names.get(transaction.category_id, "Uncategorised"),
+    }
+
+
+def category_names(db: Session, category_ids: Collection[UUID]) -> Dict[UUID, str]:
+    if not category_ids:
+        return {}
+    rows = db.query(Category.id, Category.name).filter(Category.id.in_(category_ids))
+    return {category_id: name for category_id, name in rows}
+
+
+def _archived_responses(
+    db: Session, archive: UserArchive, positions: np.ndarray
+) -> List[dict]:
+    names = category_names(db, archive.category_ids(positions))
+    return [archived_to_response(row, names) for row in archive.rows(positions)]
+
+
+def encode_cursor(transaction: dict) -> str:
+    """
+    Opaque cursor pointing just past a transaction in newest-first order.
+    """
+    position = [transaction["date"].isoformat(), transaction["id"].hex]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """
+    Unpack a cursor made by ``encode_cursor``.
+    """
+    try:
+        raw_date, raw_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(raw_date), UUID(raw_id)
+    except (binascii.Error, TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor",
+        )
+
+
+def resolve_categories(
+    db: Session, user: TokenUser, names: Iterable[str]
+) -> Dict[str, UUID]:
+    """
+    Map category names to IDs in one query, across the default categories
+    and the user's own.
+    """
+    rows = db.query(Category.name, Category.id).filter(
+        Category.name.in_(set(names)),
+        (Category.is_default) | (Category.user_id == user.id),
+    )
+    return {name: category_id for name, category_id in rows}
+
+
+def insert_transactions(
+    db: Session,
+    user: TokenUser,
+    items: List[Tuple[int, TransactionBase]],
+    seen: Optional[Counter] = None,
+    skip_duplicates: bool = True,
+) -> Tuple[int, int, List[Tuple[int, str]]]:
+    """
+    Insert validated ``(position, transaction)`` pairs with one executemany
+    and stage their rollups (caller is responsible for committing).
+
+    With ``skip_duplicates``, items already stored are skipped by
+    fingerprint; pass the same ``seen`` counter for every chunk of one
+    statement (see ``app.duplicates``). Without it every item is inserted,
+    unfingerprinted, like a single create without an ``Idempotency-Key``.
+
+    Returns the number inserted, the number skipped as duplicates and
+    ``(position, detail)`` for each item whose category doesn't exist.
+    Items without a category are categorised by the user's category rules,
+    or stored as uncategorised if none match.
+    """
+    names = {item.category for _, item in items if item.category}
+    category_ids = resolve_categories(db, user, names) if names else {}
+    uncategorised = any(not item.category for _, item in items)
+    matcher = matcher_for(db, user.id) if uncategorised else None
+
+    now = datetime.now(timezone.utc)
+    rows, errors = [], []
+    for position, item in items:
+        if not item.category:
+            category_id = matcher.categorise(item.description, item.type)
+        elif item.category in category_ids:
+            category_id = category_ids[item.category]
+        else:
+            errors.append((position, f"Category: {item.category} not found"))
+            continue
+        rows.append(
+            {
+                **item.model_dump(exclude={"category"}),
+                "amount": to_minor_units(item.amount),
+                "id": uuid4(),
+                "user_id": user.id,
+                "category_id": category_id,
+                "date": item.date or now,
+                "status": "completed",
+                "created_at": now,
+                "updated_at": now,
+            }
+        )
+
+    if not rows:
+        return 0, 0, errors
+
+    candidates = rows
+    archive = load_archive(user.id) if skip_duplicates else None
+    if skip_duplicates:
+        fingerprint_rows(user.id, rows, seen)
+    if archive is not None:
+        archived = archive.archived_fingerprints(row["fingerprint"] for row in rows)
+        candidates = [row for row in rows if row["fingerprint"] not in archived]
+    inserted = insert_new_transactions(db, candidates) if candidates else set()
+    new_rows = [row for row in candidates if row["id"] in inserted]
+    if new_rows:
+        record_transaction_rows(db, user.id, new_rows)
+    return len(new_rows), len(rows) - len(new_rows), errors
 
+
+def _validation_detail(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}"
+        for e in error.errors()
+    )
+
+
+def _apply_filters(
+    query,
+    type: Optional[str],
+    category_id: Optional[UUID],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+):
+    """
+    Narrow a transactions query by the listing's optional filters.
+    """
     if type:
         query = query.filter(Transaction.type == type)
     if category_id:
@@ -58,15 +276,255 @@ def get_transactions(
         query = query.filter(Transaction.date >= start_date)
     if end_date:
         query = query.filter(Transaction.date <= end_date)
+    return query
 
-    transactions = query.offset(skip).limit(limit).all()
-    return [transaction_to_response(t) for t in transactions]
+
+@router.get(
+    "/",
+    response_model=List[TransactionResponse],
+    dependencies=[Depends(post_due_transactions)],
+)
+def get_transactions(
+    response: Response,
+    q: Optional[str] = Query(
+        None, min_length=1, max_length=200, description="Search descriptions"
+    ),
+    cursor: Optional[str] = Query(
+        None, description="X-Next-Cursor header from the previous page"
+    ),
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(50, ge=1, le=50),
+    type: Optional[str] = Query(None, description="Filter by type"),
+    category_id: Optional[UUID] = Query(None, description="Filter by category"),
+    start_date: Optional[datetime] = Query(None, description="Filter by start date"),
+    end_date: Optional[datetime] = Query(None, description="Filter by end date"),
+    fields: Optional[List[str]] = Depends(FieldSelection(TransactionResponse)),
+    current_user: TokenUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Get transactions for the current user, newest first, with filtering options
+
+    When more results exist the response carries an ``X-Next-Cursor`` header;
+    pass it back as ``cursor`` to fetch the next page. Pages are found by
+    seeking the (user_id, date, id) index, so every page costs the same.
+
+    ``q`` matches words in the description by prefix using the full-text
+    index and orders results by relevance. Search results are paged with
+    ``skip`` rather than a cursor.
+
+    ``fields`` returns only the named fields of each transaction, loading
+    just the columns behind them.
+    """
+    if fields is None:
+        # Load category names in the same query rather than one lazy load per
+        # row
+        query = db.query(Transaction).options(joinedload(Transaction.category))
+    else:
+        # Paging needs each row's date and id whichever fields are shown
+        loaded = dict.fromkeys(["id", "date", *fields])
+        query = db.query(*projection(Transaction, loaded, category=Category.name))
+        if "category" in fields:
+            query = query.outerjoin(Category, Transaction.category_id == Category.id)
+    query = _apply_filters(
+        query.filter(Transaction.user_id == current_user.id),
+        type,
+        category_id,
+        start_date,
+        end_date,
+    )
+
+    if q is not None:
+        if cursor:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Search results are paged with skip, not cursor",
+            )
+        query = search_transactions(
+            query, q, current_user.id, db.get_bind().dialect.name
+        )
+
+    before = None
+    archive = load_archive(current_user.id)
+    if cursor:
+        before = cursor_date, cursor_id = decode_cursor(cursor)
+        # The plain date bound is implied by the row comparison, but it's the
+        # part a partitioned table can prune on
+        query = query.filter(
+            Transaction.date <= cursor_date,
+            tuple_(Transaction.date, Transaction.id) < tuple_(cursor_date, cursor_id),
+        )
+    elif skip and archive is None:
+        query = query.offset(skip)
+
+    # Fetch one extra row to learn whether another page follows. With an
+    # archive, skipped rows could come from either side, so both are read
+    # from the start and the page is cut from their merge
+    offset = skip if archive is not None and not cursor else 0
+    wanted = offset + limit + 1
+    rows = (
+        query.order_by(Transaction.date.desc(), Transaction.id.desc())
+        .limit(wanted)
+        .all()
+    )
+    to_response = transaction_to_response if fields is None else _partial_response
+    transactions = [to_response(row) for row in rows]
+    if archive is not None:
+        positions = archive.select(
+            type,
+            category_id,
+            start_date,
+            end_date,
+            before,
+            search_terms(q) if q is not None else None,
+        )
+        archived = _archived_responses(db, archive, positions[:wanted])
+        if q is None:
+            merged = heapq.merge(
+                transactions,
+                archived,
+                key=lambda t: (t["date"], t["id"]),
+                reverse=True,
+            )
+        else:
+            # Archived matches rank below live ones, newest first
+            merged = itertools.chain(transactions, archived)
+        transactions = list(itertools.islice(merged, offset, wanted))
+
+    if len(transactions) > limit:
+        transactions = transactions[:limit]
+        if q is None:
+            response.headers["X-Next-Cursor"] = encode_cursor(transactions[-1])
+
+    if fields is not None:
+        return sparse_response(transactions, fields, response)
+    return transactions
+
+
+def _export_lines(rows: Iterable, format: str) -> Iterator[str]:
+    """
+    Render exported rows as CSV or NDJSON, yielding output in blocks of
+    roughly ``EXPORT_BUFFER_SIZE`` characters.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if format == "csv":
+        writer.writerow(EXPORT_COLUMNS)
+
+    for row in rows:
+        values = {
+            column: value.isoformat() if isinstance(value, datetime) else value
+            for column, value in zip(EXPORT_COLUMNS, row)
+        }
+        values["id"] = str(values["id"])
+        values["amount"] = from_minor_units(values["amount"])
+        values["category"] = values["category"] or "Uncategorised"
+        if format == "csv":
+            writer.writerow(values.values())
+        else:
+            buffer.write(json.dumps(values) + "\n")
+
+        if buffer.tell() >= EXPORT_BUFFER_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+@router.get("/export", dependencies=[Depends(post_due_transactions)])
+def export_transactions(
+    format: Literal["csv", "ndjson"] = Query("csv", description="Output format"),
+    q: Optional[str] = Query(
+        None, min_length=1, max_length=200, description="Search descriptions"
+    ),
+    type: Optional[str] = Query(None, description="Filter by type"),
+    category_id: Optional[UUID] = Query(None, description="Filter by category"),
+    start_date: Optional[datetime] = Query(None, description="Filter by start date"),
+    end_date: Optional[datetime] = Query(None, description="Filter by end date"),
+    current_user: TokenUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Download every matching transaction, newest first, as CSV or NDJSON
+
+    Rows are read through a streaming cursor and written out as they
+    arrive, so memory use doesn't grow with the number of transactions.
+    Takes the same filters as the listing; ``q`` exports search matches,
+    still newest first rather than by relevance.
+    """
+    query = _apply_filters(
+        db.query(
+            Transaction.id,
+            Transaction.date,
+            Transaction.description,
+            Category.name,
+            Transaction.type,
+            Transaction.amount,
+            Transaction.currency,
+            Transaction.account,
+            Transaction.status,
+            Transaction.created_at,
+            Transaction.updated_at,
+        )
+        .outerjoin(Category, Transaction.category_id == Category.id)
+        .filter(Transaction.user_id == current_user.id),
+        type,
+        category_id,
+        start_date,
+        end_date,
+    )
+    if q is not None:
+        query = search_transactions(
+            query, q, current_user.id, db.get_bind().dialect.name
+        ).order_by(None)
+    rows = query.order_by(Transaction.date.desc(), Transaction.id.desc()).yield_per(
+        EXPORT_BATCH_SIZE
+    )
+    archive = load_archive(current_user.id)
+    if archive is not None:
+        positions = archive.select(
+            type,
+            category_id,
+            start_date,
+            end_date,
+            terms=search_terms(q) if q is not None else None,
+        )
+        names = category_names(db, archive.category_ids(positions))
+        archived = (
+            (
+                t.id,
+                t.date,
+                t.description,
+                names.get(t.category_id),
+                t.type,
+                t.amount,
+                t.currency,
+                t.account,
+                t.status,
+                t.created_at,
+                t.updated_at,
+            )
+            for t in archive.rows(positions)
+        )
+        rows = heapq.merge(
+            rows, archived, key=lambda row: (row[1], row[0]), reverse=True
+        )
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_lines(rows, format),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="transactions.{format}"'
+        },
+    )
 
 
 @router.get("/{transaction_id}", response_model=TransactionResponse)
 def get_single_transaction(
     transaction_id: UUID,
-    current_user: User = Depends(get_current_active_user),
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
@@ -80,12 +538,50 @@ def get_single_transaction(
         .first()
     )
 
-    if not transaction:
+    if transaction:
+        return transaction_to_response(transaction)
+
+    archive = load_archive(current_user.id)
+    archived = archive.find(transaction_id) if archive is not None else None
+    if not archived:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Transaction {transaction_id} not found",
         )
-    return transaction_to_response(transaction)
+    names = category_names(db, [archived.category_id] if archived.category_id else [])
+    return archived_to_response(archived, names)
+
+
+def _fingerprint(
+    transaction: Transaction, idempotency_key: Optional[str] = None
+) -> str:
+    return transaction_fingerprint(
+        transaction.user_id,
+        transaction.date,
+        transaction.amount,
+        transaction.description,
+        transaction.account,
+        idempotency_key=idempotency_key,
+    )
+
+
+def _flush_unless_duplicate(db: Session, transaction: Transaction) -> None:
+    """
+    Flush a new or changed transaction, turning a fingerprint clash into
+    409 Conflict naming the transaction it duplicates.
+    """
+    fingerprint = transaction.fingerprint
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        existing = find_duplicate(db, fingerprint) if fingerprint else None
+        if existing is None:
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Duplicate of transaction {existing.id}",
+        )
 
 
 @router.post(
@@ -93,44 +589,350 @@ def get_single_transaction(
 )
 def create_transaction(
     transaction: TransactionCreate,
-    current_user: User = Depends(get_current_active_user),
+    idempotency_key: Optional[str] = Header(
+        None,
+        alias="Idempotency-Key",
+        description="Unique per transaction; a retry with the same key gets 409",
+    ),
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
     Create a new transaction
+
+    Without a category, the best matching category rule picks one (see
+    ``/category-rules``); if none matches it is stored as uncategorised.
+
+    Identical transactions (two coffees on one day) are all stored. Send an
+    ``Idempotency-Key`` header to make retries safe: a request repeating
+    both the key and the transaction is rejected with 409 Conflict naming
+    the transaction it created.
     """
-    category = db.query(Category).filter(Category.name == transaction.category).first()
-    if not category:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Category: {Transaction.category} not found",
+    if transaction.category is None:
+        category_id = matcher_for(db, current_user.id).categorise(
+            transaction.description, transaction.type
         )
+    else:
+        category_ids = resolve_categories(db, current_user, [transaction.category])
+        if transaction.category not in category_ids:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Category: {transaction.category} not found",
+            )
+        category_id = category_ids[transaction.category]
 
     transaction_data = transaction.model_dump(exclude={"category"})
+    transaction_data["amount"] = to_minor_units(transaction.amount)
+    transaction_data["date"] = transaction.date or datetime.now(timezone.utc)
 
     new_transaction = Transaction(
         **transaction_data,
         user_id=current_user.id,
-        category_id=category.id,
+        category_id=category_id,
         status="completed",
     )
+    if idempotency_key is not None:
+        new_transaction.fingerprint = _fingerprint(new_transaction, idempotency_key)
 
     db.add(new_transaction)
+    _flush_unless_duplicate(db, new_transaction)
+    record_transaction(db, new_transaction)
+    bump_data_version(db, current_user.id)
     db.commit()
     db.refresh(new_transaction)
 
     return transaction_to_response(new_transaction)
 
 
+@router.post("/bulk", response_model=BulkTransactionResult)
+def create_transactions_bulk(
+    batch: BulkTransactionCreate,
+    on_conflict: Literal["insert", "skip"] = Query(
+        "insert", description="skip: leave out transactions already stored"
+    ),
+    current_user: TokenUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Create many transactions in one request and one database transaction
+
+    Each item takes the same fields as a single create. Invalid items are
+    reported by position and skipped; the valid ones are still created.
+
+    By default every item is created, so identical purchases sent in
+    separate requests are all kept. With ``on_conflict=skip`` items
+    matching a transaction already stored (by date, amount, description
+    and account, numbered within the batch) are counted as ``skipped``, so
+    a batch can be safely retried; but then a genuine identical purchase
+    in a later batch is skipped too. Items created without ``skip`` are
+    never matched by later skipping batches or imports.
+    """
+    items, errors = [], []
+    for index, raw in enumerate(batch.transactions):
+        try:
+            items.append((index, TransactionCreate.model_validate(raw)))
+        except ValidationError as error:
+            errors.append((index, _validation_detail(error)))
+
+    created, skipped, insert_errors = insert_transactions(
+        db, current_user, items, skip_duplicates=on_conflict == "skip"
+    )
+    errors.extend(insert_errors)
+    if created:
+        bump_data_version(db, current_user.id)
+        db.commit()
+
+    return BulkTransactionResult(
+        created=created,
+        skipped=skipped,
+        failed=len(errors),
+        errors=[
+            BulkTransactionError(index=index, detail=detail)
+            for index, detail in sorted(errors)
+        ],
+    )
+
+
+def _reject_archived(user: TokenUser, transaction_ids: Iterable[UUID]) -> None:
+    """
+    409 Conflict if any of ``transaction_ids`` is archived, and so read-only
+    (see ``app.archive``).
+    """
+    archive = load_archive(user.id)
+    archived = archive.archived_ids(transaction_ids) if archive is not None else ()
+    if archived:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Archived transactions are read-only: "
+            + ", ".join(sorted(str(transaction_id) for transaction_id in archived)),
+        )
+
+
+def _select_transactions(db: Session, user: TokenUser, selection: TransactionSelection):
+    """
+    The user's transactions picked by a bulk selection's IDs or filter.
+    Selecting an archived transaction by ID is rejected; a filter only
+    matches the table.
+    """
+    query = db.query(Transaction).filter(Transaction.user_id == user.id)
+    if selection.ids:
+        _reject_archived(user, selection.ids)
+        return query.filter(Transaction.id.in_(selection.ids))
+
+    criteria = selection.filter
+    query = _apply_filters(
+        query,
+        criteria.type,
+        criteria.category_id,
+        criteria.start_date,
+        criteria.end_date,
+    )
+    if criteria.q is not None:
+        query = search_transactions(
+            query, criteria.q, user.id, db.get_bind().dialect.name
+        )
+    return query
+
+
+def _matching(db: Session, selection):
+    """
+    A single-table query for the selected rows, which ``update()`` and
+    ``delete()`` need since a search selection joins the full-text index.
+    """
+    ids = selection.with_entities(Transaction.id).order_by(None).subquery()
+    return db.query(Transaction).filter(Transaction.id.in_(select(ids.c.id)))
+
+
+@router.post("/bulk/update", response_model=BulkChangeResult)
+def update_transactions_bulk(
+    batch: BulkTransactionUpdate,
+    current_user: TokenUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Set the category, type, currency or status of many transactions at once
+
+    Transactions are picked by ``ids`` or by ``filter``, which takes the
+    same filters as the listing (search included), and changed with one
+    UPDATE. Dashboard rollups move per day and category, not per row.
+
+    Archived transactions are read-only: picking one by ID is rejected with
+    409 Conflict, and a filter leaves them out of the count and the change.
+    """
+    changes = batch.changes.model_dump(exclude_none=True)
+    if "category" in changes:
+        name = changes.pop("category")
+        category_ids = resolve_categories(db, current_user, [name])
+        if name not in category_ids:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Category: {name} not found",
+            )
+        changes["category_id"] = category_ids[name]
+
+    selection = _select_transactions(db, current_user, batch)
+    groups = transaction_groups(selection)
+    affected = _matching(db, selection).update(
+        {**changes, "updated_at": datetime.now(timezone.utc)},
+        synchronize_session=False,
+    )
+    if affected:
+        record_transaction_groups(db, current_user.id, groups, changes)
+        bump_data_version(db, current_user.id)
+        db.commit()
+
+    return BulkChangeResult(affected=affected)
+
+
+@router.post("/bulk/delete", response_model=BulkChangeResult)
+def delete_transactions_bulk(
+    batch: BulkTransactionDelete,
+    current_user: TokenUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Delete many transactions at once
+
+    Transactions are picked by ``ids`` or by ``filter`` as for a bulk
+    update, and removed with one DELETE. As there, archived transactions
+    are rejected by ID and left out by a filter.
+    """
+    selection = _select_transactions(db, current_user, batch)
+    groups = transaction_groups(selection)
+    affected = _matching(db, selection).delete(synchronize_session=False)
+    if affected:
+        record_transaction_groups(db, current_user.id, groups)
+        bump_data_version(db, current_user.id)
+        db.commit()
+
+    return BulkChangeResult(affected=affected)
+
+
+def _import_events(
+    db: Session,
+    user: TokenUser,
+    records: Iterator[Tuple[int, dict]],
+    account: str,
+    skip_duplicates: bool = True,
+) -> Iterator[str]:
+    """
+    Validate, insert and commit statement records a chunk at a time,
+    yielding an NDJSON progress event after each commit.
+    """
+    processed = created = skipped = failed = 0
+    errors: List[dict] = []
+    # Numbers identical rows across chunks so they aren't mistaken for
+    # duplicates of each other
+    seen: Counter = Counter()
+
+    def event(name: str, **extra) -> str:
+        counts = {
+            "processed": processed,
+            "created": created,
+            "skipped": skipped,
+            "failed": failed,
+        }
+        return json.dumps({"event": name, **counts, **extra}) + "\n"
+
+    try:
+        for chunk in chunked(records, IMPORT_CHUNK_SIZE):
+            items, chunk_errors = [], []
+            for line, record in chunk:
+                try:
+                    item = TransactionImport.model_validate(
+                        {"account": account, **record}
+                    )
+                    items.append((line, item))
+                except ValidationError as error:
+                    chunk_errors.append((line, _validation_detail(error)))
+
+            inserted, duplicates, insert_errors = insert_transactions(
+                db, user, items, seen, skip_duplicates
+            )
+            if inserted:
+                bump_data_version(db, user.id)
+                db.commit()
+
+            chunk_errors.extend(insert_errors)
+            processed += len(chunk)
+            created += inserted
+            skipped += duplicates
+            failed += len(chunk_errors)
+            # Keep the report bounded however bad the file is
+            for line, detail in sorted(chunk_errors):
+                if len(errors) < MAX_REPORTED_IMPORT_ERRORS:
+                    errors.append({"line": line, "detail": detail})
+            yield event("progress")
+    except (csv.Error, SQLAlchemyError) as error:
+        db.rollback()
+        yield event("failed", detail=str(error), errors=errors)
+        return
+
+    yield event("complete", errors=errors)
+
+
+@router.post("/import")
+def import_transactions(
+    file: UploadFile = File(description="Bank statement export"),
+    format: Optional[Literal["csv", "ofx", "qif"]] = Query(
+        None, description="Statement format, if not clear from the file name"
+    ),
+    account: str = Query("Imported", description="Account for rows without one"),
+    day_first: bool = Query(True, description="Read 03/04/2026 as 3 April"),
+    on_conflict: Literal["insert", "skip"] = Query(
+        "skip", description="insert: keep rows matching stored transactions too"
+    ),
+    current_user: TokenUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Import a CSV, OFX or QIF bank statement of any size
+
+    The file is parsed as a stream and committed every
+    ``IMPORT_CHUNK_SIZE`` rows. The response is newline-delimited JSON: a
+    ``progress`` event after each chunk, then a ``complete`` (or
+    ``failed``) event listing rejected rows by line number. Rows committed
+    before a failure are kept.
+
+    Transactions that are already stored, from an earlier import of an
+    overlapping statement or a skipping bulk create, are counted as
+    ``skipped``: a statement is usually re-ingested rather than new. Rows
+    are matched by date, amount, description and account, numbered within
+    the file, so a statement's identical purchases are all kept, but one
+    repeated across two statements is taken as the same purchase. Pass
+    ``on_conflict=insert`` to keep every row.
+    """
+    format = format or detect_format(file.filename)
+    if format is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unrecognised statement format, pass format=csv, ofx or qif",
+        )
+
+    stream = io.TextIOWrapper(
+        file.file, encoding="utf-8-sig", errors="replace", newline=""
+    )
+    records = parse_statement(stream, format, day_first)
+    return StreamingResponse(
+        _import_events(db, current_user, records, account, on_conflict == "skip"),
+        media_type="application/x-ndjson",
+    )
+
+
 @router.put("/{transaction_id}", response_model=TransactionResponse)
 def update_transaction(
     transaction_id: UUID,
     transaction_update: TransactionUpdate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
     Update an existing transaction
+
+    Its fingerprint is kept as it was: it identifies the transaction as
+    first created or imported, so re-importing that statement still skips
+    it, and an edit can't clash with an identical twin. Archived
+    transactions are read-only, so updating one gets 409 Conflict.
     """
     transaction = (
         db.query(Transaction)
@@ -141,15 +943,21 @@ def update_transaction(
     )
 
     if not transaction:
+        _reject_archived(current_user, [transaction_id])
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Transaction with id {transaction_id} not found",
         )
 
     update_data = transaction_update.model_dump(exclude_unset=True)
+    if update_data.get("amount") is not None:
+        update_data["amount"] = to_minor_units(update_data["amount"])
 
+    record_transaction(db, transaction, sign=-1)
     for field, value in update_data.items():
         setattr(transaction, field, value)
+    record_transaction(db, transaction)
+    bump_data_version(db, current_user.id)
 
     transaction.updated_at = datetime.now(timezone.utc)
 
@@ -162,11 +970,13 @@ def update_transaction(
 @router.delete("/{transaction_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_transaction(
     transaction_id: UUID,
-    current_user: User = Depends(get_current_active_user),
+    current_user: TokenUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
     Delete an existing transaction
+
+    Archived transactions are read-only, so deleting one gets 409 Conflict.
     """
     transaction = (
         db.query(Transaction)
@@ -177,11 +987,14 @@ def delete_transaction(
     )
 
     if not transaction:
+        _reject_archived(current_user, [transaction_id])
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Transaction with id {transaction_id} not found",
         )
 
+    record_transaction(db, transaction, sign=-1)
+    bump_data_version(db, current_user.id)
     db.delete(transaction)
     db.commit()
 
@@ -1,8 +1,15 @@
-from datetime import date, datetime
-from typing import List, Literal, Optional
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Literal, Optional
 from uuid import UUID
 
-from pydantic import BaseModel, EmailStr, Field, ValidationInfo, field_validator
+from pydantic import (
+    BaseModel,
+    EmailStr,
+    Field,
+    ValidationInfo,
+    field_validator,
+    model_validator,
+)
 
 # ----Transaction class models----
 
@@ -26,13 +33,25 @@ class TransactionBase(BaseModel):
         default="GBP", description="The currency the transaction is in"
     )
 
+    @field_validator("date")
+    @classmethod
+    def date_as_naive_utc(cls, value):
+        # Dates are stored as naive UTC; SQLite would otherwise keep the
+        # local wall-clock time and rollups would read it back on another day
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
 
 class TransactionCreate(TransactionBase):
     """
     Model inherits from TransactionBase for creating a new transaction
     """
 
-    pass
+    category: Optional[str] = Field(
+        default=None,
+        description="The category; chosen by the user's category rules if omitted",
+    )
 
 
 class TransactionResponse(TransactionBase):
@@ -70,6 +89,142 @@ class TransactionUpdate(TransactionBase):
     status: Optional[Literal["completed", "pending"]] = None
 
 
+class TransactionImport(TransactionBase):
+    """
+    Model inherits from TransactionBase for rows read from a bank statement
+    """
+
+    date: datetime = Field(description="The date and time the transaction occurred")
+    category: Optional[str] = Field(
+        default=None, description="The category, if the statement has one"
+    )
+
+
+MAX_BULK_TRANSACTIONS = 5000
+
+
+class BulkTransactionCreate(BaseModel):
+    """
+    A batch of transactions to create in one request. Items are validated
+    individually so one bad row doesn't reject the rest.
+    """
+
+    transactions: List[Dict[str, Any]] = Field(
+        min_length=1,
+        max_length=MAX_BULK_TRANSACTIONS,
+        description="Transactions in the same shape as a single create",
+    )
+
+
+class BulkTransactionError(BaseModel):
+    """
+    Why one item of a bulk create was rejected
+    """
+
+    index: int = Field(description="Position of the item in the request")
+    detail: str = Field(description="What was wrong with the item")
+
+
+class BulkTransactionResult(BaseModel):
+    """
+    Outcome of a bulk create
+    """
+
+    created: int = Field(description="Number of transactions created")
+    skipped: int = Field(
+        default=0, description="Number of items already stored, not created again"
+    )
+    failed: int = Field(description="Number of items rejected")
+    errors: List[BulkTransactionError] = Field(
+        description="One entry per rejected item"
+    )
+
+
+class TransactionFilter(BaseModel):
+    """
+    Selects transactions the same way as the listing's query parameters
+    """
+
+    q: Optional[str] = Field(
+        None, min_length=1, max_length=200, description="Search descriptions"
+    )
+    type: Optional[Literal["income", "expense"]] = Field(
+        None, description="Filter by type"
+    )
+    category_id: Optional[UUID] = Field(None, description="Filter by category")
+    start_date: Optional[datetime] = Field(None, description="Filter by start date")
+    end_date: Optional[datetime] = Field(None, description="Filter by end date")
+
+
+class TransactionSelection(BaseModel):
+    """
+    The transactions a bulk update or delete applies to: either explicit IDs
+    or a filter, never neither, so an empty request can't touch everything
+    """
+
+    ids: Optional[List[UUID]] = Field(
+        None,
+        min_length=1,
+        max_length=MAX_BULK_TRANSACTIONS,
+        description="Transactions to change",
+    )
+    filter: Optional[TransactionFilter] = Field(
+        None, description="Change every transaction matching these filters"
+    )
+
+    @model_validator(mode="after")
+    def exactly_one_selector(self):
+        # An empty filter would match the whole ledger
+        has_filter = self.filter is not None and self.filter.model_dump(
+            exclude_none=True
+        )
+        if bool(self.ids) == bool(has_filter):
+            raise ValueError("Pass either ids or a non-empty filter")
+        return self
+
+
+class TransactionBulkChanges(BaseModel):
+    """
+    Fields to set on every selected transaction. Per-transaction fields
+    (amount, date, description, account) can't be changed in bulk.
+    """
+
+    category: Optional[str] = Field(None, description="New category name")
+    type: Optional[Literal["income", "expense"]] = None
+    currency: Optional[str] = None
+    status: Optional[Literal["completed", "pending"]] = None
+
+
+class BulkTransactionUpdate(TransactionSelection):
+    """
+    A set-based update of many transactions
+    """
+
+    changes: TransactionBulkChanges = Field(description="Fields to set")
+
+    @model_validator(mode="after")
+    def changes_not_empty(self):
+        if not self.changes.model_dump(exclude_none=True):
+            raise ValueError("Nothing to change")
+        return self
+
+
+class BulkTransactionDelete(TransactionSelection):
+    """
+    A set-based delete of many transactions
+    """
+
+    pass
+
+
+class BulkChangeResult(BaseModel):
+    """
+    Outcome of a bulk update or delete
+    """
+
+    affected: int = Field(description="Number of transactions changed")
+
+
 # ----User class models----
 
 
@@ -162,11 +317,17 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     """
-    Data that is stored in JWT Token
+    Data that is stored in JWT Token. Tokens issued before they carried the
+    user's ID and flags only have ``username``
     """
 
     username: Optional[str] = None
     user_id: Optional[UUID] = None
+    is_active: Optional[bool] = None
+    is_demo: Optional[bool] = None
+    jti: Optional[str] = None
+    issued_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
 
 
 # ----Category class models----
@@ -225,6 +386,69 @@ class CategoryUpdate(BaseModel):
     colour: Optional[str] = None
 
 
+# ----Category rule class models----
+
+
+class CategoryRuleBase(BaseModel):
+    """
+    Base model with shared fields for category rules
+    """
+
+    category_id: UUID = Field(description="The category matching transactions get")
+    kind: Literal["keyword", "merchant", "regex"] = Field(
+        default="keyword",
+        description=(
+            "keyword: whole words anywhere in the description; merchant: "
+            "words the description starts with; regex: a regular expression"
+        ),
+    )
+    pattern: str = Field(
+        min_length=1, max_length=200, description="The text or expression to match"
+    )
+    priority: int = Field(
+        default=0, ge=-100, le=100, description="Higher priority rules win"
+    )
+
+
+class CategoryRuleCreate(CategoryRuleBase):
+    """
+    Model inherits from CategoryRuleBase for creating a new category rule
+    """
+
+    pass
+
+
+class CategoryRuleUpdate(BaseModel):
+    """
+    Model for updating a category rule
+    """
+
+    category_id: Optional[UUID] = None
+    kind: Optional[Literal["keyword", "merchant", "regex"]] = None
+    pattern: Optional[str] = Field(None, min_length=1, max_length=200)
+    priority: Optional[int] = Field(None, ge=-100, le=100)
+
+
+class CategoryRuleResponse(CategoryRuleBase):
+    """
+    Model for properties returned to client
+    """
+
+    id: UUID = Field(description="The unique identifier of the rule")
+    user_id: Optional[UUID] = Field(
+        None, description="The rule's owner; global rules have none"
+    )
+    created_at: datetime = Field(
+        description="The date and time the rule was created in the database"
+    )
+    updated_at: datetime = Field(
+        description="The date and time the rule was last updated in the database"
+    )
+
+    class Config:
+        from_attributes = True
+
+
 # ----Budget class models----
 
 
@@ -302,6 +526,92 @@ class BudgetUpdate(BaseModel):
     alert_threshold: Optional[float] = Field(None, ge=0.0, le=1.0)
 
 
+# ----Recurring transaction class models----
+
+
+class RecurringRuleBase(BaseModel):
+    """
+    Base model with shared fields for recurring transactions
+    """
+
+    amount: float = Field(gt=0, description="The amount of each transaction")
+    description: str = Field(description="The description of each transaction")
+    category_id: Optional[UUID] = Field(
+        None, description="The category each transaction belongs to"
+    )
+    type: Literal["income", "expense"] = Field(
+        description="The type of each transaction"
+    )
+    account: str = Field(description="The account each transaction belongs to")
+    currency: str = Field(default="GBP", description="The currency of the amount")
+    frequency: Literal["daily", "weekly", "monthly", "yearly"] = Field(
+        description="How often the transaction repeats"
+    )
+    interval: int = Field(
+        default=1, ge=1, le=365, description="Repeat every this many periods"
+    )
+    start_date: date = Field(description="The day of the first transaction")
+    end_date: Optional[date] = Field(
+        None, description="No transactions are posted after this day"
+    )
+
+    @field_validator("end_date")
+    @classmethod
+    def end_date_not_before_start_date(cls, value, info: ValidationInfo):
+        if value is not None and "start_date" in info.data:
+            if value < info.data["start_date"]:
+                raise ValueError("End date can't be before start date")
+        return value
+
+
+class RecurringRuleCreate(RecurringRuleBase):
+    """
+    Model inherits from RecurringRuleBase for creating a recurring transaction
+    """
+
+    pass
+
+
+class RecurringRuleUpdate(BaseModel):
+    """
+    Model for updating a recurring transaction. Changing the schedule only
+    affects occurrences from today on.
+    """
+
+    amount: Optional[float] = Field(None, gt=0)
+    description: Optional[str] = None
+    category_id: Optional[UUID] = None
+    type: Optional[Literal["income", "expense"]] = None
+    account: Optional[str] = None
+    currency: Optional[str] = None
+    frequency: Optional[Literal["daily", "weekly", "monthly", "yearly"]] = None
+    interval: Optional[int] = Field(None, ge=1, le=365)
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    is_active: Optional[bool] = None
+
+
+class RecurringRuleResponse(RecurringRuleBase):
+    """
+    Model for properties returned to client
+    """
+
+    id: UUID = Field(description="The unique identifier of the rule")
+    is_active: bool = Field(description="Whether new transactions are posted")
+    next_due: Optional[date] = Field(
+        description="The day of the next transaction, if any are left"
+    )
+    created_at: datetime = Field(
+        description="The date and time the rule was created in the database"
+    )
+    updated_at: datetime = Field(
+        description="The date and time the rule was last updated in the database"
+    )
+
+    class Config:
+        from_attributes = True
+
+
 # ----Dashboard class models----
 
 
@@ -323,6 +633,13 @@ class DashboardStats(BaseModel):
     Dashboard statistics
     """
 
+    currency: str = Field(
+        default="GBP", description="The currency the totals are converted to"
+    )
+    unconverted_currencies: List[str] = Field(
+        default_factory=list,
+        description="Currencies without exchange rates, included unconverted",
+    )
     period: str
     start_date: datetime
     end_date: datetime
@@ -351,6 +668,13 @@ class QuickStats(BaseModel):
     Simple overview of stats
     """
 
+    currency: str = Field(
+        default="GBP", description="The currency the totals are converted to"
+    )
+    unconverted_currencies: List[str] = Field(
+        default_factory=list,
+        description="Currencies without exchange rates, included unconverted",
+    )
     total_income: float
     total_expense: float
     net_balance: float
@@ -358,6 +682,57 @@ class QuickStats(BaseModel):
     budget_remaining: Optional[float] = None
 
 
+class DashboardOverview(BaseModel):
+    """
+    Everything the dashboard page needs in one response
+    """
+
+    stats: DashboardStats
+    quick_stats: QuickStats
+    spending_by_category: List[CategorySpending]
+
+
+class TimeSeriesPoint(BaseModel):
+    """
+    Totals for a single day, week or month
+    """
+
+    period_start: date
+    income: float
+    expense: float
+    net: float
+    transaction_count: int
+
+
+class TimeSeries(BaseModel):
+    """
+    Income and expense over time, one point per bucket including empty ones
+    """
+
+    currency: str = Field(
+        default="GBP", description="The currency the totals are converted to"
+    )
+    unconverted_currencies: List[str] = Field(
+        default_factory=list,
+        description="Currencies without exchange rates, included unconverted",
+    )
+    bucket: Literal["day", "week", "month"]
+    start_date: date
+    end_date: date
+    points: List[TimeSeriesPoint]
+
+
+class CacheStats(BaseModel):
+    """
+    Dashboard response cache counters for this API process
+    """
+
+    backend: str
+    hits: int
+    misses: int
+    hit_rate: float
+
+
 # ----Learning / gamification class models----
 
 
@@ -0,0 +1,197 @@
+"""
+Full-text search over transaction descriptions.
+
+SQLite keeps an FTS5 index (``transactions_fts``) of descriptions and their
+owners in step with the transactions table through triggers; PostgreSQL
+uses a generated ``tsvector`` column with a GIN index. Both are created
+alongside the transactions table (and by ``app.migrations`` for existing
+databases), and both support ranked prefix matching: ``tes`` finds "Tesco".
+Other databases fall back to a plain substring match.
+
+The index can be rebuilt from the transactions table at any time::
+
+    python -m app.search
+
+The FTS5 index is keyed on the transactions table's implicit ``rowid`` (its
+primary key is a UUID, so there is no integer alias to key on), and SQLite
+may renumber implicit rowids on ``VACUUM``. Vacuum through ``vacuum``, which
+rebuilds the index afterwards, rather than running ``VACUUM`` by hand::
+
+    python -m app.search vacuum
+"""
+
+import re
+from typing import List
+from uuid import UUID
+
+from sqlalchemy import event, false, func, inspect, literal_column, select, table
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Query
+
+from .models import Transaction
+
+FTS_TABLE = "transactions_fts"
+SEARCH_INDEX = "ix_transactions_search"
+
+SQLITE_DDL = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        user_id,
+        description,
+        content='transactions',
+        content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON transactions
+    BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, user_id, description)
+        VALUES (new.rowid, new.user_id, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON transactions
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, user_id, description)
+        VALUES ('delete', old.rowid, old.user_id, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+    AFTER UPDATE OF user_id, description ON transactions
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, user_id, description)
+        VALUES ('delete', old.rowid, old.user_id, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, user_id, description)
+        VALUES (new.rowid, new.user_id, new.description);
+    END
+    """,
+)
+
+POSTGRES_DDL = (
+    """
+    ALTER TABLE transactions ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('simple', coalesce(description, ''))) STORED
+    """,
+    f"""
+    CREATE INDEX IF NOT EXISTS {SEARCH_INDEX}
+    ON transactions USING GIN (search_vector)
+    """,
+)
+
+
+def search_terms(q: str) -> List[str]:
+    """
+    Lower-cased words in a search string; punctuation and operators are
+    dropped so user input can't break the query syntax.
+    """
+    return re.findall(r"\w+", q.lower())
+
+
+def install_search(conn: Connection) -> bool:
+    """
+    Create the search index for the connection's database if it is missing.
+    Returns ``True`` if anything was created.
+    """
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        existed = inspect(conn).has_table(FTS_TABLE)
+        for ddl in SQLITE_DDL:
+            conn.exec_driver_sql(ddl)
+        return not existed
+    if dialect == "postgresql":
+        columns = {col["name"] for col in inspect(conn).get_columns("transactions")}
+        for ddl in POSTGRES_DDL:
+            conn.exec_driver_sql(ddl)
+        return "search_vector" not in columns
+    return False
+
+
+def rebuild_search_index(conn: Connection) -> None:
+    """
+    Re-index every transaction description.
+    """
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')")
+    elif dialect == "postgresql":
+        conn.exec_driver_sql(f"REINDEX INDEX {SEARCH_INDEX}")
+
+
+def vacuum(engine: Engine) -> None:
+    """
+    Compact the database, then rebuild the SQLite search index in case
+    ``VACUUM`` renumbered the rowids it points at.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM")
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            rebuild_search_index(conn)
+
+
+def search_transactions(query: Query, q: str, user_id: UUID, dialect: str) -> Query:
+    """
+    Restrict a user's transactions query to descriptions matching every
+    word of ``q`` as a prefix, best matches first.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return query.filter(false())
+
+    if dialect == "sqlite":
+        fts = table(FTS_TABLE, literal_column("rowid"), literal_column("rank"))
+        # The user's ID is indexed too, so the lookup never touches other
+        # users' matches
+        words = " ".join(f'"{term}"*' for term in terms)
+        match = f'user_id:"{user_id.hex}" AND description:({words})'
+        matches = (
+            select(
+                literal_column("rowid").label("rowid"),
+                literal_column("rank").label("rank"),
+            )
+            .select_from(fts)
+            .where(literal_column(FTS_TABLE).op("MATCH")(match))
+            .subquery()
+        )
+        # FTS5's rank is bm25, where lower is better
+        return query.join(
+            matches, matches.c.rowid == literal_column("transactions.rowid")
+        ).order_by(matches.c.rank)
+
+    if dialect == "postgresql":
+        vector = literal_column("transactions.search_vector")
+        ts_query = func.to_tsquery("simple", " & ".join(f"{t}:*" for t in terms))
+        return query.filter(vector.op("@@")(ts_query)).order_by(
+            func.ts_rank(vector, ts_query).desc()
+        )
+
+    return query.filter(*[Transaction.description.ilike(f"%{term}%") for term in terms])
+
+
+@event.listens_for(Transaction.__table__, "after_create")
+def _create_search_index(target, connection, **kw):
+    install_search(connection)
+
+
+@event.listens_for(Transaction.__table__, "before_drop")
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    from .database import engine
+
+    if sys.argv[1:] == ["vacuum"]:
+        vacuum(engine)
+        print("Vacuumed the database and rebuilt the transaction search index")
+    else:
+        with engine.begin() as conn:
+            install_search(conn)
+            rebuild_search_index(conn)
+        print("Rebuilt the transaction search index")
@@ -3,9 +3,11 @@ from datetime import datetime, timedelta, timezone
 
 from app.auth import get_password_hash
 
+from .cache import bump_data_version
 from .database import Session
 from .models import (
     Category,
+    CategoryRule,
     Course,
     Lesson,
     Question,
@@ -14,6 +16,8 @@ from .models import (
     User,
     UserLearningStats,
 )
+from .money import from_minor_units, to_minor_units
+from .rollups import rebuild_rollups
 
 
 def seed_default_categories():
@@ -200,6 +204,68 @@ def seed_default_categories():
         db.close()
 
 
+def seed_default_category_rules():
+    db = Session()
+
+    try:
+        # (category name, category type, kind, pattern)
+        default_rules = [
+            ("Salary", "income", "keyword", "salary"),
+            ("Salary", "income", "keyword", "payroll"),
+            ("Refunds", "income", "keyword", "refund"),
+            ("Groceries", "expense", "keyword", "tesco"),
+            ("Groceries", "expense", "keyword", "sainsburys"),
+            ("Groceries", "expense", "keyword", "asda"),
+            ("Groceries", "expense", "keyword", "aldi"),
+            ("Groceries", "expense", "keyword", "lidl"),
+            ("Groceries", "expense", "keyword", "waitrose"),
+            ("Food", "expense", "keyword", "deliveroo"),
+            ("Food", "expense", "keyword", "just eat"),
+            ("Food", "expense", "keyword", "pret"),
+            ("Food", "expense", "keyword", "greggs"),
+            ("Transport", "expense", "keyword", "tfl"),
+            ("Transport", "expense", "keyword", "trainline"),
+            ("Transport", "expense", "keyword", "uber"),
+            ("Entertainment", "expense", "keyword", "netflix"),
+            ("Entertainment", "expense", "keyword", "spotify"),
+            ("Utilities", "expense", "keyword", "council tax"),
+            ("Utilities", "expense", "keyword", "octopus energy"),
+            ("Utilities", "expense", "keyword", "thames water"),
+            ("Housing", "expense", "keyword", "rent"),
+            ("Shopping", "expense", "keyword", "amazon"),
+        ]
+
+        categories = {
+            (category.name, category.type): category.id
+            for category in db.query(Category).filter(Category.is_default)
+        }
+        existing = {
+            (rule.category_id, rule.kind, rule.pattern)
+            for rule in db.query(CategoryRule).filter(CategoryRule.user_id.is_(None))
+        }
+
+        rules_added = 0
+        for name, type, kind, pattern in default_rules:
+            category_id = categories.get((name, type))
+            if category_id and (category_id, kind, pattern) not in existing:
+                db.add(
+                    CategoryRule(category_id=category_id, kind=kind, pattern=pattern)
+                )
+                rules_added += 1
+
+        db.commit()
+        print(
+            f"Default category rules seeded successfully: {rules_added} new rules added"
+        )
+
+    except Exception as error:
+        db.rollback()
+        print(f"Error seeding category rules: {error}")
+
+    finally:
+        db.close()
+
+
 def seed_demo_user():
     db = Session()
     # Check id demo user exists
@@ -215,7 +281,7 @@ def seed_demo_user():
                 hashed_password=get_password_hash("demo1234"),
                 is_demo=True,
                 is_active=True,
-                monthly_budget=3500,
+                monthly_budget=to_minor_units(3500),
                 currency_preference="GBP",
             )
             db.add(demo_user)
@@ -530,7 +596,7 @@ def seed_demo_transactions():
                                     Transaction(
                                         user_id=demo_user.id,
                                         category_id=category.id,
-                                        amount=template["amount"],
+                                        amount=to_minor_units(template["amount"]),
                                         description=template["description"],
                                         date=transaction_date,
                                         type=template["type"],
@@ -579,7 +645,7 @@ def seed_demo_transactions():
                                 Transaction(
                                     user_id=demo_user.id,
                                     category_id=category.id,
-                                    amount=amount,
+                                    amount=to_minor_units(amount),
                                     description=template["description"],
                                     date=random_date,
                                     type=template["type"],
@@ -590,14 +656,17 @@ def seed_demo_transactions():
                             )
 
         db.bulk_save_objects(transactions)
+        # Bulk saves bypass the per-transaction rollup updates
+        rebuild_rollups(db, demo_user.id)
+        bump_data_version(db, demo_user.id)
         db.commit()
 
         total_income = sum(t.amount for t in transactions if t.type == "income")
         total_expenses = sum(t.amount for t in transactions if t.type == "expense")
 
         print(f"Demo transactions created: {len(transactions)} transactions")
-        print(f"Total Income: £{total_income:,.2f}")
-        print(f"Total Expenses: £{total_expenses:,.2f}")
+        print(f"Total Income: £{from_minor_units(total_income):,.2f}")
+        print(f"Total Expenses: £{from_minor_units(total_expenses):,.2f}")
 
     except Exception as error:
         db.rollback()
@@ -831,6 +900,7 @@ def seed_learning_content():
 def seed_all():
     print("started database seeding")
     seed_default_categories()
+    seed_default_category_rules()
     seed_demo_user()
     seed_demo_transactions()
     seed_learning_content()
@@ -1,26 +1,49 @@
 import os
+from contextlib import contextmanager
 
 import pytest
 from dotenv import load_dotenv
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
 from app.auth import get_password_hash
 from app.database import Base, get_db
 from app.main import app
-from app.models import User
+from app.models import Category, User
+from app.revocation import revocations
 
 load_dotenv()
 
 
 TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "sqlite:///test_finance_app.db")
 
-engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
+connect_args = (
+    {"check_same_thread": False} if TEST_DATABASE_URL.startswith("sqlite") else {}
+)
+engine = create_engine(TEST_DATABASE_URL, connect_args=connect_args)
 
 TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "postgres: needs TEST_DATABASE_URL to point at PostgreSQL"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """
+    Skip ``postgres`` tests unless the test database is PostgreSQL
+    """
+    if engine.dialect.name == "postgresql":
+        return
+    skip = pytest.mark.skip(reason="needs TEST_DATABASE_URL to point at PostgreSQL")
+    for item in items:
+        if "postgres" in item.keywords:
+            item.add_marker(skip)
+
+
 @pytest.fixture(scope="function")
 def test_db():
     """
@@ -28,6 +51,10 @@ def test_db():
     """
     Base.metadata.create_all(bind=engine)
     db = TestingSession()
+    # Start from the empty table, with the list's periodic refresh (and its
+    # query) not due again during the test
+    revocations.clear()
+    revocations.refresh(db, force=True)
     try:
         yield db
     finally:
@@ -51,6 +78,44 @@ def client(test_db):
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(scope="function")
+def recorded_queries(test_db):
+    """
+    Context manager collecting the (statement, parameters) of every SQL
+    statement run against the test database while it is open
+    """
+    engine = test_db.get_bind()
+
+    @contextmanager
+    def record():
+        queries = []
+
+        def listener(conn, cursor, statement, parameters, context, executemany):
+            queries.append((statement, parameters))
+
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            yield queries
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+    return record
+
+
+@pytest.fixture(scope="function")
+def query_plan(test_db):
+    """
+    SQLite's EXPLAIN QUERY PLAN for a recorded statement, as one string
+    """
+
+    def explain(statement, parameters):
+        with test_db.get_bind().connect() as conn:
+            rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            return " | ".join(row[-1] for row in rows)
+
+    return explain
+
+
 @pytest.fixture(scope="function")
 def test_user(test_db):
     """
@@ -65,7 +130,7 @@ def test_user(test_db):
         first_name="Test",
         last_name="User",
         hashed_password=hashed_password,
-        monthly_budget=3500,
+        monthly_budget=350000,
         currency_preference="GBP",
         is_active=True,
         is_demo=False,
@@ -90,7 +155,7 @@ def test_demo_user(test_db):
         first_name="Demo",
         last_name="User",
         hashed_password=hashed_password,
-        monthly_budget=3500,
+        monthly_budget=350000,
         currency_preference="GBP",
         is_active=True,
         is_demo=True,
@@ -113,3 +178,53 @@ def authenticated_client(client, test_user):
 
     client.headers = {**client.headers, "Authorization": f"Bearer {token}"}
     return client
+
+
+@pytest.fixture(scope="function")
+def auth_headers(client, test_user):
+    """
+    Get authentication headers for the test user
+    """
+    response = client.post(
+        "/auth/login", data={"username": "testuser", "password": "test1234"}
+    )
+    token = response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="function")
+def test_category(test_db):
+    """
+    A default expense category
+    """
+    category = Category(
+        name="Groceries",
+        type="expense",
+        description="Grocery and household items shopping",
+        icon="🛒",
+        colour="#D4C6E0",
+        is_default=True,
+    )
+    test_db.add(category)
+    test_db.commit()
+    test_db.refresh(category)
+    return category
+
+
+@pytest.fixture(scope="function")
+def categories(test_db):
+    """
+    Default income and expense categories, their IDs keyed by name
+    """
+    created = {}
+    for name, type in [
+        ("Groceries", "expense"),
+        ("Transport", "expense"),
+        ("Fuel", "expense"),
+        ("Salary", "income"),
+    ]:
+        category = Category(name=name, type=type, is_default=True)
+        test_db.add(category)
+        created[name] = category
+    test_db.commit()
+    return {name: category.id for name, category in created.items()}
@@ -1,4 +1,15 @@
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
 from fastapi import status
+from jose import jwt
+from sqlalchemy import update
+
+from app.auth import create_access_token, token_claims
+from app.cache import bump_data_version
+from app.models import RevokedToken, User
+from app.principals import PrincipalCache
+from app.revocation import revocations, revoke_user_tokens
 
 
 class TestUserRegistration:
@@ -182,6 +193,152 @@ class TestProtectedEndpoint:
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
 
+class TestPrincipalCache:
+    def login(self, client):
+        login_response = client.post(
+            "/auth/login", data={"username": "testuser", "password": "test1234"}
+        )
+        return {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    def test_repeat_requests_skip_the_user_lookup(
+        self, client, test_user, recorded_queries
+    ):
+        headers = self.login(client)
+        client.get("/notifications/unread-count", headers=headers)
+
+        with recorded_queries() as queries:
+            response = client.get("/notifications/unread-count", headers=headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert not any("FROM users" in query for query, _ in queries)
+
+    def test_deactivation_takes_effect_immediately(self, client, test_db, test_user):
+        user_id = test_user.id
+        headers = self.login(client)
+        assert client.get("/auth/me", headers=headers).status_code == 200
+
+        test_db.get(User, user_id).is_active = False
+        test_db.commit()
+
+        # Deactivation revokes the user's tokens
+        response = client.get("/auth/me", headers=headers)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_profile_shows_other_workers_changes(self, client, test_db, test_user):
+        headers = self.login(client)
+        client.get("/auth/me", headers=headers)
+
+        with test_db.get_bind().begin() as conn:
+            conn.execute(update(User).values(first_name="Renamed"))
+
+        response = client.get("/auth/me", headers=headers)
+        assert response.json()["first_name"] == "Renamed"
+
+    def test_logging_back_in_after_revocation(self, client, test_db, test_user):
+        user_id = test_user.id
+        old = self.login(client)
+
+        revoke_user_tokens(test_db, user_id)
+        test_db.commit()
+        # Issued straight after, within the same second
+        token = create_access_token(token_claims(test_db.get(User, user_id)))
+        new = {"Authorization": f"Bearer {token}"}
+
+        assert client.get("/auth/me", headers=old).status_code == 401
+        assert client.get("/auth/me", headers=new).status_code == 200
+
+    def test_bulk_updates_are_seen(self, client, test_db, test_user):
+        user_id = test_user.id
+        headers = self.login(client)
+        before = client.get("/dashboard/stats", headers=headers).headers["ETag"]
+
+        bump_data_version(test_db, user_id)
+        test_db.commit()
+
+        after = client.get("/dashboard/stats", headers=headers).headers["ETag"]
+        assert after != before
+
+    def test_load_overlapping_a_change_is_not_cached(self, test_user):
+        cache = PrincipalCache(max_entries=10, ttl=60)
+        generation = cache.generation
+        cache.forget(uuid4())
+
+        principal = cache.remember(test_user, generation)
+
+        assert principal.username == "testuser"
+        assert cache.get("testuser") is None
+        cache.remember(test_user, cache.generation)
+        assert cache.get("testuser") == principal
+
+
+class TestTokenRevocation:
+    def login(self, client):
+        login_response = client.post(
+            "/auth/login", data={"username": "testuser", "password": "test1234"}
+        )
+        return login_response.json()["access_token"]
+
+    def test_token_claims_replace_the_user_lookup(
+        self, client, test_user, recorded_queries
+    ):
+        token = self.login(client)
+        claims = jwt.get_unverified_claims(token)
+        assert claims["uid"] == str(test_user.id)
+        assert claims["active"] is True and claims["demo"] is False
+
+        with recorded_queries() as queries:
+            response = client.get(
+                "/notifications/unread-count",
+                headers={"Authorization": f"Bearer {token}"},
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(queries) == 1
+        assert "FROM notifications" in queries[0][0]
+
+    def test_logout_revokes_only_that_token(self, client, test_user):
+        first = {"Authorization": f"Bearer {self.login(client)}"}
+        second = {"Authorization": f"Bearer {self.login(client)}"}
+
+        response = client.post("/auth/logout", headers=first)
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert client.get("/auth/me", headers=first).status_code == 401
+        assert client.get("/auth/me", headers=second).status_code == 200
+
+    def test_other_processes_revocations_apply_on_refresh(
+        self, client, test_db, test_user
+    ):
+        token = self.login(client)
+        headers = {"Authorization": f"Bearer {token}"}
+        expires_at = datetime.now(timezone.utc) + timedelta(minutes=30)
+        # Written straight to the table, as another worker would
+        test_db.add(
+            RevokedToken(
+                jti=jwt.get_unverified_claims(token)["jti"],
+                revoked_at=datetime.now(timezone.utc),
+                expires_at=expires_at,
+            )
+        )
+        test_db.commit()
+        assert client.get("/auth/me", headers=headers).status_code == 200
+
+        revocations.refresh(test_db, force=True)
+
+        assert client.get("/auth/me", headers=headers).status_code == 401
+
+    def test_username_only_tokens_still_work(self, client, test_user):
+        token = create_access_token(data={"sub": "testuser"})
+        headers = {"Authorization": f"Bearer {token}"}
+
+        response = client.get("/auth/me", headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["username"] == "testuser"
+
+        assert client.post("/auth/logout", headers=headers).status_code == 204
+        assert client.get("/auth/me", headers=headers).status_code == 401
+
+
 class TestDemoUserRestrictions:
     def test_demo_user_cannot_update_profile(self, client, test_demo_user):
         """
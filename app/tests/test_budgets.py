@@ -4,38 +4,7 @@ from uuid import uuid4
 import pytest
 from fastapi import status
 
-from app.models import Budget, Category
-
-
-@pytest.fixture
-def auth_headers(client, test_user):
-    """
-    Get authentication headers for the test user
-    """
-    response = client.post(
-        "/auth/login", data={"username": "testuser", "password": "test1234"}
-    )
-    token = response.json()["access_token"]
-    return {"Authorization": f"Bearer {token}"}
-
-
-@pytest.fixture
-def test_category(test_db):
-    """
-    A default category budgets can reference
-    """
-    category = Category(
-        name="Groceries",
-        type="expense",
-        description="Grocery and household shopping",
-        icon="🛒",
-        colour="#D4C6E0",
-        is_default=True,
-    )
-    test_db.add(category)
-    test_db.commit()
-    test_db.refresh(category)
-    return category
+from app.models import Budget
 
 
 @pytest.fixture
@@ -64,7 +33,7 @@ def test_budget(test_db, test_user, test_category):
     budget = Budget(
         user_id=test_user.id,
         category_id=test_category.id,
-        amount=300.0,
+        amount=30000,
         period="monthly",
         start_date=start,
         end_date=start + timedelta(days=30),
@@ -134,6 +103,51 @@ class TestGetBudgets:
         assert response.status_code == status.HTTP_404_NOT_FOUND
 
 
+    def test_sparse_fields(self, client, auth_headers, test_budget):
+        response = client.get(
+            "/budgets/", headers=auth_headers, params={"fields": "id,amount"}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == [{"id": str(test_budget.id), "amount": 300.0}]
+        assert "ETag" in response.headers
+
+    def test_unknown_field(self, client, auth_headers, test_budget):
+        response = client.get(
+            "/budgets/", headers=auth_headers, params={"fields": "id,secret"}
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "secret" in response.json()["detail"]
+
+
+class TestBudgetETags:
+    def test_list_not_modified(self, client, auth_headers, test_budget):
+        etag = client.get("/budgets/", headers=auth_headers).headers["ETag"]
+
+        response = client.get(
+            "/budgets/", headers={**auth_headers, "If-None-Match": etag}
+        )
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_update_changes_etag(self, client, auth_headers, test_budget):
+        url = f"/budgets/{test_budget.id}"
+        etag = client.get(url, headers=auth_headers).headers["ETag"]
+        client.put(url, json={"amount": 750.0}, headers=auth_headers)
+
+        response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["amount"] == 750.0
+
+    def test_filters_have_their_own_etag(self, client, auth_headers, test_budget):
+        everything = client.get("/budgets/", headers=auth_headers)
+        active = client.get("/budgets/?is_active=true", headers=auth_headers)
+
+        assert everything.headers["ETag"] != active.headers["ETag"]
+
+
 class TestUpdateBudget:
     def test_update_budget(self, client, auth_headers, test_budget):
         response = client.put(
@@ -7,18 +7,6 @@ from fastapi import status
 from app.models import Category, Transaction
 
 
-@pytest.fixture
-def auth_headers(client, test_user):
-    """
-    Get auth headers for test user
-    """
-    response = client.post(
-        "/auth/login", data={"username": "testuser", "password": "test1234"}
-    )
-    token = response.json()["access_token"]
-    return {"Authorization": f"Bearer {token}"}
-
-
 @pytest.fixture
 def default_category(test_db):
     """
@@ -77,6 +65,61 @@ class TestGetCategories:
         assert "Side Hustle" in names
 
 
+class TestCategoryETags:
+    def test_list_revalidates_until_categories_change(self, client, auth_headers):
+        etag = client.get("/categories/", headers=auth_headers).headers["ETag"]
+        conditional = {**auth_headers, "If-None-Match": etag}
+
+        unchanged = client.get("/categories/", headers=conditional)
+        client.post(
+            "/categories/",
+            json={
+                "name": "Hobbies",
+                "type": "expense",
+                "description": "Crafts and sport",
+                "icon": "🎨",
+                "colour": "#FFB347",
+            },
+            headers=auth_headers,
+        )
+        changed = client.get("/categories/", headers=conditional)
+
+        assert unchanged.status_code == status.HTTP_304_NOT_MODIFIED
+        assert changed.status_code == status.HTTP_200_OK
+        assert changed.headers["ETag"] != etag
+
+    def test_default_category_changes_revalidate(
+        self, client, auth_headers, test_db, default_category
+    ):
+        category_id = default_category.id
+        etag = client.get("/categories/", headers=auth_headers).headers["ETag"]
+        conditional = {**auth_headers, "If-None-Match": etag}
+
+        # Default categories are shared, so editing one bumps no user's version
+        test_db.get(Category, category_id).icon = "🧺"
+        test_db.commit()
+        edited = client.get("/categories/", headers=conditional)
+
+        test_db.add(Category(name="Travel", type="expense", is_default=True))
+        test_db.commit()
+        added = client.get(
+            "/categories/",
+            headers={**auth_headers, "If-None-Match": edited.headers["ETag"]},
+        )
+
+        assert edited.status_code == status.HTTP_200_OK
+        assert added.status_code == status.HTTP_200_OK
+        assert "Travel" in {category["name"] for category in added.json()}
+
+    def test_single_category_not_modified(self, client, auth_headers, default_category):
+        url = f"/categories/{default_category.id}"
+        etag = client.get(url, headers=auth_headers).headers["ETag"]
+
+        response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
 class TestGetSingleCategory:
     def test_get_single_category(self, client, auth_headers, default_category):
         """
@@ -248,7 +291,7 @@ class TestDeleteCategory:
         transaction = Transaction(
             user_id=test_user.id,
             category_id=custom_category.id,
-            amount=20.00,
+            amount=2000,
             description="Test transaction",
             date=datetime.now(timezone.utc),
             type="expense",
@@ -0,0 +1,253 @@
+from uuid import uuid4
+
+import pytest
+from fastapi import status
+
+from app.auth import get_password_hash
+from app.categorisation import CategoryMatcher
+from app.models import CategoryRule, User
+
+
+@pytest.fixture
+def global_rules(test_db, categories):
+    """
+    A few rules everyone shares
+    """
+    for name, pattern in [
+        ("Groceries", "tesco"),
+        ("Transport", "uber"),
+        ("Salary", "salary"),
+    ]:
+        test_db.add(CategoryRule(category_id=categories[name], pattern=pattern))
+    test_db.commit()
+
+
+def create_rule(client, auth_headers, category_id, pattern, **fields):
+    response = client.post(
+        "/category-rules/",
+        json={"category_id": str(category_id), "pattern": pattern, **fields},
+        headers=auth_headers,
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    return response.json()
+
+
+def create_transaction(client, auth_headers, description, type="expense"):
+    response = client.post(
+        "/transactions/",
+        json={
+            "amount": 10.0,
+            "description": description,
+            "type": type,
+            "account": "Current",
+            "date": None,
+        },
+        headers=auth_headers,
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    return response.json()
+
+
+class TestMatcher:
+    def matcher(self, *rules):
+        # (type, kind, pattern, priority, is_global, category)
+        return CategoryMatcher(rules)
+
+    def test_keywords_match_whole_words_in_any_case(self):
+        matcher = self.matcher(("expense", "keyword", "Tesco", 0, True, "groceries"))
+        description = "CARD PAYMENT TESCO STORES 3012"
+        assert matcher.categorise(description, "expense") == "groceries"
+        assert matcher.categorise("TESCOS-EXPRESS", "expense") is None
+
+    def test_multi_word_keywords(self):
+        matcher = self.matcher(("expense", "keyword", "council tax", 0, True, "bills"))
+        assert matcher.categorise("DD Council  Tax 2024", "expense") == "bills"
+        assert matcher.categorise("Council of Tax", "expense") is None
+
+    def test_merchant_matches_start_only(self):
+        matcher = self.matcher(("expense", "merchant", "shell", 0, True, "fuel"))
+        assert matcher.categorise("*SHELL EXPRESS 42", "expense") == "fuel"
+        assert matcher.categorise("Payment to shell", "expense") is None
+
+    def test_regex_with_groups(self):
+        matcher = self.matcher(
+            ("expense", "regex", r"(uber|bolt)\s+trip", 0, True, "transport"),
+            ("expense", "regex", r"tfl\d+", 0, True, "tube"),
+        )
+        assert matcher.categorise("BOLT TRIP 12", "expense") == "transport"
+        assert matcher.categorise("TFL123", "expense") == "tube"
+
+    def test_only_rules_for_the_type(self):
+        matcher = self.matcher(("income", "keyword", "salary", 0, True, "salary"))
+        assert matcher.categorise("Salary sacrifice", "expense") is None
+        assert matcher.categorise("ACME salary", "income") == "salary"
+
+    def test_earliest_match_wins_among_equals(self):
+        matcher = self.matcher(
+            ("expense", "keyword", "petrol", 0, True, "fuel"),
+            ("expense", "regex", "tesco", 0, True, "groceries"),
+        )
+        assert matcher.categorise("Tesco petrol", "expense") == "groceries"
+        assert matcher.categorise("Petrol at Tesco", "expense") == "fuel"
+
+    def test_priority_then_user_rules_win(self):
+        matcher = self.matcher(
+            ("expense", "keyword", "tesco", 0, True, "groceries"),
+            ("expense", "keyword", "petrol", 0, False, "fuel"),
+            ("expense", "regex", "express", 5, True, "convenience"),
+        )
+        assert matcher.categorise("Tesco petrol", "expense") == "fuel"
+        assert matcher.categorise("Tesco Express petrol", "expense") == "convenience"
+
+
+class TestCategoryRules:
+    def test_requires_auth(self, client, categories):
+        response = client.post(
+            "/category-rules/",
+            json={"category_id": str(categories["Fuel"]), "pattern": "shell"},
+        )
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_create_rule(self, client, auth_headers, categories):
+        rule = create_rule(client, auth_headers, categories["Fuel"], "shell")
+        assert rule["kind"] == "keyword"
+        assert rule["priority"] == 0
+        assert rule["user_id"] is not None
+
+    def test_create_with_unknown_category(self, client, auth_headers):
+        response = client.post(
+            "/category-rules/",
+            json={"category_id": str(uuid4()), "pattern": "shell"},
+            headers=auth_headers,
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.parametrize(
+        "kind, pattern",
+        [("regex", "(unclosed"), ("regex", r"(a)\1"), ("keyword", "---")],
+    )
+    def test_unusable_patterns_are_rejected(
+        self, client, auth_headers, categories, kind, pattern
+    ):
+        response = client.post(
+            "/category-rules/",
+            json={
+                "category_id": str(categories["Fuel"]),
+                "kind": kind,
+                "pattern": pattern,
+            },
+            headers=auth_headers,
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_list_includes_global_rules(
+        self, client, auth_headers, categories, global_rules
+    ):
+        create_rule(client, auth_headers, categories["Fuel"], "shell", priority=1)
+
+        rules = client.get("/category-rules/", headers=auth_headers).json()
+        assert [rule["pattern"] for rule in rules][:1] == ["shell"]
+        assert len(rules) == 4
+
+    def test_global_rules_are_read_only(
+        self, client, auth_headers, test_db, global_rules
+    ):
+        rule = test_db.query(CategoryRule).first()
+        response = client.put(
+            f"/category-rules/{rule.id}", json={"priority": 9}, headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestAutoCategorisation:
+    def test_create_without_category_uses_rules(
+        self, client, auth_headers, global_rules
+    ):
+        transaction = create_transaction(client, auth_headers, "TESCO STORES 3012")
+        assert transaction["category"] == "Groceries"
+
+    def test_create_without_match_is_uncategorised(
+        self, client, auth_headers, global_rules
+    ):
+        transaction = create_transaction(client, auth_headers, "Corner shop")
+        assert transaction["category"] == "Uncategorised"
+
+    def test_rule_changes_take_effect(
+        self, client, auth_headers, categories, global_rules
+    ):
+        def category_of(description):
+            return create_transaction(client, auth_headers, description)["category"]
+
+        assert category_of("Tesco petrol") == "Groceries"
+
+        rule = create_rule(
+            client, auth_headers, categories["Fuel"], "petrol", priority=1
+        )
+        assert category_of("Tesco petrol 2") == "Fuel"
+
+        client.put(
+            f"/category-rules/{rule['id']}",
+            json={"pattern": "diesel"},
+            headers=auth_headers,
+        )
+        assert category_of("Tesco petrol 3") == "Groceries"
+
+        client.delete(f"/category-rules/{rule['id']}", headers=auth_headers)
+        assert category_of("Tesco diesel") == "Groceries"
+
+    def test_other_users_rules_are_ignored(
+        self, client, auth_headers, test_db, categories
+    ):
+        other = User(
+            username="other",
+            email="other@test.com",
+            first_name="Other",
+            last_name="User",
+            hashed_password=get_password_hash("other1234"),
+            monthly_budget=0,
+        )
+        test_db.add(other)
+        test_db.commit()
+        test_db.add(
+            CategoryRule(
+                user_id=other.id, category_id=categories["Fuel"], pattern="shell"
+            )
+        )
+        test_db.commit()
+
+        transaction = create_transaction(client, auth_headers, "Shell")
+        assert transaction["category"] == "Uncategorised"
+
+    def test_bulk_import_categorises_without_per_row_queries(
+        self, client, auth_headers, global_rules, recorded_queries
+    ):
+        items = [
+            {
+                "amount": 1.0 + n,
+                "description": f"{merchant} {n}",
+                "type": "expense",
+                "account": "Current",
+                "date": None,
+            }
+            for n, merchant in enumerate(["TESCO", "Uber trip", "Corner shop"] * 100)
+        ]
+
+        with recorded_queries() as queries:
+            response = client.post(
+                "/transactions/bulk",
+                json={"transactions": items},
+                headers=auth_headers,
+            )
+
+        assert response.json()["created"] == 300
+        rule_queries = [q for q, _ in queries if "category_rules" in q]
+        assert len(rule_queries) <= 2
+
+        listed = client.get(
+            "/transactions/", headers=auth_headers, params={"limit": 50}
+        ).json()
+        assert {t["category"] for t in listed} == {
+            "Groceries",
+            "Transport",
+            "Uncategorised",
+        }
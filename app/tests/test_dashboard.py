@@ -0,0 +1,730 @@
+import io
+from datetime import date, datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from fastapi import status
+from sqlalchemy import Date, literal, select, text
+
+from app.cache import MemoryBackend, response_cache
+from app.fx import convert_totals, load_rates, read_rates
+from app.migrations import run_migrations
+from app.models import DailyUserCategoryTotal, User, UserBalance
+from app.rollups import adjust_rollup, rebuild_rollups
+from app.timeseries import bucket_expression, bucket_range, bucket_start, fill_buckets
+
+
+def create_transaction(
+    client, headers, amount, category, type, days_ago=0, currency="GBP"
+):
+    """
+    Create a transaction through the API so every write path is exercised
+    """
+    response = client.post(
+        "/transactions/",
+        headers=headers,
+        json={
+            "amount": amount,
+            "description": f"{category} {amount}",
+            "category": category,
+            "type": type,
+            "account": "Main Account",
+            "currency": currency,
+            "date": (datetime.now(timezone.utc) - timedelta(days=days_ago)).isoformat(),
+        },
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    return response.json()
+
+
+@pytest.fixture
+def ledger(client, auth_headers, categories):
+    """
+    A small ledger: this month's salary and shopping plus an older shop
+    """
+    create_transaction(client, auth_headers, 2000.00, "Salary", "income")
+    create_transaction(client, auth_headers, 40.00, "Groceries", "expense")
+    create_transaction(client, auth_headers, 60.00, "Groceries", "expense")
+    create_transaction(client, auth_headers, 25.00, "Groceries", "expense", 100)
+
+
+class TestDashboardStats:
+    def test_requires_auth(self, client):
+        response = client.get("/dashboard/stats")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_empty_ledger(self, client, auth_headers):
+        response = client.get("/dashboard/stats", headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["total_income"] == 0
+        assert data["total_expense"] == 0
+        assert data["total_transactions"] == 0
+        assert data["average_transaction_amount"] == 0
+        assert data["top_spending_categories"] == []
+
+    def test_totals_and_counts(self, client, auth_headers, ledger):
+        response = client.get(
+            "/dashboard/stats", headers=auth_headers, params={"days": 30}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["period"] == "last_30_days"
+        assert data["total_income"] == 2000.00
+        assert data["total_expense"] == 100.00
+        assert data["net_balance"] == 1900.00
+        assert data["total_transactions"] == 3
+        assert data["income_transactions"] == 1
+        assert data["expense_transactions"] == 2
+        assert data["average_transaction_amount"] == pytest.approx(700.00)
+
+        top = data["top_spending_categories"]
+        assert len(top) == 1
+        assert top[0]["category_name"] == "Groceries"
+        assert top[0]["total_amount"] == 100.00
+        assert top[0]["transaction_count"] == 2
+        assert top[0]["percentage"] == 100
+
+    def test_wider_window_includes_older_transactions(
+        self, client, auth_headers, ledger
+    ):
+        response = client.get(
+            "/dashboard/stats", headers=auth_headers, params={"days": 365}
+        )
+
+        data = response.json()
+        assert data["total_expense"] == 125.00
+        assert data["expense_transactions"] == 3
+
+    def test_recent_transactions(self, client, auth_headers, ledger):
+        response = client.get("/dashboard/stats", headers=auth_headers)
+
+        recent = response.json()["recent_transactions"]
+        assert len(recent) == 4
+        assert {t["category"] for t in recent} == {"Groceries", "Salary"}
+
+
+class TestQuickStats:
+    def test_lifetime_totals_and_budget(self, client, auth_headers, ledger):
+        response = client.get("/dashboard/quick-stats", headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["total_income"] == 2000.00
+        assert data["total_expense"] == 125.00
+        assert data["net_balance"] == 1875.00
+        # The test user's monthly budget is 3500; the 100-day-old shop is
+        # outside the current month.
+        assert data["budget_remaining"] == pytest.approx(3400.00)
+        assert data["budget_spent_percentage"] == pytest.approx(100 / 3500 * 100)
+
+    def test_balance_tracks_writes(
+        self, client, auth_headers, test_db, test_user, ledger
+    ):
+        transaction = create_transaction(
+            client, auth_headers, 10.00, "Groceries", "expense"
+        )
+        client.delete(f"/transactions/{transaction['id']}", headers=auth_headers)
+
+        balance = test_db.get(UserBalance, test_user.id)
+        # Stored in pence
+        assert balance.lifetime_income == 200000
+        assert balance.lifetime_expense == 12500
+        assert balance.month_expense == 10000
+
+    def test_totals_are_exact(self, client, auth_headers, categories):
+        item = {
+            "amount": 0.10,
+            "description": "Sweets",
+            "date": datetime.now(timezone.utc).isoformat(),
+            "category": "Groceries",
+            "type": "expense",
+            "account": "Main Account",
+        }
+        client.post(
+            "/transactions/bulk",
+            headers=auth_headers,
+            json={"transactions": [item] * 10},
+        )
+
+        quick = client.get("/dashboard/quick-stats", headers=auth_headers).json()
+        stats = client.get("/dashboard/stats", headers=auth_headers).json()
+
+        # Ten float 0.10s add up to 0.9999999999999999
+        assert quick["total_expense"] == 1.00
+        assert stats["total_expense"] == 1.00
+        assert stats["top_spending_categories"][0]["total_amount"] == 1.00
+
+    def test_stale_month_is_recomputed(
+        self, client, auth_headers, test_db, test_user, ledger
+    ):
+        balance = test_db.get(UserBalance, test_user.id)
+        balance.month_key = "1999-12"
+        balance.month_expense = 99900
+        test_db.commit()
+
+        data = client.get("/dashboard/quick-stats", headers=auth_headers).json()
+        assert data["budget_remaining"] == pytest.approx(3400.00)
+
+
+class TestSpendingByCategory:
+    def test_breakdown(self, client, auth_headers, ledger):
+        response = client.get(
+            "/dashboard/spending-by-category",
+            headers=auth_headers,
+            params={"days": 365},
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert len(data) == 1
+        assert data[0]["category_name"] == "Groceries"
+        assert data[0]["total_amount"] == 125.00
+        assert data[0]["transaction_count"] == 3
+        assert data[0]["percentage"] == 100
+
+
+class TestOverview:
+    def test_matches_individual_endpoints(self, client, auth_headers, ledger):
+        params = {"days": 365}
+        overview = client.get(
+            "/dashboard/overview", headers=auth_headers, params=params
+        )
+        stats = client.get("/dashboard/stats", headers=auth_headers, params=params)
+        quick = client.get("/dashboard/quick-stats", headers=auth_headers)
+        spending = client.get(
+            "/dashboard/spending-by-category", headers=auth_headers, params=params
+        )
+
+        assert overview.status_code == status.HTTP_200_OK
+        data = overview.json()
+        for field in ("total_income", "total_expense", "total_transactions"):
+            assert data["stats"][field] == stats.json()[field]
+        assert (
+            data["stats"]["top_spending_categories"]
+            == stats.json()["top_spending_categories"]
+        )
+        assert data["quick_stats"] == quick.json()
+        assert data["spending_by_category"] == spending.json()
+
+    def test_single_round_of_queries(
+        self, client, auth_headers, recorded_queries, ledger
+    ):
+        with recorded_queries() as queries:
+            client.get("/dashboard/overview", headers=auth_headers)
+
+        # Auth, window summary, recent transactions with their categories
+        # and the balance row
+        assert len(queries) == 4
+
+    def test_queries_use_indexes(
+        self, client, auth_headers, recorded_queries, query_plan, ledger
+    ):
+        with recorded_queries() as queries:
+            client.get("/dashboard/overview", headers=auth_headers)
+
+        plans = [
+            query_plan(statement, parameters)
+            for statement, parameters in queries
+            if "FROM transactions" in statement
+            or "FROM daily_user_category_totals" in statement
+        ]
+        assert plans
+        for plan in plans:
+            assert "SCAN transactions" not in plan
+            assert "SCAN daily_user_category_totals" not in plan
+
+
+class TestRollups:
+    def test_update_moves_totals(self, client, auth_headers, categories):
+        transaction = create_transaction(
+            client, auth_headers, 40.00, "Groceries", "expense"
+        )
+
+        client.put(
+            f"/transactions/{transaction['id']}",
+            headers=auth_headers,
+            json={"amount": 90.00, "type": "income"},
+        )
+
+        data = client.get("/dashboard/stats", headers=auth_headers).json()
+        assert data["total_expense"] == 0
+        assert data["total_income"] == 90.00
+        assert data["income_transactions"] == 1
+        assert data["expense_transactions"] == 0
+
+    def test_delete_removes_totals(self, client, auth_headers, test_db, ledger):
+        recent = client.get("/dashboard/stats", headers=auth_headers).json()[
+            "recent_transactions"
+        ]
+        for transaction in recent:
+            client.delete(f"/transactions/{transaction['id']}", headers=auth_headers)
+
+        data = client.get("/dashboard/stats", headers=auth_headers).json()
+        assert data["total_transactions"] == 0
+        assert data["top_spending_categories"] == []
+        assert test_db.query(DailyUserCategoryTotal).count() == 0
+
+    def test_offset_dates_roll_up_on_their_utc_day(
+        self, client, auth_headers, test_db, test_user, categories
+    ):
+        response = client.post(
+            "/transactions/",
+            headers=auth_headers,
+            json={
+                "amount": 10.00,
+                "description": "Late snack",
+                "category": "Groceries",
+                "type": "expense",
+                "account": "Main Account",
+                "date": "2026-10-17T00:30:00+01:00",
+            },
+        )
+        assert response.json()["date"] == "2026-10-16T23:30:00"
+        rollup = test_db.query(DailyUserCategoryTotal).one()
+        assert rollup.day == date(2026, 10, 16)
+
+        # A rebuild reads the stored date back onto the same day
+        rebuild_rollups(test_db, test_user.id)
+        test_db.commit()
+        assert test_db.query(DailyUserCategoryTotal).one().day == date(2026, 10, 16)
+
+        client.delete(f"/transactions/{response.json()['id']}", headers=auth_headers)
+        assert test_db.query(DailyUserCategoryTotal).count() == 0
+
+    def test_uncategorised_rows_are_shared(self, test_db, test_user):
+        for amount in (500, 700):
+            adjust_rollup(
+                test_db,
+                test_user.id,
+                date(2026, 3, 1),
+                None,
+                "expense",
+                None,
+                amount,
+                1,
+            )
+        test_db.commit()
+
+        rollup = test_db.query(DailyUserCategoryTotal).one()
+        assert (rollup.total_amount, rollup.transaction_count) == (1200, 2)
+
+    def test_migrations_merge_split_rows(self, client, auth_headers, test_db):
+        client.post(
+            "/transactions/",
+            headers=auth_headers,
+            json={
+                "amount": 12.00,
+                "description": "Cash",
+                "type": "expense",
+                "account": "Main Account",
+                "date": datetime.now(timezone.utc).isoformat(),
+            },
+        )
+        engine = test_db.get_bind()
+        # A row split in two by racing writers before the index existed
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX ux_daily_user_category_totals_key"))
+            conn.execute(
+                text(
+                    "UPDATE daily_user_category_totals "
+                    "SET total_amount = 200, transaction_count = 0"
+                )
+            )
+            conn.execute(
+                text(
+                    "INSERT INTO daily_user_category_totals "
+                    "SELECT :id, user_id, day, category_id, type, currency, 1000, 1 "
+                    "FROM daily_user_category_totals"
+                ),
+                {"id": uuid4().hex},
+            )
+
+        run_migrations(engine)
+
+        rollup = test_db.query(DailyUserCategoryTotal).one()
+        assert rollup.category_id is None
+        assert (rollup.total_amount, rollup.transaction_count) == (1200, 1)
+        # Idempotent once the index is in place
+        run_migrations(engine)
+
+    def test_rebuild_matches_incremental(self, test_db, test_user, ledger):
+        def snapshot():
+            return sorted(
+                (r.day, r.type, r.total_amount, r.transaction_count)
+                for r in test_db.query(DailyUserCategoryTotal)
+            )
+
+        incremental = snapshot()
+        written = rebuild_rollups(test_db, test_user.id)
+        test_db.commit()
+
+        assert written == len(incremental)
+        assert snapshot() == incremental
+
+
+class TestResponseCache:
+    def test_repeat_requests_hit_the_cache(self, client, auth_headers, ledger):
+        before = response_cache.stats()
+
+        first = client.get("/dashboard/stats", headers=auth_headers).json()
+        second = client.get("/dashboard/stats", headers=auth_headers).json()
+
+        after = response_cache.stats()
+        assert first == second
+        assert after["misses"] - before["misses"] == 1
+        assert after["hits"] - before["hits"] == 1
+
+    def test_cache_hit_skips_dashboard_queries(
+        self, client, auth_headers, recorded_queries, ledger
+    ):
+        client.get("/dashboard/spending-by-category", headers=auth_headers)
+
+        with recorded_queries() as queries:
+            client.get("/dashboard/spending-by-category", headers=auth_headers)
+
+        # The user comes from the principal cache; only the data version,
+        # which keys the response cache, is read
+        assert len(queries) == 1
+        assert "data_version" in queries[0][0]
+
+    def test_writes_from_other_workers_invalidate_cached_responses(
+        self, client, auth_headers, test_db, ledger
+    ):
+        first = client.get("/dashboard/stats", headers=auth_headers)
+
+        # Another worker's write: no session here, so nothing in this
+        # process is invalidated, as with a write behind another worker
+        with test_db.get_bind().begin() as conn:
+            conn.execute(
+                text(
+                    "UPDATE daily_user_category_totals "
+                    "SET total_amount = total_amount * 2"
+                )
+            )
+            conn.execute(text("UPDATE users SET data_version = data_version + 1"))
+
+        second = client.get(
+            "/dashboard/stats",
+            headers={**auth_headers, "If-None-Match": first.headers["ETag"]},
+        )
+
+        assert second.status_code == status.HTTP_200_OK
+        assert second.json()["total_income"] == 2 * first.json()["total_income"]
+
+    def test_writes_invalidate_cached_responses(self, client, auth_headers, categories):
+        create_transaction(client, auth_headers, 40.00, "Groceries", "expense")
+        first = client.get("/dashboard/quick-stats", headers=auth_headers).json()
+
+        create_transaction(client, auth_headers, 10.00, "Groceries", "expense")
+        second = client.get("/dashboard/quick-stats", headers=auth_headers).json()
+
+        assert first["total_expense"] == 40.00
+        assert second["total_expense"] == 50.00
+
+    def test_writes_keep_user_updated_at(
+        self, client, auth_headers, categories, test_db, test_user
+    ):
+        user_id = test_user.id
+        updated_at = test_db.get(User, user_id).updated_at
+
+        create_transaction(client, auth_headers, 40.00, "Groceries", "expense")
+
+        test_db.expire_all()
+        user = test_db.get(User, user_id)
+        assert user.data_version > 0
+        assert user.updated_at == updated_at
+
+    def test_cache_stats_endpoint(self, client, auth_headers):
+        response = client.get("/dashboard/cache-stats", headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["backend"] == "memory"
+        assert {"hits", "misses", "hit_rate"} <= data.keys()
+
+
+class TestConditionalGet:
+    def test_matching_etag_returns_not_modified(self, client, auth_headers, ledger):
+        first = client.get("/dashboard/overview", headers=auth_headers)
+        etag = first.headers["ETag"]
+
+        second = client.get(
+            "/dashboard/overview", headers={**auth_headers, "If-None-Match": etag}
+        )
+
+        assert first.status_code == status.HTTP_200_OK
+        assert etag.startswith('W/"')
+        assert second.status_code == status.HTTP_304_NOT_MODIFIED
+        assert second.content == b""
+        assert second.headers["ETag"] == etag
+
+    def test_not_modified_skips_cache_lookup(self, client, auth_headers, ledger):
+        etag = client.get("/dashboard/stats", headers=auth_headers).headers["ETag"]
+        before = response_cache.stats()
+
+        client.get("/dashboard/stats", headers={**auth_headers, "If-None-Match": etag})
+
+        after = response_cache.stats()
+        assert after["hits"] == before["hits"]
+        assert after["misses"] == before["misses"]
+
+    def test_etag_varies_with_params(self, client, auth_headers):
+        week = client.get("/dashboard/stats?days=7", headers=auth_headers)
+        month = client.get("/dashboard/stats?days=30", headers=auth_headers)
+
+        assert week.headers["ETag"] != month.headers["ETag"]
+
+    def test_writes_change_the_etag(self, client, auth_headers, categories):
+        etag = client.get("/dashboard/quick-stats", headers=auth_headers).headers[
+            "ETag"
+        ]
+        create_transaction(client, auth_headers, 10.00, "Groceries", "expense")
+
+        response = client.get(
+            "/dashboard/quick-stats", headers={**auth_headers, "If-None-Match": etag}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["ETag"] != etag
+        assert response.json()["total_expense"] == 10.00
+
+
+class TestMemoryBackend:
+    def test_evicts_least_recently_used(self):
+        backend = MemoryBackend(max_entries=2, ttl=60)
+        backend.set("a", 1)
+        backend.set("b", 2)
+        backend.get("a")
+        backend.set("c", 3)
+
+        assert backend.get("a") == 1
+        assert backend.get("b") is None
+        assert backend.get("c") == 3
+
+    def test_entries_expire(self):
+        backend = MemoryBackend(max_entries=2, ttl=0)
+        backend.set("a", 1)
+
+        assert backend.get("a") is None
+
+
+class TestTimeSeries:
+    def test_daily_series_fills_gaps(self, client, auth_headers, ledger):
+        response = client.get(
+            "/dashboard/timeseries",
+            headers=auth_headers,
+            params={"bucket": "day", "days": 30},
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        points = data["points"]
+        assert data["bucket"] == "day"
+        assert len(points) == 31
+        assert points[-1]["period_start"] == data["end_date"]
+        assert points[-1]["income"] == 2000.00
+        assert points[-1]["expense"] == 100.00
+        assert points[-1]["net"] == 1900.00
+        assert points[-1]["transaction_count"] == 3
+        assert all(p["transaction_count"] == 0 for p in points[:-1])
+
+    @pytest.mark.parametrize("bucket", ["week", "month"])
+    def test_wider_buckets_keep_totals(self, client, auth_headers, ledger, bucket):
+        response = client.get(
+            "/dashboard/timeseries",
+            headers=auth_headers,
+            params={"bucket": bucket, "days": 365},
+        )
+
+        points = response.json()["points"]
+        assert sum(p["expense"] for p in points) == 125.00
+        assert sum(p["income"] for p in points) == 2000.00
+        assert sum(p["transaction_count"] for p in points) == 4
+
+    def test_invalid_bucket(self, client, auth_headers):
+        response = client.get(
+            "/dashboard/timeseries", headers=auth_headers, params={"bucket": "hour"}
+        )
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+
+class TestBucketing:
+    def test_sql_weeks_match_python_weeks(self, test_db):
+        monday = date(2025, 3, 3)
+        for offset in range(14):
+            day = monday + timedelta(days=offset)
+            expression = bucket_expression(literal(day, Date), "week", "sqlite")
+            assert test_db.scalar(select(expression)) == bucket_start(day, "week")
+
+    def test_month_range(self):
+        periods = bucket_range(date(2024, 11, 15), date(2025, 2, 3), "month")
+        assert [str(p) for p in periods] == [
+            "2024-11-01",
+            "2024-12-01",
+            "2025-01-01",
+            "2025-02-01",
+        ]
+
+    def test_fill_buckets_scatters_rows(self):
+        periods = bucket_range(date(2025, 1, 1), date(2025, 1, 5), "day")
+        income, expense, counts = fill_buckets(
+            periods,
+            [
+                (date(2025, 1, 2), "expense", 1000, 1),
+                (date(2025, 1, 2), "income", 5000, 2),
+                (date(2025, 1, 5), "expense", 550, 1),
+            ],
+        )
+
+        assert income.tolist() == [0, 5000, 0, 0, 0]
+        assert expense.tolist() == [0, 1000, 0, 0, 550]
+        assert counts.tolist() == [0, 3, 0, 0, 1]
+
+
+@pytest.fixture
+def rates(test_db):
+    """
+    EUR at 1.25 per pound from 30 days ago (1.50 before that) and USD at 2
+    """
+    today = datetime.now(timezone.utc).date()
+    load_rates(
+        test_db,
+        [
+            {"currency": "EUR", "day": today - timedelta(days=60), "rate": 1.5},
+            {"currency": "EUR", "day": today - timedelta(days=30), "rate": 1.25},
+            {"currency": "USD", "day": today - timedelta(days=60), "rate": 2.0},
+        ],
+    )
+    test_db.commit()
+
+
+class TestCurrencies:
+    def test_convert_totals(self, test_db, rates):
+        today = datetime.now(timezone.utc).date()
+        converted = convert_totals(
+            test_db,
+            [1000, 1000, 1000, 1000, 1000],
+            ["GBP", "EUR", "EUR", "USD", "EUR"],
+            [
+                None,
+                today,
+                today - timedelta(days=45),
+                today,
+                today - timedelta(days=90),
+            ],
+            "GBP",
+        )
+        # Days before the first rate use the earliest one
+        assert converted.tolist() == [1000, 800, 667, 500, 667]
+
+    def test_convert_between_foreign_currencies(self, test_db, rates):
+        today = datetime.now(timezone.utc).date()
+        converted = convert_totals(test_db, [1000], ["EUR"], [today], "USD")
+        assert converted.tolist() == [1600]
+
+    def test_unknown_currency_is_left_alone(self, test_db, rates):
+        converted = convert_totals(test_db, [1000], ["CHF"], [date.today()], "GBP")
+        assert converted.tolist() == [1000]
+
+    def test_read_rates(self):
+        rows = list(
+            read_rates(io.StringIO("date,currency,rate\n2024-01-02,eur,1.17\n"))
+        )
+        assert rows == [{"currency": "EUR", "day": date(2024, 1, 2), "rate": 1.17}]
+
+        with pytest.raises(ValueError, match="Line 2"):
+            list(read_rates(io.StringIO("date,currency,rate\n2024-01-02,EUR,-1\n")))
+
+    def test_load_replaces_rates(self, test_db, rates):
+        today = datetime.now(timezone.utc).date()
+        load_rates(
+            test_db,
+            [{"currency": "USD", "day": today - timedelta(days=60), "rate": 4.0}],
+        )
+        test_db.commit()
+        assert convert_totals(test_db, [1000], ["USD"], [today], "GBP").tolist() == [
+            250
+        ]
+
+    def test_dashboard_totals_are_converted(
+        self, client, auth_headers, categories, rates
+    ):
+        create_transaction(client, auth_headers, 10.00, "Groceries", "expense")
+        create_transaction(
+            client, auth_headers, 50.00, "Groceries", "expense", currency="EUR"
+        )
+        create_transaction(
+            client, auth_headers, 100.00, "Salary", "income", 45, currency="USD"
+        )
+
+        stats = client.get(
+            "/dashboard/stats", headers=auth_headers, params={"days": 90}
+        ).json()
+        assert stats["currency"] == "GBP"
+        assert stats["total_expense"] == 50.00
+        assert stats["total_income"] == 50.00
+        assert stats["top_spending_categories"][0]["total_amount"] == 50.00
+
+        quick = client.get("/dashboard/quick-stats", headers=auth_headers).json()
+        assert quick["total_expense"] == 50.00
+        assert quick["net_balance"] == 0.00
+        assert quick["budget_remaining"] == 3450.00
+
+        series = client.get(
+            "/dashboard/timeseries",
+            headers=auth_headers,
+            params={"bucket": "month", "days": 90},
+        ).json()
+        assert sum(point["expense"] for point in series["points"]) == 50.00
+        assert sum(point["income"] for point in series["points"]) == 50.00
+
+    def test_balance_tracks_currencies(
+        self, client, auth_headers, categories, test_db, test_user
+    ):
+        create_transaction(
+            client, auth_headers, 5.00, "Groceries", "expense", currency="EUR"
+        )
+        create_transaction(client, auth_headers, 6.00, "Groceries", "expense")
+        create_transaction(
+            client, auth_headers, 7.00, "Groceries", "expense", currency="EUR"
+        )
+
+        balance = test_db.get(UserBalance, test_user.id)
+        test_db.refresh(balance)
+        assert balance.currencies.split(",") == ["EUR", "GBP"]
+
+    def test_single_currency_quick_stats_reads_only_the_balance(
+        self, client, auth_headers, ledger, recorded_queries
+    ):
+        with recorded_queries() as queries:
+            client.get("/dashboard/quick-stats", headers=auth_headers)
+
+        assert not any("daily_user_category_totals" in q for q, _ in queries)
+
+    def test_currencies_without_rates_are_reported(
+        self, client, auth_headers, categories, rates
+    ):
+        create_transaction(
+            client, auth_headers, 50.00, "Groceries", "expense", currency="EUR"
+        )
+        create_transaction(
+            client, auth_headers, 30.00, "Groceries", "expense", currency="CHF"
+        )
+
+        stats = client.get("/dashboard/stats", headers=auth_headers).json()
+        quick = client.get("/dashboard/quick-stats", headers=auth_headers).json()
+        series = client.get("/dashboard/timeseries", headers=auth_headers).json()
+
+        # EUR is converted; CHF has no rates and is added as it is
+        assert stats["total_expense"] == 70.00
+        for response in (stats, quick, series):
+            assert response["unconverted_currencies"] == ["CHF"]
+
+    def test_converted_totals_report_nothing_unconverted(
+        self, client, auth_headers, ledger
+    ):
+        stats = client.get("/dashboard/stats", headers=auth_headers).json()
+        assert stats["unconverted_currencies"] == []
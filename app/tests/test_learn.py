@@ -7,18 +7,6 @@ from app.gamification import calculate_streak, level_for_xp
 from app.models import Course, Lesson, Question, Unit
 
 
-@pytest.fixture
-def auth_headers(client, test_user):
-    """
-    Get auth headers for the test user
-    """
-    response = client.post(
-        "/auth/login", data={"username": "testuser", "password": "test1234"}
-    )
-    token = response.json()["access_token"]
-    return {"Authorization": f"Bearer {token}"}
-
-
 @pytest.fixture
 def course_with_lesson(test_db):
     """
@@ -230,6 +218,61 @@ class TestLessonEndpoints:
         assert detail.json()["units"][0]["lessons"][0]["status"] == "completed"
 
 
+class TestCatalogETags:
+    def test_lesson_not_modified(self, client, auth_headers, course_with_lesson):
+        url = f"/learn/lessons/{course_with_lesson['lesson'].id}"
+        etag = client.get(url, headers=auth_headers).headers["ETag"]
+
+        response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b""
+
+    def test_catalog_changes_invalidate_lessons(
+        self, client, auth_headers, test_db, course_with_lesson
+    ):
+        url = f"/learn/lessons/{course_with_lesson['lesson'].id}"
+        etag = client.get(url, headers=auth_headers).headers["ETag"]
+
+        test_db.add(
+            Question(
+                lesson_id=course_with_lesson["lesson"].id,
+                prompt="Should you track spending?",
+                type="true_false",
+                options=["True", "False"],
+                correct_answer="True",
+                order=3,
+            )
+        )
+        test_db.commit()
+
+        response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()["questions"]) == 3
+
+    def test_submission_changes_course_etag(
+        self, client, auth_headers, course_with_lesson
+    ):
+        lesson_id = str(course_with_lesson["lesson"].id)
+        questions = course_with_lesson["questions"]
+        payload = {
+            "answers": [
+                {"question_id": str(q.id), "answer": q.correct_answer}
+                for q in questions
+            ]
+        }
+        etag = client.get("/learn/courses", headers=auth_headers).headers["ETag"]
+        client.post(
+            f"/learn/lessons/{lesson_id}/submit", json=payload, headers=auth_headers
+        )
+
+        response = client.get(
+            "/learn/courses", headers={**auth_headers, "If-None-Match": etag}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()[0]["completed_lessons"] == 1
+
+
 class TestStatsAndProgress:
     def test_stats_created_on_first_access(self, client, auth_headers, test_user):
         response = client.get("/learn/me/stats", headers=auth_headers)
@@ -10,18 +10,6 @@ from app.models import (
 )
 
 
-@pytest.fixture
-def auth_headers(client, test_user):
-    """
-    Get auth headers for the test user
-    """
-    response = client.post(
-        "/auth/login", data={"username": "testuser", "password": "test1234"}
-    )
-    token = response.json()["access_token"]
-    return {"Authorization": f"Bearer {token}"}
-
-
 @pytest.fixture
 def notification(test_db, test_user):
     """
@@ -130,6 +118,19 @@ class TestNotificationsEndpoints:
         assert response.json() == []
 
 
+    def test_sparse_fields_load_only_those_columns(
+        self, client, auth_headers, notification, recorded_queries
+    ):
+        with recorded_queries() as queries:
+            response = client.get(
+                "/notifications/?fields=title,is_read", headers=auth_headers
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == [{"title": "Welcome", "is_read": False}]
+        select = next(q for q, _ in queries if "FROM notifications" in q)
+        assert "notifications.message" not in select
+
 class TestNotificationGeneration:
     def test_completing_lesson_creates_notifications(
         self, client, auth_headers, lesson_with_questions
@@ -0,0 +1,98 @@
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import inspect
+
+from app import partitioning
+from app.migrations import run_migrations
+from app.models import Transaction
+
+
+class TestPartitioning:
+    @pytest.mark.parametrize(
+        "month, months, expected",
+        [
+            (date(2026, 1, 1), 1, date(2026, 2, 1)),
+            (date(2026, 11, 1), 3, date(2027, 2, 1)),
+            (date(2026, 1, 1), -1, date(2025, 12, 1)),
+            (date(2026, 3, 1), -27, date(2023, 12, 1)),
+        ],
+    )
+    def test_add_months(self, month, months, expected):
+        assert partitioning.add_months(month, months) == expected
+
+    def test_partition_name(self):
+        assert partitioning.partition_name(date(2026, 3, 1)) == "transactions_2026_03"
+
+    def test_only_postgres_is_partitioned(self, test_db, monkeypatch):
+        monkeypatch.setattr(partitioning, "PARTITION_TRANSACTIONS", True)
+        assert partitioning.partitioning_enabled("postgresql")
+        assert partitioning.duplicate_key("postgresql") == ["fingerprint", "date"]
+        assert not partitioning.partitioning_enabled("sqlite")
+        assert partitioning.duplicate_key("sqlite") == ["fingerprint"]
+
+        engine = test_db.get_bind()
+        run_migrations(engine)
+
+        assert inspect(engine).get_pk_constraint("transactions")[
+            "constrained_columns"
+        ] == ["id"]
+
+
+@pytest.mark.postgres
+class TestPostgresPartitioning:
+    @pytest.fixture
+    def transaction_id(self, test_db, test_user):
+        transaction = Transaction(
+            user_id=test_user.id,
+            amount=5000,
+            description="Tesco weekly shop",
+            date=datetime.now(timezone.utc),
+            type="expense",
+            account="Main Account",
+            currency="GBP",
+            status="completed",
+        )
+        test_db.add(transaction)
+        test_db.commit()
+        return transaction.id
+
+    @staticmethod
+    def partitions(engine):
+        with engine.connect() as conn:
+            return partitioning.is_partitioned(conn), [
+                month for _, month in partitioning.monthly_partitions(conn)
+            ]
+
+    def test_migrations_partition_transactions(
+        self, test_db, transaction_id, monkeypatch
+    ):
+        monkeypatch.setattr(partitioning, "PARTITION_TRANSACTIONS", True)
+        engine = test_db.get_bind()
+        test_db.close()
+
+        run_migrations(engine)
+
+        partitioned, months = self.partitions(engine)
+        assert partitioned
+        this_month = datetime.now(timezone.utc).date().replace(day=1)
+        assert months == [
+            partitioning.add_months(this_month, offset)
+            for offset in range(partitioning.PARTITION_MONTHS_AHEAD + 1)
+        ]
+        assert inspect(engine).get_pk_constraint("transactions")[
+            "constrained_columns"
+        ] == ["id", "date"]
+        assert test_db.get(Transaction, transaction_id) is not None
+
+    def test_migrations_are_idempotent(self, test_db, transaction_id, monkeypatch):
+        monkeypatch.setattr(partitioning, "PARTITION_TRANSACTIONS", True)
+        engine = test_db.get_bind()
+        test_db.close()
+
+        run_migrations(engine)
+        first = self.partitions(engine)
+        run_migrations(engine)
+
+        assert self.partitions(engine) == first
+        assert test_db.query(Transaction).count() == 1
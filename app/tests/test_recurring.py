@@ -0,0 +1,302 @@
+from datetime import date, datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from fastapi import status
+from sqlalchemy import update
+
+from app.auth import get_password_hash
+from app.models import RecurringRule, Transaction, User, UserBalance
+from app.recurring import due_dates, materialise_due, next_due_from, occurrence
+
+
+@pytest.fixture
+def today():
+    return datetime.now(timezone.utc).date()
+
+
+@pytest.fixture
+def rule_payload(today):
+    """
+    A weekly expense that started three weeks ago
+    """
+    return {
+        "amount": 12.5,
+        "description": "Gym membership",
+        "type": "expense",
+        "account": "Current",
+        "frequency": "weekly",
+        "start_date": (today - timedelta(weeks=3)).isoformat(),
+    }
+
+
+def make_rule(db, user, **fields):
+    """
+    Store a recurring rule directly, amounts in pence
+    """
+    values = {
+        "amount": 1000,
+        "description": "Rent",
+        "type": "expense",
+        "account": "Current",
+        "frequency": "monthly",
+        "start_date": date(2024, 1, 31),
+    }
+    values.update(fields)
+    values.setdefault("next_due", values["start_date"])
+    rule = RecurringRule(user_id=user.id, **values)
+    db.add(rule)
+    db.commit()
+    db.refresh(rule)
+    return rule
+
+
+def posted(db, user):
+    return (
+        db.query(Transaction)
+        .filter(Transaction.user_id == user.id)
+        .order_by(Transaction.date)
+        .all()
+    )
+
+
+class TestSchedule:
+    def test_monthly_keeps_day_and_clamps_to_month_end(self):
+        rule = RecurringRule(
+            frequency="monthly", interval=1, start_date=date(2024, 1, 31)
+        )
+        assert [occurrence(rule, n) for n in range(4)] == [
+            date(2024, 1, 31),
+            date(2024, 2, 29),
+            date(2024, 3, 31),
+            date(2024, 4, 30),
+        ]
+
+    def test_weekly_interval(self):
+        rule = RecurringRule(
+            frequency="weekly", interval=2, start_date=date(2024, 1, 1)
+        )
+        assert occurrence(rule, 3) == date(2024, 2, 12)
+        assert next_due_from(rule, date(2024, 1, 2)) == date(2024, 1, 15)
+
+    def test_yearly_leap_day(self):
+        rule = RecurringRule(
+            frequency="yearly", interval=1, start_date=date(2024, 2, 29)
+        )
+        assert occurrence(rule, 1) == date(2025, 2, 28)
+        assert occurrence(rule, 4) == date(2028, 2, 29)
+
+    def test_due_dates_stop_at_end_date(self):
+        rule = RecurringRule(
+            frequency="daily",
+            interval=1,
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 1, 3),
+            next_due=date(2024, 1, 2),
+        )
+        assert due_dates(rule, date(2024, 1, 10)) == (
+            [date(2024, 1, 2), date(2024, 1, 3)],
+            None,
+        )
+        assert due_dates(rule, date(2024, 1, 2)) == (
+            [date(2024, 1, 2)],
+            date(2024, 1, 3),
+        )
+
+
+class TestRecurringRules:
+    def test_requires_auth(self, client, rule_payload):
+        response = client.post("/recurring/", json=rule_payload)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_create_rule(self, client, auth_headers, rule_payload):
+        response = client.post("/recurring/", json=rule_payload, headers=auth_headers)
+        assert response.status_code == status.HTTP_201_CREATED
+        data = response.json()
+        assert data["amount"] == 12.5
+        assert data["next_due"] == rule_payload["start_date"]
+        assert data["is_active"] is True
+
+    def test_create_rule_keeps_user_updated_at(
+        self, client, auth_headers, rule_payload, test_db, test_user
+    ):
+        user_id = test_user.id
+        updated_at = test_db.get(User, user_id).updated_at
+
+        client.post("/recurring/", json=rule_payload, headers=auth_headers)
+
+        test_db.expire_all()
+        user = test_db.get(User, user_id)
+        assert user.recurring_due is not None
+        assert user.updated_at == updated_at
+
+    def test_create_with_unknown_category(self, client, auth_headers, rule_payload):
+        rule_payload["category_id"] = str(uuid4())
+        response = client.post("/recurring/", json=rule_payload, headers=auth_headers)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_create_with_end_before_start_is_rejected(
+        self, client, auth_headers, rule_payload, today
+    ):
+        rule_payload["end_date"] = (today - timedelta(weeks=4)).isoformat()
+        response = client.post("/recurring/", json=rule_payload, headers=auth_headers)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    def test_get_missing_rule(self, client, auth_headers):
+        response = client.get(f"/recurring/{uuid4()}", headers=auth_headers)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_delete_keeps_posted_transactions(self, client, auth_headers, rule_payload):
+        rule = client.post("/recurring/", json=rule_payload, headers=auth_headers)
+        client.get("/transactions/", headers=auth_headers)
+
+        response = client.delete(
+            f"/recurring/{rule.json()['id']}", headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert len(client.get("/transactions/", headers=auth_headers).json()) == 4
+
+
+class TestPosting:
+    def test_listing_posts_due_occurrences(
+        self, client, auth_headers, rule_payload, today
+    ):
+        client.post("/recurring/", json=rule_payload, headers=auth_headers)
+
+        transactions = client.get("/transactions/", headers=auth_headers).json()
+        assert len(transactions) == 4
+        assert {t["amount"] for t in transactions} == {12.5}
+        assert transactions[0]["date"].startswith(today.isoformat())
+
+        rule = client.get("/recurring/", headers=auth_headers).json()[0]
+        assert rule["next_due"] == (today + timedelta(weeks=1)).isoformat()
+
+    def test_dashboard_totals_include_posted(self, client, auth_headers, rule_payload):
+        client.post("/recurring/", json=rule_payload, headers=auth_headers)
+
+        stats = client.get("/dashboard/stats", headers=auth_headers).json()
+        assert stats["total_expense"] == 50.0
+        assert stats["total_transactions"] == 4
+
+    def test_dashboard_posts_rules_added_by_other_workers(
+        self, client, auth_headers, test_db, test_user, today
+    ):
+        user_id = test_user.id
+        first = client.get("/dashboard/stats", headers=auth_headers)
+
+        # Another worker's rule: nothing in this process sees the user change,
+        # so the cached principal still has no due date
+        make_rule(test_db, test_user, start_date=today, frequency="weekly")
+        with test_db.get_bind().begin() as conn:
+            conn.execute(
+                update(User).where(User.id == user_id).values(recurring_due=today)
+            )
+
+        second = client.get(
+            "/dashboard/stats",
+            headers={**auth_headers, "If-None-Match": first.headers["ETag"]},
+        )
+
+        assert second.status_code == status.HTTP_200_OK
+        assert second.json()["total_transactions"] == 1
+
+    def test_cache_stats_posts_nothing(
+        self, client, auth_headers, rule_payload, test_db, test_user
+    ):
+        user_id = test_user.id
+        client.post("/recurring/", json=rule_payload, headers=auth_headers)
+
+        client.get("/dashboard/cache-stats", headers=auth_headers)
+
+        assert posted(test_db, test_db.get(User, user_id)) == []
+
+    def test_posting_twice_creates_nothing(self, test_db, test_user):
+        rule = make_rule(test_db, test_user)
+        assert materialise_due(test_db, until=date(2024, 4, 30)) == 4
+
+        # A second run, even one that finds the rule still due, adds nothing
+        rule.next_due = date(2024, 1, 31)
+        test_db.commit()
+        assert materialise_due(test_db, until=date(2024, 4, 30)) == 0
+        assert len(posted(test_db, test_user)) == 4
+
+    def test_updates_balance(self, test_db, test_user):
+        make_rule(test_db, test_user, type="income", amount=250000)
+        materialise_due(test_db, until=date(2024, 3, 31))
+
+        balance = test_db.get(UserBalance, test_user.id)
+        assert balance.lifetime_income == 750000
+
+    def test_end_date_stops_posting(self, test_db, test_user):
+        rule = make_rule(test_db, test_user, end_date=date(2024, 2, 29))
+        assert materialise_due(test_db, until=date(2024, 6, 30)) == 2
+
+        test_db.refresh(rule)
+        assert rule.next_due is None
+
+    def test_paused_rules_are_skipped(self, test_db, test_user):
+        make_rule(test_db, test_user, is_active=False)
+        assert materialise_due(test_db, until=date(2024, 6, 30)) == 0
+
+    def test_resuming_skips_missed_occurrences(
+        self, client, auth_headers, test_db, test_user, today
+    ):
+        rule = make_rule(
+            test_db,
+            test_user,
+            frequency="daily",
+            start_date=today - timedelta(days=10),
+            is_active=False,
+        )
+        response = client.put(
+            f"/recurring/{rule.id}", json={"is_active": True}, headers=auth_headers
+        )
+        assert response.json()["next_due"] == today.isoformat()
+        assert len(client.get("/transactions/", headers=auth_headers).json()) == 1
+
+    def test_only_posts_for_current_user(self, client, auth_headers, test_db):
+        other = User(
+            username="other",
+            email="other@test.com",
+            first_name="Other",
+            last_name="User",
+            hashed_password=get_password_hash("other1234"),
+            monthly_budget=0,
+        )
+        test_db.add(other)
+        test_db.commit()
+        rule_id = make_rule(test_db, other, start_date=date(2024, 1, 1)).id
+        other_id = other.id
+
+        client.get("/transactions/", headers=auth_headers)
+        test_db.expire_all()
+        assert test_db.get(RecurringRule, rule_id).next_due == date(2024, 1, 1)
+        assert posted(test_db, test_db.get(User, other_id)) == []
+
+    def test_batches_insert_once_each(self, test_db, test_user, recorded_queries):
+        for n in range(5):
+            make_rule(test_db, test_user, description=f"Rule {n}")
+
+        with recorded_queries() as queries:
+            created = materialise_due(test_db, until=date(2024, 3, 31), batch_size=2)
+
+        assert created == 15
+        inserts = [q for q, _ in queries if q.startswith("INSERT INTO transactions")]
+        assert len(inserts) == 3
+
+    def test_identical_rules_in_different_batches(self, test_db, test_user):
+        for _ in range(2):
+            make_rule(test_db, test_user)
+
+        assert materialise_due(test_db, until=date(2024, 1, 31), batch_size=1) == 2
+
+    def test_nothing_due_costs_no_queries(
+        self, client, auth_headers, rule_payload, recorded_queries
+    ):
+        rule_payload["start_date"] = "2999-01-01"
+        client.post("/recurring/", json=rule_payload, headers=auth_headers)
+
+        with recorded_queries() as queries:
+            client.get("/transactions/", headers=auth_headers)
+
+        assert not any("recurring_rules" in q for q, _ in queries)
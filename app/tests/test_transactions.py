@@ -1,41 +1,23 @@
-from datetime import datetime, timezone
-from uuid import uuid4
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta, timezone
+from uuid import UUID, uuid4
 
 import pytest
 from fastapi import status
+from sqlalchemy import Integer, func, inspect, text
 
-from app.models import Category, Transaction
-
-
-@pytest.fixture
-def auth_headers(client, test_user):
-    """
-    Get authentication headers for test user
-    """
-    response = client.post(
-        "/auth/login", data={"username": "testuser", "password": "test1234"}
-    )
-    token = response.json()["access_token"]
-    return {"Authorization": f"Bearer {token}"}
-
-
-@pytest.fixture
-def test_category(test_db):
-    """
-    Create a test category
-    """
-    category = Category(
-        name="Groceries",
-        type="expense",
-        description="Grocery and household items shopping",
-        icon="🛒",
-        colour="#D4C6E0",
-        is_default=True,
-    )
-    test_db.add(category)
-    test_db.commit()
-    test_db.refresh(category)
-    return category
+from app.duplicates import backfill_fingerprints
+from app.importers import detect_format, parse_statement
+from app import archive
+from app.migrations import run_migrations
+from app.models import Category, DailyUserCategoryTotal, Transaction, User
+from app.money import format_minor_units, from_minor_units, to_minor_units
+from app.rollups import rebuild_rollups
+from app.routers import transactions as transactions_router
+from app.schemas import MAX_BULK_TRANSACTIONS
+from app.search import rebuild_search_index, vacuum
 
 
 @pytest.fixture
@@ -46,7 +28,7 @@ def test_transaction(test_db, test_user, test_category):
     transaction = Transaction(
         user_id=test_user.id,
         category_id=test_category.id,
-        amount=50.00,
+        amount=5000,
         description="Tesco weekly shop",
         date=datetime.now(timezone.utc),
         type="expense",
@@ -265,7 +247,7 @@ class TestTransactionFilters:
             transaction = Transaction(
                 user_id=test_user.id,
                 category_id=test_category.id,
-                amount=10.00 * (i + 1),
+                amount=1000 * (i + 1),
                 description=f"transaction {i + 1}",
                 date=datetime.now(timezone.utc),
                 type="expense" if i % 2 == 0 else "income",
@@ -290,3 +272,1401 @@ class TestTransactionFilters:
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
         assert all(t["type"] == "expense" for t in data)
+
+
+class TestCursorPagination:
+    @pytest.fixture
+    def ledger(self, test_db, test_user, test_category):
+        """
+        Seven transactions over four days, with several sharing a timestamp
+        """
+        base = datetime(2026, 3, 10, 12, 0, tzinfo=timezone.utc)
+        for i in range(7):
+            test_db.add(
+                Transaction(
+                    user_id=test_user.id,
+                    category_id=test_category.id,
+                    amount=1000 * (i + 1),
+                    description=f"transaction {i + 1}",
+                    date=base - timedelta(days=i // 2),
+                    type="expense",
+                    account="Main Account",
+                    currency="GBP",
+                    status="completed",
+                )
+            )
+        test_db.commit()
+
+    def fetch_all(self, client, headers, limit, params=None):
+        pages, cursor = [], None
+        while True:
+            query = {**(params or {}), "limit": limit}
+            if cursor:
+                query["cursor"] = cursor
+            response = client.get("/transactions/", headers=headers, params=query)
+            assert response.status_code == status.HTTP_200_OK
+            pages.append(response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                return pages
+
+    def test_newest_first(self, client, auth_headers, ledger):
+        data = client.get("/transactions/", headers=auth_headers).json()
+
+        dates = [t["date"] for t in data]
+        assert dates == sorted(dates, reverse=True)
+
+    def test_pages_cover_every_transaction_once(self, client, auth_headers, ledger):
+        pages = self.fetch_all(client, auth_headers, limit=2)
+
+        ids = [t["id"] for page in pages for t in page]
+        assert [len(page) for page in pages] == [2, 2, 2, 1]
+        assert len(set(ids)) == 7
+
+    def test_pages_match_single_request(self, client, auth_headers, ledger):
+        everything = client.get("/transactions/", headers=auth_headers).json()
+        pages = self.fetch_all(client, auth_headers, limit=3)
+
+        assert [t["id"] for page in pages for t in page] == [
+            t["id"] for t in everything
+        ]
+
+    def test_no_cursor_on_last_page(self, client, auth_headers, ledger):
+        response = client.get(
+            "/transactions/", headers=auth_headers, params={"limit": 7}
+        )
+
+        assert len(response.json()) == 7
+        assert "X-Next-Cursor" not in response.headers
+
+    def test_cursor_respects_filters(self, client, auth_headers, ledger):
+        since = datetime(2026, 3, 9, tzinfo=timezone.utc).isoformat()
+        pages = self.fetch_all(
+            client, auth_headers, limit=1, params={"start_date": since}
+        )
+
+        assert sum(len(page) for page in pages) == 4
+
+    def test_sparse_fields(self, client, auth_headers, ledger, recorded_queries):
+        everything = client.get("/transactions/", headers=auth_headers).json()
+
+        with recorded_queries() as queries:
+            pages = self.fetch_all(
+                client, auth_headers, limit=3, params={"fields": "id,amount"}
+            )
+
+        sparse = [t for page in pages for t in page]
+        assert sparse == [{"id": t["id"], "amount": t["amount"]} for t in everything]
+        listing = [q for q, _ in queries if "FROM transactions" in q]
+        assert not any("description" in q or "categories" in q for q in listing)
+
+    def test_sparse_category(self, client, auth_headers, ledger):
+        newest = client.get("/transactions/", headers=auth_headers).json()[0]
+
+        response = client.get(
+            "/transactions/",
+            headers=auth_headers,
+            params={"fields": "description,category", "limit": 1},
+        )
+
+        assert response.json() == [
+            {"description": newest["description"], "category": "Groceries"}
+        ]
+        assert "X-Next-Cursor" in response.headers
+
+    def test_invalid_cursor(self, client, auth_headers):
+        response = client.get(
+            "/transactions/", headers=auth_headers, params={"cursor": "not-a-cursor"}
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestQueryPlans:
+    def listing_plan(self, client, headers, recorded_queries, query_plan, params):
+        with recorded_queries() as queries:
+            response = client.get("/transactions/", headers=headers, params=params)
+        assert response.status_code == status.HTTP_200_OK
+
+        (statement, parameters), *_ = [
+            query for query in queries if "FROM transactions" in query[0]
+        ]
+        return query_plan(statement, parameters)
+
+    @pytest.mark.parametrize(
+        "params, index",
+        [
+            ({}, "ix_transactions_user_date_id"),
+            ({"start_date": "2026-01-01T00:00:00"}, "ix_transactions_user_date_id"),
+            ({"type": "expense"}, "ix_transactions_user_type_date_id"),
+        ],
+    )
+    def test_listing_uses_index(
+        self,
+        client,
+        auth_headers,
+        recorded_queries,
+        query_plan,
+        test_transaction,
+        params,
+        index,
+    ):
+        plan = self.listing_plan(
+            client, auth_headers, recorded_queries, query_plan, params
+        )
+
+        assert index in plan
+        assert "SCAN transactions " not in f"{plan} "
+
+    def test_category_filter_uses_index(
+        self, client, auth_headers, recorded_queries, query_plan, test_transaction
+    ):
+        plan = self.listing_plan(
+            client,
+            auth_headers,
+            recorded_queries,
+            query_plan,
+            {"category_id": str(test_transaction.category_id)},
+        )
+
+        assert "ix_transactions_user_category_date_id" in plan
+
+    def test_migrations_add_missing_indexes(self, test_db):
+        engine = test_db.get_bind()
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_transactions_user_type_date_id"))
+
+        run_migrations(engine)
+
+        indexes = {
+            index["name"] for index in inspect(engine).get_indexes("transactions")
+        }
+        assert {index.name for index in Transaction.__table__.indexes} <= indexes
+
+
+class TestCategoryLoading:
+    @pytest.fixture
+    def spread_ledger(self, test_db, test_user):
+        """
+        One transaction in each of ten categories
+        """
+        for i in range(10):
+            category = Category(
+                name=f"Category {i}",
+                type="expense",
+                description="Test category",
+                icon="🛒",
+                colour="#D4C6E0",
+                is_default=True,
+            )
+            test_db.add(category)
+            test_db.flush()
+            test_db.add(
+                Transaction(
+                    user_id=test_user.id,
+                    category_id=category.id,
+                    amount=1000,
+                    description=f"transaction {i}",
+                    date=datetime.now(timezone.utc),
+                    type="expense",
+                    account="Main Account",
+                    currency="GBP",
+                    status="completed",
+                )
+            )
+        test_db.commit()
+
+    def test_listing_loads_categories_in_one_query(
+        self, client, auth_headers, recorded_queries, spread_ledger
+    ):
+        with recorded_queries() as queries:
+            response = client.get("/transactions/", headers=auth_headers)
+
+        assert {t["category"] for t in response.json()} == {
+            f"Category {i}" for i in range(10)
+        }
+        # Authentication plus the listing itself
+        assert len(queries) == 2
+
+    def test_dashboard_loads_categories_in_one_query(
+        self, client, auth_headers, recorded_queries, spread_ledger
+    ):
+        with recorded_queries() as queries:
+            response = client.get("/dashboard/stats", headers=auth_headers)
+
+        assert len(response.json()["recent_transactions"]) == 5
+        categories = [
+            q for q in queries if q[0].lstrip().startswith("SELECT categories")
+        ]
+        assert categories == []
+
+
+class TestBulkCreate:
+    def item(self, amount=10.00, category="Groceries", **overrides):
+        return {
+            "amount": amount,
+            "description": "Imported",
+            "date": datetime(2026, 3, 10, tzinfo=timezone.utc).isoformat(),
+            "category": category,
+            "type": "expense",
+            "account": "Main Account",
+            **overrides,
+        }
+
+    def test_creates_every_valid_item(self, client, auth_headers, test_category):
+        payload = {"transactions": [self.item(amount=i + 1) for i in range(20)]}
+
+        response = client.post("/transactions/bulk", headers=auth_headers, json=payload)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {
+            "created": 20,
+            "skipped": 0,
+            "failed": 0,
+            "errors": [],
+        }
+        listed = client.get("/transactions/", headers=auth_headers).json()
+        assert len(listed) == 20
+        assert {t["category"] for t in listed} == {"Groceries"}
+
+    def test_reports_bad_items_without_aborting(
+        self, client, auth_headers, test_category
+    ):
+        payload = {
+            "transactions": [
+                self.item(),
+                self.item(amount=-5),
+                self.item(category="Nonexistent"),
+                {"amount": 12.50},
+                self.item(),
+            ]
+        }
+
+        response = client.post("/transactions/bulk", headers=auth_headers, json=payload)
+
+        data = response.json()
+        assert data["created"] == 2
+        assert data["failed"] == 3
+        assert [error["index"] for error in data["errors"]] == [1, 2, 3]
+        assert "amount" in data["errors"][0]["detail"]
+        assert "Nonexistent" in data["errors"][1]["detail"]
+
+    def test_updates_dashboard_totals(self, client, auth_headers, test_category):
+        today = datetime.now(timezone.utc).isoformat()
+
+        def payload(description):
+            items = [self.item(amount=15.00, date=today, description=description)]
+            return {"transactions": items * 4}
+
+        # The first batch creates the running balance, the second adjusts it
+        client.post("/transactions/bulk", headers=auth_headers, json=payload("A"))
+        client.post("/transactions/bulk", headers=auth_headers, json=payload("B"))
+        quick = client.get("/dashboard/quick-stats", headers=auth_headers).json()
+
+        assert quick["total_expense"] == 120.00
+        assert quick["budget_remaining"] == 3500 - 120.00
+
+    def test_single_insert_statement(
+        self, client, auth_headers, recorded_queries, test_category
+    ):
+        payload = {"transactions": [self.item() for _ in range(50)]}
+
+        with recorded_queries() as queries:
+            client.post("/transactions/bulk", headers=auth_headers, json=payload)
+
+        inserts = [q for q in queries if q[0].startswith("INSERT INTO transactions")]
+        assert len(inserts) == 1
+        category_lookups = [q for q in queries if "FROM categories" in q[0]]
+        assert len(category_lookups) == 1
+
+    def test_other_users_categories_are_not_used(self, client, auth_headers, test_db):
+        other = User(
+            username="someoneelse",
+            email="else@test.com",
+            first_name="Some",
+            last_name="One",
+            hashed_password="x",
+            monthly_budget=0,
+        )
+        test_db.add(other)
+        test_db.flush()
+        test_db.add(
+            Category(
+                name="Private",
+                type="expense",
+                description="Someone else's",
+                icon="🔒",
+                colour="#000000",
+                user_id=other.id,
+                is_default=False,
+            )
+        )
+        test_db.commit()
+
+        response = client.post(
+            "/transactions/bulk",
+            headers=auth_headers,
+            json={"transactions": [self.item(category="Private")]},
+        )
+
+        assert response.json()["created"] == 0
+
+    def test_batch_size_is_limited(self, client, auth_headers):
+        payload = {"transactions": [self.item()] * (MAX_BULK_TRANSACTIONS + 1)}
+
+        response = client.post("/transactions/bulk", headers=auth_headers, json=payload)
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+CSV_STATEMENT = """Date,Description,Amount,Category
+15/03/2026,Tesco,-45.20,Groceries
+16/03/2026,Salary,"2,000.00",
+17/03/2026,Mystery,-10.00,Unknown
+not a date,Broken,-5.00,
+18/03/2026,Refund,(12.50),Groceries
+"""
+
+QIF_STATEMENT = """!Type:Bank
+D15/03/2026
+T-45.20
+PTesco
+LGroceries
+^
+D16/03'26
+T2000.00
+PEmployer
+L[Savings]
+^
+"""
+
+OFX_STATEMENT = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><CURDEF>GBP
+<BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20260315120000[0:GMT]<TRNAMT>-45.20
+<NAME>TESCO STORES</STMTTRN>
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20260316
+<TRNAMT>2000.00
+<NAME>EMPLOYER LTD
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+class TestStatementParsers:
+    def test_csv(self):
+        records = list(parse_statement(io.StringIO(CSV_STATEMENT), "csv"))
+
+        line, tesco = records[0]
+        assert line == 2
+        assert tesco["date"] == datetime(2026, 3, 15, tzinfo=timezone.utc)
+        assert (tesco["amount"], tesco["type"]) == (45.20, "expense")
+        assert tesco["category"] == "Groceries"
+        assert (records[1][1]["amount"], records[1][1]["type"]) == (2000.0, "income")
+        assert "category" not in records[1][1]
+        assert records[3][1]["date"] == "not a date"
+        assert records[4][1]["amount"] == 12.50
+
+    def test_csv_debit_and_credit_columns(self):
+        statement = "Date,Details,Paid out,Paid in\n01/04/2026,Rent,950.00,\n"
+
+        ((_, record),) = parse_statement(io.StringIO(statement), "csv")
+
+        assert (record["amount"], record["type"]) == (950.0, "expense")
+        assert record["description"] == "Rent"
+
+    def test_month_first_dates(self):
+        statement = "Date,Description,Amount\n03/15/2026,Tesco,-1.00\n"
+
+        ((_, record),) = parse_statement(io.StringIO(statement), "csv", day_first=False)
+
+        assert record["date"].date() == date(2026, 3, 15)
+
+    def test_qif(self):
+        records = [r for _, r in parse_statement(io.StringIO(QIF_STATEMENT), "qif")]
+
+        assert records[0]["description"] == "Tesco"
+        assert records[0]["category"] == "Groceries"
+        assert records[1]["date"].date() == date(2026, 3, 16)
+        # Transfers don't carry a spending category
+        assert "category" not in records[1]
+
+    def test_ofx(self):
+        records = list(parse_statement(io.StringIO(OFX_STATEMENT), "ofx"))
+
+        assert [line for line, _ in records] == [4, 6]
+        assert records[0][1]["description"] == "TESCO STORES"
+        assert records[0][1]["currency"] == "GBP"
+        assert records[1][1]["date"].date() == date(2026, 3, 16)
+        assert records[1][1]["type"] == "income"
+
+    def test_parsers_are_lazy(self):
+        lines = iter(CSV_STATEMENT.splitlines(keepends=True))
+
+        records = parse_statement(lines, "csv")
+        next(records)
+
+        # Only the header and the first row have been read
+        assert next(lines).startswith("16/03/2026")
+
+    def test_detect_format(self):
+        assert detect_format("statement.OFX") == "ofx"
+        assert detect_format("statement.txt") is None
+        assert detect_format(None) is None
+
+
+class TestImport:
+    def upload(self, client, headers, content, filename, **params):
+        response = client.post(
+            "/transactions/import",
+            headers=headers,
+            params=params,
+            files={"file": (filename, content.encode(), "text/plain")},
+        )
+        events = [json.loads(line) for line in response.text.splitlines()]
+        return response, events
+
+    def test_csv_import(self, client, auth_headers, test_category):
+        response, events = self.upload(
+            client, auth_headers, CSV_STATEMENT, "statement.csv"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        final = events[-1]
+        assert final["event"] == "complete"
+        assert (final["processed"], final["created"], final["failed"]) == (5, 3, 2)
+        assert [error["line"] for error in final["errors"]] == [4, 5]
+
+        listed = client.get("/transactions/", headers=auth_headers).json()
+        assert {t["category"] for t in listed} == {"Groceries", "Uncategorised"}
+        assert {t["account"] for t in listed} == {"Imported"}
+
+    def test_commits_in_chunks(self, client, auth_headers, monkeypatch):
+        monkeypatch.setattr(transactions_router, "IMPORT_CHUNK_SIZE", 2)
+        rows = "".join(f"0{i}/03/2026,Shop {i},-1.00\n" for i in range(1, 6))
+
+        _, events = self.upload(
+            client,
+            auth_headers,
+            "Date,Description,Amount\n" + rows,
+            "statement.csv",
+            account="Current Account",
+        )
+
+        assert [e["processed"] for e in events] == [2, 4, 5, 5]
+        assert events[-1]["created"] == 5
+        quick = client.get("/dashboard/quick-stats", headers=auth_headers).json()
+        assert quick["total_expense"] == 5.00
+
+    def test_ofx_and_qif_imports(self, client, auth_headers, test_category):
+        _, ofx = self.upload(client, auth_headers, OFX_STATEMENT, "bank.ofx")
+        _, qif = self.upload(client, auth_headers, QIF_STATEMENT, "bank.qif")
+
+        assert ofx[-1]["created"] == 2
+        assert qif[-1]["created"] == 2
+
+    def test_unknown_format(self, client, auth_headers):
+        response = client.post(
+            "/transactions/import",
+            headers=auth_headers,
+            files={"file": ("statement.txt", b"hello", "text/plain")},
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestDuplicates:
+    def item(self, **overrides):
+        return {
+            "amount": 4.20,
+            "description": "Pret A Manger",
+            "date": datetime(2026, 3, 10, tzinfo=timezone.utc).isoformat(),
+            "category": "Groceries",
+            "type": "expense",
+            "account": "Main Account",
+            **overrides,
+        }
+
+    def bulk(self, client, headers, payload):
+        return client.post(
+            "/transactions/bulk",
+            headers=headers,
+            params={"on_conflict": "skip"},
+            json=payload,
+        )
+
+    def upload(self, client, headers, rows):
+        content = "Date,Description,Amount\n" + "".join(f"{r}\n" for r in rows)
+        response = client.post(
+            "/transactions/import",
+            headers=headers,
+            files={"file": ("statement.csv", content.encode(), "text/plain")},
+        )
+        return json.loads(response.text.splitlines()[-1])
+
+    def test_retried_bulk_is_skipped(self, client, auth_headers, test_category):
+        payload = {"transactions": [self.item(amount=i + 1) for i in range(5)]}
+
+        self.bulk(client, auth_headers, payload)
+        retry = self.bulk(client, auth_headers, payload)
+
+        assert retry.json()["created"] == 0
+        assert retry.json()["skipped"] == 5
+        assert len(client.get("/transactions/", headers=auth_headers).json()) == 5
+
+    def test_bulk_inserts_everything_by_default(
+        self, client, auth_headers, test_category
+    ):
+        # Two coffees bought in one day, sent in separate requests
+        payload = {"transactions": [self.item()]}
+        for _ in range(2):
+            response = client.post(
+                "/transactions/bulk", headers=auth_headers, json=payload
+            )
+            assert response.json()["created"] == 1
+
+        assert len(client.get("/transactions/", headers=auth_headers).json()) == 2
+
+    def test_identical_items_in_one_batch_are_kept(
+        self, client, auth_headers, test_category
+    ):
+        payload = {"transactions": [self.item(), self.item(), self.item(amount=1)]}
+
+        first = self.bulk(client, auth_headers, payload)
+        payload["transactions"].append(self.item())
+        second = self.bulk(client, auth_headers, payload)
+
+        assert first.json()["created"] == 3
+        assert (second.json()["created"], second.json()["skipped"]) == (1, 3)
+
+    def test_overlapping_statements(self, client, auth_headers):
+        first = self.upload(
+            client,
+            auth_headers,
+            [
+                "01/03/2026,Coffee,-3.00",
+                "01/03/2026,Coffee,-3.00",
+                "02/03/2026,Rent,-900",
+            ],
+        )
+        second = self.upload(
+            client,
+            auth_headers,
+            ["01/03/2026,COFFEE ,-3.00", "02/03/2026,Rent,-900", "03/03/2026,Gym,-30"],
+        )
+
+        assert (first["created"], first["skipped"]) == (3, 0)
+        assert (second["created"], second["skipped"]) == (1, 2)
+        quick = client.get("/dashboard/quick-stats", headers=auth_headers).json()
+        assert quick["total_expense"] == 936.00
+
+    def test_skips_in_the_insert_statement(
+        self, client, auth_headers, recorded_queries, test_category
+    ):
+        payload = {"transactions": [self.item(amount=i + 1) for i in range(50)]}
+
+        with recorded_queries() as queries:
+            self.bulk(client, auth_headers, payload)
+
+        transaction_queries = [q for q in queries if "transactions" in q[0]]
+        assert len(transaction_queries) == 1
+        assert "ON CONFLICT" in transaction_queries[0][0]
+
+    def test_retried_create_conflicts(self, client, auth_headers, test_category):
+        keyed = {**auth_headers, "Idempotency-Key": "5f0c1d2e"}
+        first = client.post("/transactions/", headers=keyed, json=self.item())
+        retry = client.post("/transactions/", headers=keyed, json=self.item())
+
+        assert retry.status_code == status.HTTP_409_CONFLICT
+        assert first.json()["id"] in retry.json()["detail"]
+
+        another = client.post(
+            "/transactions/",
+            headers={**auth_headers, "Idempotency-Key": "9a7b3c4d"},
+            json=self.item(),
+        )
+        assert another.status_code == status.HTTP_201_CREATED
+        assert len(client.get("/transactions/", headers=auth_headers).json()) == 2
+
+    def test_identical_creates_without_a_key_are_kept(
+        self, client, auth_headers, test_category
+    ):
+        # Two coffees on one day, entered by hand
+        for _ in range(2):
+            response = client.post(
+                "/transactions/", headers=auth_headers, json=self.item()
+            )
+            assert response.status_code == status.HTTP_201_CREATED
+
+        assert len(client.get("/transactions/", headers=auth_headers).json()) == 2
+
+    def test_editing_one_of_identical_twins(self, client, auth_headers, test_category):
+        payload = {"transactions": [self.item(), self.item()]}
+        self.bulk(client, auth_headers, payload)
+        twins = client.get("/transactions/", headers=auth_headers).json()
+
+        for twin in twins:
+            changed = client.put(
+                f"/transactions/{twin['id']}", headers=auth_headers, json={"amount": 5}
+            )
+            restored = client.put(
+                f"/transactions/{twin['id']}",
+                headers=auth_headers,
+                json={"amount": 4.20},
+            )
+            assert changed.status_code == status.HTTP_200_OK
+            assert restored.status_code == status.HTTP_200_OK
+
+        # Edited rows still match the batch they came from
+        retry = self.bulk(client, auth_headers, payload)
+        assert retry.json()["skipped"] == 2
+
+    def test_backfill_matches_create_for_offset_dates(
+        self, client, auth_headers, test_db, test_category
+    ):
+        late = self.item(date="2026-03-10T00:30:00+01:00")
+        self.bulk(client, auth_headers, {"transactions": [late]})
+        created = test_db.query(Transaction.fingerprint).scalar()
+
+        engine = test_db.get_bind()
+        with engine.begin() as conn:
+            conn.execute(text("UPDATE transactions SET fingerprint = NULL"))
+            backfill_fingerprints(conn)
+
+        test_db.expire_all()
+        assert test_db.query(Transaction.fingerprint).scalar() == created
+
+    def test_migrations_backfill_fingerprints(self, test_db, test_transaction):
+        twin = Transaction(
+            **{
+                column: getattr(test_transaction, column)
+                for column in ("user_id", "category_id", "amount", "description")
+            },
+            date=test_transaction.date,
+            type="expense",
+            account="Main Account",
+        )
+        test_db.add(twin)
+        test_db.commit()
+
+        updated_at = {row.id: row.updated_at for row in test_db.query(Transaction)}
+
+        engine = test_db.get_bind()
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_transactions_fingerprint"))
+            conn.execute(text("ALTER TABLE transactions DROP COLUMN fingerprint"))
+
+        run_migrations(engine)
+
+        with engine.connect() as conn:
+            fingerprints = set(
+                conn.execute(text("SELECT fingerprint FROM transactions")).scalars()
+            )
+        # Existing duplicates are numbered apart rather than clashing
+        assert len(fingerprints) == 2
+        assert None not in fingerprints
+        # Backfilling isn't an edit
+        test_db.expire_all()
+        assert updated_at == {
+            row.id: row.updated_at for row in test_db.query(Transaction)
+        }
+        indexes = {
+            index["name"] for index in inspect(engine).get_indexes("transactions")
+        }
+        assert "ix_transactions_fingerprint" in indexes
+
+
+class TestMoney:
+    @pytest.mark.parametrize(
+        "amount, pence",
+        [(12.34, 1234), (0.1 + 0.2, 30), (12.345, 1235), (3500, 350000), (0.004, 0)],
+    )
+    def test_to_minor_units(self, amount, pence):
+        assert to_minor_units(amount) == pence
+
+    def test_from_minor_units(self):
+        assert from_minor_units(1234) == 12.34
+        assert from_minor_units(None) is None
+        assert format_minor_units(1205) == "12.05"
+        assert format_minor_units(-5) == "-0.05"
+
+    def test_stored_in_pence(self, client, auth_headers, test_db, test_category):
+        response = client.post(
+            "/transactions/",
+            headers=auth_headers,
+            json={
+                "amount": 19.99,
+                "description": "Book",
+                "category": "Groceries",
+                "type": "expense",
+                "account": "Main Account",
+                "date": datetime.now(timezone.utc).isoformat(),
+            },
+        )
+
+        assert response.json()["amount"] == 19.99
+        transaction_id = UUID(response.json()["id"])
+        assert test_db.get(Transaction, transaction_id).amount == 1999
+
+        updated = client.put(
+            f"/transactions/{transaction_id}",
+            headers=auth_headers,
+            json={"amount": 5.5},
+        )
+        assert updated.json()["amount"] == 5.5
+        test_db.expire_all()
+        assert test_db.get(Transaction, transaction_id).amount == 550
+
+    def test_migrations_convert_float_columns(self, test_db, test_transaction):
+        engine = test_db.get_bind()
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE transactions DROP COLUMN amount"))
+            conn.execute(
+                text("ALTER TABLE transactions ADD COLUMN amount FLOAT DEFAULT 0")
+            )
+            conn.execute(text("UPDATE transactions SET amount = 12.34"))
+
+        run_migrations(engine)
+        run_migrations(engine)
+
+        with engine.connect() as conn:
+            amount = conn.execute(text("SELECT amount FROM transactions")).scalar()
+        assert amount == 1234
+        columns = {
+            column["name"]: column["type"]
+            for column in inspect(engine).get_columns("transactions")
+        }
+        assert isinstance(columns["amount"], Integer)
+
+
+class TestExport:
+    @pytest.fixture
+    def ledger(self, test_db, test_user, test_category):
+        """
+        Four transactions a day apart, alternating expense and income, the
+        last one uncategorised
+        """
+        base = datetime(2026, 3, 10, 12, 0, tzinfo=timezone.utc)
+        for i in range(4):
+            test_db.add(
+                Transaction(
+                    user_id=test_user.id,
+                    category_id=test_category.id if i < 3 else None,
+                    amount=1000 * (i + 1),
+                    description=f"transaction {i + 1}",
+                    date=base - timedelta(days=i),
+                    type="expense" if i % 2 == 0 else "income",
+                    account="Main Account",
+                    currency="GBP",
+                    status="completed",
+                )
+            )
+        test_db.commit()
+
+    def test_csv(self, client, auth_headers, ledger):
+        response = client.get("/transactions/export", headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/csv")
+        assert "transactions.csv" in response.headers["content-disposition"]
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert [row["description"] for row in rows] == [
+            "transaction 1",
+            "transaction 2",
+            "transaction 3",
+            "transaction 4",
+        ]
+        assert rows[0]["category"] == "Groceries"
+        assert rows[3]["category"] == "Uncategorised"
+        assert float(rows[1]["amount"]) == 20.00
+
+    def test_ndjson(self, client, auth_headers, ledger):
+        response = client.get(
+            "/transactions/export", headers=auth_headers, params={"format": "ndjson"}
+        )
+
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert len(rows) == 4
+        assert datetime.fromisoformat(rows[0]["date"]).date() == date(2026, 3, 10)
+
+    def test_applies_listing_filters(self, client, auth_headers, ledger):
+        response = client.get(
+            "/transactions/export",
+            headers=auth_headers,
+            params={"format": "ndjson", "type": "income"},
+        )
+
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert {row["type"] for row in rows} == {"income"}
+        assert len(rows) == 2
+
+    def test_applies_search(self, client, auth_headers, ledger):
+        def export(**params):
+            response = client.get(
+                "/transactions/export",
+                headers=auth_headers,
+                params={"format": "ndjson", **params},
+            )
+            return [
+                json.loads(line)["description"] for line in response.text.splitlines()
+            ]
+
+        assert export(q="transaction 3") == ["transaction 3"]
+        # Search matches are exported newest first, like the rest
+        assert export(q="trans", type="expense") == ["transaction 1", "transaction 3"]
+        assert export(q="nothing") == []
+
+    def test_streams_in_blocks(self, monkeypatch):
+        monkeypatch.setattr(transactions_router, "EXPORT_BUFFER_SIZE", 1)
+        row = (uuid4(), datetime(2026, 3, 10), "Shop", None, "expense", 1.0)
+        rows = iter([row + ("GBP", "Main", "completed", None, None)] * 3)
+
+        lines = transactions_router._export_lines(rows, "ndjson")
+        first = next(lines)
+
+        # Rows are written out as they are read, not gathered up front
+        assert json.loads(first)["description"] == "Shop"
+        assert len(list(rows)) == 2
+
+    def test_only_own_transactions(self, client, auth_headers):
+        response = client.get("/transactions/export", headers=auth_headers)
+
+        assert response.text.strip() == ",".join(transactions_router.EXPORT_COLUMNS)
+
+
+class TestSearch:
+    @pytest.fixture
+    def ledger(self, test_db, test_user, test_category):
+        """
+        A handful of shops with overlapping names
+        """
+        descriptions = [
+            "Tesco Express",
+            "Tesco weekly shop",
+            "Sainsbury's",
+            "Testing kit",
+            "Coffee at Tesco café",
+        ]
+        for i, description in enumerate(descriptions):
+            test_db.add(
+                Transaction(
+                    user_id=test_user.id,
+                    category_id=test_category.id,
+                    amount=1000,
+                    description=description,
+                    date=datetime(2026, 3, 1 + i, tzinfo=timezone.utc),
+                    type="expense",
+                    account="Main Account",
+                    currency="GBP",
+                    status="completed",
+                )
+            )
+        test_db.commit()
+
+    def search(self, client, headers, q, **params):
+        response = client.get(
+            "/transactions/", headers=headers, params={"q": q, **params}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        return [t["description"] for t in response.json()]
+
+    def test_prefix_match(self, client, auth_headers, ledger):
+        results = self.search(client, auth_headers, "tes")
+
+        assert set(results) == {
+            "Tesco Express",
+            "Tesco weekly shop",
+            "Testing kit",
+            "Coffee at Tesco café",
+        }
+
+    def test_every_word_must_match(self, client, auth_headers, ledger):
+        assert self.search(client, auth_headers, "tesco wee") == ["Tesco weekly shop"]
+
+    def test_best_matches_first(self, client, auth_headers, ledger):
+        results = self.search(client, auth_headers, "tesco")
+
+        # Shorter descriptions are a closer match under bm25
+        assert results[0] == "Tesco Express"
+        assert results[-1] == "Coffee at Tesco café"
+
+    def test_search_survives_vacuum(self, client, auth_headers, test_db, ledger):
+        engine = test_db.get_bind()
+        vacuum(engine)
+        assert self.search(client, auth_headers, "tesco wee") == ["Tesco weekly shop"]
+
+        # Renumber the rows as VACUUM may, which leaves the index pointing
+        # at the wrong rows until it is rebuilt
+        with engine.begin() as conn:
+            conn.execute(text("UPDATE transactions SET rowid = 1000 - rowid"))
+        vacuum(engine)
+
+        assert self.search(client, auth_headers, "tesco wee") == ["Tesco weekly shop"]
+        assert self.search(client, auth_headers, "sains") == ["Sainsbury's"]
+
+    def test_accents_and_punctuation(self, client, auth_headers, ledger):
+        assert self.search(client, auth_headers, "cafe") == ["Coffee at Tesco café"]
+        assert self.search(client, auth_headers, 'sainsbury"* (') == ["Sainsbury's"]
+
+    def test_combines_with_filters(self, client, auth_headers, ledger):
+        results = self.search(
+            client,
+            auth_headers,
+            "tesco",
+            start_date=datetime(2026, 3, 2, tzinfo=timezone.utc).isoformat(),
+        )
+
+        assert "Tesco Express" not in results
+        assert len(results) == 2
+
+    def test_index_follows_updates_and_deletes(
+        self, client, auth_headers, test_db, ledger
+    ):
+        express, weekly = (
+            test_db.query(Transaction)
+            .filter(Transaction.description.like("Tesco %"))
+            .order_by(Transaction.description)
+            .all()
+        )
+        express.description = "Aldi"
+        test_db.delete(weekly)
+        test_db.commit()
+
+        assert self.search(client, auth_headers, "aldi") == ["Aldi"]
+        assert self.search(client, auth_headers, "tesco") == ["Coffee at Tesco café"]
+
+    def test_only_own_transactions(self, client, auth_headers, test_db, ledger):
+        other = User(
+            username="someoneelse",
+            email="else@test.com",
+            first_name="Some",
+            last_name="One",
+            hashed_password="x",
+            monthly_budget=0,
+        )
+        test_db.add(other)
+        test_db.flush()
+        test_db.add(
+            Transaction(
+                user_id=other.id,
+                amount=1000,
+                description="Tesco Extra",
+                date=datetime(2026, 3, 1, tzinfo=timezone.utc),
+                type="expense",
+                account="Main Account",
+            )
+        )
+        test_db.commit()
+
+        assert "Tesco Extra" not in self.search(client, auth_headers, "tesco")
+
+    def test_no_cursor_with_search(self, client, auth_headers, ledger):
+        response = client.get(
+            "/transactions/",
+            headers=auth_headers,
+            params={"q": "tesco", "cursor": "abc"},
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_uses_full_text_index(
+        self, client, auth_headers, recorded_queries, query_plan, ledger
+    ):
+        with recorded_queries() as queries:
+            self.search(client, auth_headers, "tesco")
+
+        (statement, parameters), *_ = [
+            query for query in queries if "transactions_fts" in query[0]
+        ]
+        assert "VIRTUAL TABLE INDEX" in query_plan(statement, parameters)
+
+    def test_rebuild_backfills_existing_rows(
+        self, client, auth_headers, test_db, ledger
+    ):
+        with test_db.get_bind().begin() as conn:
+            conn.exec_driver_sql(
+                "INSERT INTO transactions_fts(transactions_fts) VALUES('delete-all')"
+            )
+        assert self.search(client, auth_headers, "tesco") == []
+
+        with test_db.get_bind().begin() as conn:
+            rebuild_search_index(conn)
+
+        assert len(self.search(client, auth_headers, "tesco")) == 3
+
+
+class TestBulkChanges:
+    @pytest.fixture
+    def ledger(self, client, auth_headers, test_db, test_category):
+        """
+        Six groceries expenses over two days, two of them at Pret, created
+        through the API so rollups are in step
+        """
+        test_db.add(
+            Category(
+                name="Eating Out",
+                type="expense",
+                description="Restaurants and cafés",
+                icon="🍽️",
+                colour="#F4A261",
+                is_default=True,
+            )
+        )
+        test_db.commit()
+        today = datetime.now(timezone.utc).replace(hour=12)
+        descriptions = ["Tesco", "Pret lunch", "Aldi", "Pret coffee", "Lidl", "Asda"]
+        items = [
+            {
+                "amount": 10.00 * (i + 1),
+                "description": description,
+                "date": (today - timedelta(days=i % 2)).isoformat(),
+                "category": "Groceries",
+                "type": "expense",
+                "account": "Main Account",
+            }
+            for i, description in enumerate(descriptions)
+        ]
+        client.post(
+            "/transactions/bulk", headers=auth_headers, json={"transactions": items}
+        )
+        return {
+            t["description"]: t["id"]
+            for t in client.get("/transactions/", headers=auth_headers).json()
+        }
+
+    def spending(self, client, headers):
+        response = client.get("/dashboard/spending-by-category", headers=headers)
+        return {c["category_name"]: c["total_amount"] for c in response.json()}
+
+    def test_recategorise_by_ids(self, client, auth_headers, ledger):
+        response = client.post(
+            "/transactions/bulk/update",
+            headers=auth_headers,
+            json={
+                "ids": [ledger["Pret lunch"], ledger["Pret coffee"]],
+                "changes": {"category": "Eating Out"},
+            },
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"affected": 2}
+        listed = client.get("/transactions/", headers=auth_headers).json()
+        eating_out = {t["description"] for t in listed if t["category"] == "Eating Out"}
+        assert eating_out == {"Pret lunch", "Pret coffee"}
+        assert self.spending(client, auth_headers) == {
+            "Groceries": 150.00,
+            "Eating Out": 60.00,
+        }
+
+    def test_recategorise_by_search_in_one_update(
+        self, client, auth_headers, recorded_queries, ledger
+    ):
+        with recorded_queries() as queries:
+            response = client.post(
+                "/transactions/bulk/update",
+                headers=auth_headers,
+                json={"filter": {"q": "pret"}, "changes": {"category": "Eating Out"}},
+            )
+
+        assert response.json() == {"affected": 2}
+        updates = [q for q in queries if q[0].startswith("UPDATE transactions")]
+        assert len(updates) == 1
+        assert self.spending(client, auth_headers)["Eating Out"] == 60.00
+
+    def test_type_change_moves_balance(self, client, auth_headers, ledger):
+        client.post(
+            "/transactions/bulk/update",
+            headers=auth_headers,
+            json={"ids": [ledger["Asda"]], "changes": {"type": "income"}},
+        )
+
+        quick = client.get("/dashboard/quick-stats", headers=auth_headers).json()
+        assert quick["total_income"] == 60.00
+        assert quick["total_expense"] == 150.00
+
+    def test_delete_by_filter(self, client, auth_headers, ledger):
+        yesterday = datetime.now(timezone.utc).date() - timedelta(days=1)
+        response = client.post(
+            "/transactions/bulk/delete",
+            headers=auth_headers,
+            json={"filter": {"end_date": f"{yesterday}T23:59:59"}},
+        )
+
+        assert response.json() == {"affected": 3}
+        listed = client.get("/transactions/", headers=auth_headers).json()
+        assert {t["description"] for t in listed} == {"Tesco", "Aldi", "Lidl"}
+        quick = client.get("/dashboard/quick-stats", headers=auth_headers).json()
+        assert quick["total_expense"] == 90.00
+
+    def test_rollups_match_rebuild(
+        self, client, auth_headers, test_db, test_user, ledger
+    ):
+        client.post(
+            "/transactions/bulk/update",
+            headers=auth_headers,
+            json={"filter": {"q": "pret"}, "changes": {"category": "Eating Out"}},
+        )
+        client.post(
+            "/transactions/bulk/delete",
+            headers=auth_headers,
+            json={"ids": [ledger["Tesco"], ledger["Pret lunch"]]},
+        )
+
+        def snapshot():
+            return sorted(
+                (r.day, str(r.category_id), r.type, r.total_amount, r.transaction_count)
+                for r in test_db.query(DailyUserCategoryTotal)
+            )
+
+        incremental = snapshot()
+        rebuild_rollups(test_db, test_user.id)
+        test_db.commit()
+        assert snapshot() == incremental
+
+    def test_only_own_transactions(self, client, auth_headers, test_db, ledger):
+        other = User(
+            username="someoneelse",
+            email="else@test.com",
+            first_name="Some",
+            last_name="One",
+            hashed_password="x",
+            monthly_budget=0,
+        )
+        test_db.add(other)
+        test_db.flush()
+        theirs = Transaction(
+            user_id=other.id,
+            amount=1000,
+            description="Pret breakfast",
+            date=datetime.now(timezone.utc),
+            type="expense",
+            account="Main Account",
+        )
+        test_db.add(theirs)
+        test_db.commit()
+
+        by_id = client.post(
+            "/transactions/bulk/delete",
+            headers=auth_headers,
+            json={"ids": [str(theirs.id)]},
+        )
+        by_search = client.post(
+            "/transactions/bulk/delete",
+            headers=auth_headers,
+            json={"filter": {"q": "pret"}},
+        )
+
+        assert by_id.json() == {"affected": 0}
+        assert by_search.json() == {"affected": 2}
+        assert test_db.get(Transaction, theirs.id) is not None
+
+    @pytest.mark.parametrize(
+        "payload",
+        [
+            {"changes": {"status": "pending"}},
+            {"filter": {}, "changes": {"status": "pending"}},
+            {"ids": [str(uuid4())], "filter": {"type": "expense"}, "changes": {}},
+            {"ids": [str(uuid4())], "changes": {}},
+        ],
+    )
+    def test_rejects_unscoped_or_empty_requests(self, client, auth_headers, payload):
+        response = client.post(
+            "/transactions/bulk/update", headers=auth_headers, json=payload
+        )
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+    def test_unknown_category(self, client, auth_headers, ledger):
+        response = client.post(
+            "/transactions/bulk/update",
+            headers=auth_headers,
+            json={"ids": [ledger["Aldi"]], "changes": {"category": "Nope"}},
+        )
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestArchive:
+    @pytest.fixture
+    def ledger(
+        self,
+        client,
+        auth_headers,
+        test_db,
+        test_user,
+        test_category,
+        tmp_path,
+        monkeypatch,
+    ):
+        """
+        Four 2020 transactions and three recent ones, created through the
+        API, with the 2020 ones archived
+        """
+        monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path))
+        recent = datetime.now(timezone.utc).replace(hour=12, microsecond=0)
+        dates = [datetime(2020, 6, 1 + i, 9, 30) for i in range(4)]
+        dates += [recent - timedelta(days=i) for i in range(3)]
+        items = [
+            {
+                "amount": 10.00 * (i + 1),
+                "description": f"{'Tesco' if i % 2 else 'Salary'} {i + 1}",
+                "date": day.isoformat(),
+                "category": "Groceries",
+                "type": "expense" if i % 2 else "income",
+                "account": "Main Account",
+            }
+            for i, day in enumerate(dates)
+        ]
+        # Fingerprinted, as a statement import would be
+        client.post(
+            "/transactions/bulk",
+            headers=auth_headers,
+            params={"on_conflict": "skip"},
+            json={"transactions": items},
+        )
+        before_archive = client.get("/transactions/", headers=auth_headers).json()
+
+        archived = archive.archive_transactions(
+            test_db, test_user.id, datetime(2021, 1, 1)
+        )
+
+        assert archived == 4
+        return {"items": items, "listed": before_archive}
+
+    def test_moves_old_rows_out_of_the_table(self, test_db, test_user, ledger):
+        assert test_db.query(Transaction).count() == 3
+        assert len(archive.load_archive(test_user.id)) == 4
+
+    def test_listing_is_unchanged(self, client, auth_headers, ledger):
+        listed = client.get("/transactions/", headers=auth_headers).json()
+
+        assert listed == ledger["listed"]
+
+    def test_pages_cross_into_the_archive(self, client, auth_headers, ledger):
+        pages = TestCursorPagination().fetch_all(client, auth_headers, limit=2)
+
+        assert [t["id"] for page in pages for t in page] == [
+            t["id"] for t in ledger["listed"]
+        ]
+
+    def test_skip_counts_archived_rows(self, client, auth_headers, ledger):
+        response = client.get(
+            "/transactions/", headers=auth_headers, params={"skip": 2, "limit": 3}
+        )
+
+        assert response.json() == ledger["listed"][2:5]
+
+    def test_filters_apply_to_archived_rows(self, client, auth_headers, ledger):
+        response = client.get(
+            "/transactions/",
+            headers=auth_headers,
+            params={"type": "expense", "end_date": "2020-06-03T00:00:00"},
+        )
+
+        assert [t["description"] for t in response.json()] == ["Tesco 2"]
+
+    def test_search_finds_archived_rows(self, client, auth_headers, ledger):
+        response = client.get(
+            "/transactions/", headers=auth_headers, params={"q": "tes"}
+        )
+
+        assert {t["description"] for t in response.json()} == {
+            "Tesco 2",
+            "Tesco 4",
+            "Tesco 6",
+        }
+
+    def test_single_archived_transaction(self, client, auth_headers, ledger):
+        oldest = ledger["listed"][-1]
+
+        response = client.get(f"/transactions/{oldest['id']}", headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == oldest
+
+    def test_archived_transactions_are_read_only(self, client, auth_headers, ledger):
+        oldest = ledger["listed"][-1]["id"]
+
+        updated = client.put(
+            f"/transactions/{oldest}", headers=auth_headers, json={"amount": 1.0}
+        )
+        deleted = client.delete(f"/transactions/{oldest}", headers=auth_headers)
+
+        assert updated.status_code == status.HTTP_409_CONFLICT
+        assert oldest in updated.json()["detail"]
+        assert deleted.status_code == status.HTTP_409_CONFLICT
+
+    def test_bulk_changes_reject_archived_ids(self, client, auth_headers, ledger):
+        ids = [ledger["listed"][0]["id"], ledger["listed"][-1]["id"]]
+
+        response = client.post(
+            "/transactions/bulk/delete", headers=auth_headers, json={"ids": ids}
+        )
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert len(client.get("/transactions/", headers=auth_headers).json()) == 7
+
+    def test_bulk_filters_leave_archived_rows_out(self, client, auth_headers, ledger):
+        response = client.post(
+            "/transactions/bulk/delete",
+            headers=auth_headers,
+            json={"filter": {"type": "expense"}},
+        )
+
+        assert response.json()["affected"] == 1
+        listed = client.get("/transactions/", headers=auth_headers).json()
+        assert {t["description"] for t in listed if t["type"] == "expense"} == {
+            "Tesco 2",
+            "Tesco 4",
+        }
+
+    def test_find_by_id(self, test_user, ledger):
+        stored = archive.load_archive(test_user.id)
+        ids = [UUID(t["id"]) for t in ledger["listed"][3:]]
+
+        assert [stored.find(i).id for i in ids] == ids
+        assert stored.find(uuid4()) is None
+        assert stored.archived_ids(ids + [uuid4()]) == set(ids)
+
+    def test_export_merges_the_archive(self, client, auth_headers, ledger):
+        response = client.get("/transactions/export", headers=auth_headers)
+
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert [row["id"] for row in rows] == [t["id"] for t in ledger["listed"]]
+        assert rows[-1]["category"] == "Groceries"
+
+    def test_reimport_skips_archived_rows(self, client, auth_headers, ledger):
+        response = client.post(
+            "/transactions/bulk",
+            headers=auth_headers,
+            params={"on_conflict": "skip"},
+            json={"transactions": ledger["items"]},
+        )
+
+        assert response.json()["created"] == 0
+        assert response.json()["skipped"] == 7
+
+    def test_dashboard_and_rebuilt_rollups_include_archive(
+        self, test_db, test_user, ledger
+    ):
+        def lifetime():
+            return (
+                test_db.query(
+                    DailyUserCategoryTotal.type,
+                    func.sum(DailyUserCategoryTotal.total_amount),
+                    func.sum(DailyUserCategoryTotal.transaction_count),
+                )
+                .group_by(DailyUserCategoryTotal.type)
+                .order_by(DailyUserCategoryTotal.type)
+                .all()
+            )
+
+        expected = [("expense", 12000, 3), ("income", 16000, 4)]
+        assert lifetime() == expected
+
+        rebuild_rollups(test_db, test_user.id)
+        test_db.commit()
+
+        assert lifetime() == expected
@@ -0,0 +1,86 @@
+"""
+Time bucketing helpers for charting totals over time.
+
+Grouping happens in SQL (``bucket_expression``); the grouped rows are then
+laid onto a complete, gap-free range of buckets with NumPy (``fill_buckets``)
+so charts get a point for every day, week or month even when nothing
+happened in it. Weeks start on Monday.
+"""
+
+from datetime import date, timedelta
+from typing import Iterable, Tuple
+
+import numpy as np
+from sqlalchemy import Date, cast, func
+
+BUCKETS = ("day", "week", "month")
+
+
+def bucket_expression(column, bucket: str, dialect: str):
+    """
+    SQL expression truncating a date column to the start of its bucket.
+    """
+    if dialect == "postgresql":
+        return cast(func.date_trunc(bucket, column), Date)
+    if bucket == "week":
+        # Forward to the next Sunday (or stay on it), then back to its Monday
+        return func.date(column, "weekday 0", "-6 days", type_=Date)
+    if bucket == "month":
+        return func.strftime("%Y-%m-01", column, type_=Date)
+    return column
+
+
+def bucket_start(day: date, bucket: str) -> date:
+    """
+    First day of the bucket ``day`` falls in.
+    """
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def bucket_range(start: date, end: date, bucket: str) -> np.ndarray:
+    """
+    Start day of every bucket between two dates (inclusive).
+    """
+    first = np.datetime64(bucket_start(start, bucket), "D")
+    last = np.datetime64(bucket_start(end, bucket), "D")
+
+    if bucket == "month":
+        months = np.arange(
+            first.astype("datetime64[M]"), last.astype("datetime64[M]") + 1
+        )
+        return months.astype("datetime64[D]")
+    step = 7 if bucket == "week" else 1
+    return np.arange(first, last + 1, step, dtype="datetime64[D]")
+
+
+def fill_buckets(
+    periods: np.ndarray, rows: Iterable[Tuple[date, str, int, int]]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Scatter grouped ``(bucket, type, total, count)`` rows onto ``periods``.
+
+    Returns income, expense (integer minor units) and transaction count
+    arrays aligned with ``periods``; buckets with no rows stay at zero.
+    """
+    rows = list(rows)
+    income = np.zeros(len(periods), dtype=np.int64)
+    expense = np.zeros(len(periods), dtype=np.int64)
+    counts = np.zeros(len(periods), dtype=np.int64)
+    if not rows:
+        return income, expense, counts
+
+    keys, types, totals, row_counts = zip(*rows)
+    index = np.searchsorted(periods, np.array(keys, dtype="datetime64[D]"))
+    types = np.array(types)
+    totals = np.array(totals, dtype=np.int64)
+
+    is_income = types == "income"
+    is_expense = types == "expense"
+    np.add.at(income, index[is_income], totals[is_income])
+    np.add.at(expense, index[is_expense], totals[is_expense])
+    np.add.at(counts, index, np.array(row_counts, dtype=np.int64))
+    return income, expense, counts